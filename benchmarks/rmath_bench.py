@@ -0,0 +1,224 @@
+''' Micro benchmarks for pylib/rmath.py.
+
+    Runs in plain CPython, maya is stubbed when it can't be imported. Timings are divided by a
+    pure python calibration loop so the committed baseline carries between machines.
+
+    Every timing is the best of REPEAT runs. A benchmark only counts as a regression when it is
+    more than THRESHOLD and NOISE_FLOOR slower, and stays that way when it is timed again over RETRIES
+    passes, so scheduler noise on sub microsecond calls doesn't fail the run. --update records the
+    best of RETRIES passes.
+
+    From the folder above rigpie:
+        python -m rigpie.benchmarks.rmath_bench             compare against the baseline, exit 1 on a regression
+        python -m rigpie.benchmarks.rmath_bench --update    write a new baseline
+'''
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import types
+
+
+# CONSTANTS
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rmath_baseline.json")
+THRESHOLD = 0.10 # allowed slow down before a benchmark counts as a regression
+NOISE_FLOOR = 0.05e-6 # seconds per call a slow down also has to exceed, jitter on a 0.1us call is well over 10%
+REPEAT = 15
+RETRIES = 3 # passes a regression is timed again over, and --update takes the best of
+BATCH_SIZE = 10000
+
+
+def stubMaya():
+    ''' put an empty maya package in sys.modules so rigpie modules import outside of maya '''
+
+    try:
+        import maya.cmds
+        return False
+    except ImportError:
+        pass
+
+    maya = types.ModuleType("maya")
+    maya.cmds = types.ModuleType("maya.cmds")
+    maya.cmds.objExists = lambda *args, **kwargs: False
+
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = maya.cmds
+
+    return True
+
+stubMaya()
+
+import numpy as np
+
+import rigpie.pylib.rmath as rmath_pylib
+
+
+def calibrate():
+    ''' seconds for a fixed pure python workload, every benchmark is reported as a multiple of this '''
+
+    def work():
+        total = 0.0
+        for ii in range(1000):
+            total += ii * 0.5
+        return total
+
+    return min(timeit.repeat(work, number=200, repeat=REPEAT)) / 200
+
+def getBenchmarks():
+    ''' returns [(name, callable, number of calls per timing)] '''
+
+    rng = np.random.default_rng(0)
+
+    matrices = rng.normal(size=(BATCH_SIZE, 4, 4))
+    matrices[:, :, 3] = [0.0, 0.0, 0.0, 1.0]
+    rotations = rmath_pylib.eulerToMatrix(rng.uniform(-3.0, 3.0, size=(BATCH_SIZE, 3)))
+    matrices[:, :3, :3] = rotations * rng.uniform(0.5, 2.0, size=(BATCH_SIZE, 1, 1))
+
+    transform_a = rmath_pylib.Transform(matrices[0])
+    transform_b = rmath_pylib.Transform(matrices[1])
+    vector_a = rmath_pylib.Vector(1.0, 2.0, 3.0)
+    vector_b = rmath_pylib.Vector(4.0, 5.0, 6.0)
+
+    transform_array_a = rmath_pylib.TransformArray(matrices)
+    transform_array_b = rmath_pylib.TransformArray(matrices[::-1])
+    vector_array_a = rmath_pylib.VectorArray(rng.normal(size=(BATCH_SIZE, 3)))
+    vector_array_b = rmath_pylib.VectorArray(rng.normal(size=(BATCH_SIZE, 3)))
+
+    vectors = [rmath_pylib.Vector(*point) for point in vector_array_a.toList()[:1000]]
+
+    def invertCopy(transform):
+        transform = transform.copy()
+        transform.invert()
+
+    def transposeCopy(transform):
+        transform = transform.copy()
+        transform.transpose()
+
+    def vectorLoop():
+        total = rmath_pylib.Vector()
+        for vector in vectors:
+            total += vector * 0.5 - vector_a
+
+    matrix_list = matrices[2].ravel().tolist()
+
+    return [
+        ("Transform(list)", lambda: rmath_pylib.Transform(matrix_list), 100000),
+        ("Transform.copy", lambda: transform_a.copy(), 100000),
+        ("Transform.get", lambda: transform_a.get(), 100000),
+        ("Transform.__mul__", lambda: transform_a * transform_b, 10000),
+        ("Transform.invert", lambda: invertCopy(transform_a), 10000),
+        ("Transform.det", lambda: transform_a.det(), 10000),
+        ("Transform.transpose", lambda: transposeCopy(transform_a), 10000),
+        ("Transform.getRotation", lambda: transform_a.getRotation(), 10000),
+        ("Vector.__add__", lambda: vector_a + vector_b, 100000),
+        ("Vector.__sub__", lambda: vector_a - vector_b, 100000),
+        ("Vector.__mul__", lambda: vector_a * 2.0, 100000),
+        ("Vector.__truediv__", lambda: vector_a / 2.0, 100000),
+        ("Vector.__mul__(Transform)", lambda: vector_a * transform_a, 10000),
+        ("Vector loop 1000", vectorLoop, 100),
+        ("TransformArray.__mul__ 10k", lambda: transform_array_a * transform_array_b, 20),
+        ("TransformArray.invert 10k", lambda: invertCopy(transform_array_a), 20),
+        ("TransformArray.det 10k", lambda: transform_array_a.det(), 20),
+        ("TransformArray.transpose 10k", lambda: transposeCopy(transform_array_a), 20),
+        ("TransformArray.getRotation 10k", lambda: transform_array_a.getRotation(), 20),
+        ("VectorArray.__add__ 10k", lambda: vector_array_a + vector_array_b, 200),
+        ("VectorArray.__mul__(Transform) 10k", lambda: vector_array_a * transform_a, 200),
+        ("VectorArray.cross 10k", lambda: vector_array_a.cross(vector_array_b), 200),
+    ]
+
+def run(names=None, passes=1):
+    ''' returns {name: time per call / calibration time} and the calibration time.
+
+        With more than one pass every benchmark and the calibration keep their best time before
+        they are divided, so a pass that ran while the machine was busy doesn't skew the ratios.
+    '''
+
+    calibrations = []
+    timings = {}
+
+    for ii in range(passes):
+        calibrations.append(calibrate())
+
+        for name, function, number in getBenchmarks():
+            if names and name not in names:
+                continue
+
+            seconds = min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+            timings[name] = min(seconds, timings.get(name, seconds))
+
+    calibrations.append(calibrate())
+    calibration = min(calibrations)
+
+    results = {}
+    for name, seconds in timings.items():
+        results[name] = seconds / calibration
+
+        print("rmath_bench.run(): {:<40} {:>10.3f} us {:>10.4f}x".format(name, seconds * 1e6, results[name]))
+
+    return results, calibration
+
+def compare(results, baseline, threshold=THRESHOLD, floor=0.0):
+    ''' returns the names that are more than threshold and more than floor, in calibration units, slower than the baseline '''
+
+    regressions = []
+    for name, value in sorted(results.items()):
+        if name not in baseline:
+            print("rmath_bench.compare(): {} has no baseline.".format(name))
+            continue
+
+        change = value / baseline[name] - 1.0
+        regressed = change > threshold and value - baseline[name] > floor
+        status = "REGRESSION" if regressed else "ok"
+
+        print("rmath_bench.compare(): {:<40} {:>+8.1%} {}".format(name, change, status))
+
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="rmath micro benchmarks")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline json file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slow down, 0.1 is 10%%")
+    parser.add_argument("names", nargs="*", help="only run these benchmarks")
+    options = parser.parse_args(args)
+
+    if options.update:
+        results, calibration = run(options.names, passes=RETRIES)
+
+        with open(options.baseline, "w") as handle:
+            json.dump(results, handle, indent=4, sort_keys=True)
+
+        print("rmath_bench.main(): wrote {}".format(options.baseline))
+        return 0
+
+    if not os.path.exists(options.baseline):
+        print("rmath_bench.main(): no baseline at {}, run with --update.".format(options.baseline))
+        return 1
+
+    with open(options.baseline, "r") as handle:
+        baseline = json.load(handle)
+
+    results, calibration = run(options.names)
+    regressions = compare(results, baseline, threshold=options.threshold, floor=NOISE_FLOOR / calibration)
+
+    # noise doesn't survive being timed again, a real slow down does
+    if regressions:
+        print("rmath_bench.main(): timing {} again, best of {} passes.".format(", ".join(regressions), RETRIES))
+
+        results, calibration = run(regressions, passes=RETRIES)
+        regressions = compare(results, baseline, threshold=options.threshold, floor=NOISE_FLOOR / calibration)
+
+    if regressions:
+        print("rmath_bench.main(): {} regressed more than {:.0%}: {}".format(len(regressions), options.threshold, ", ".join(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+''' Build a rig template without the maya gui.
+
+    Runs under mayapy, maya.standalone is started when the session doesn't have one already.
+    rigpie.ui is never imported, the built rig is saved and the build profile is written next to it.
+    The build options are passed to the template as Rig keyword arguments, a template's __init__ has
+    to pass them on with super().__init__(*args, **kwargs).
+
+    From the folder above rigpie:
+        mayapy -m rigpie.build examples.ue_mann:Ue_mann --out /builds/ue_mann.ma
+        mayapy -m rigpie.build rigpie.templates.prop:Prop --out /builds/prop.mb --report /builds/prop_build.json
+'''
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+
+
+# CONSTANTS
+FILE_TYPES = {'.ma': "mayaAscii", '.mb': "mayaBinary"}
+BLOCKED_MODULES = ("rigpie.ui", "rigpie.ui.util", "rigpie.pylib.mayaQt") # qt modules that can't load in a batch session
+
+
+def initializeMaya():
+    ''' start maya.standalone unless maya is already running, returns True when it was started here '''
+
+    import maya.cmds as cmds
+
+    if hasattr(cmds, "about"):
+        return False
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    return True
+
+def blockUiModules():
+    ''' make importing the ui modules fail straight away instead of half loading qt in batch '''
+
+    for module in BLOCKED_MODULES:
+        sys.modules.setdefault(module, None)
+
+def getRigClass(target):
+    ''' "module:Class" to the class, modules are tried as given and then inside rigpie '''
+
+    module_name, _, class_name = target.partition(":")
+    if not module_name or not class_name:
+        raise ValueError("build.getRigClass(): expected module:Class, not {}".format(target))
+
+    try:
+        module = importlib.import_module(module_name)
+    except ModuleNotFoundError:
+        if module_name.startswith("rigpie."):
+            raise
+        module = importlib.import_module("rigpie." + module_name)
+
+    return getattr(module, class_name)
+
+def buildRig(target, out, profile=True, trace=False, fast=True, profile_path=None):
+    ''' build target, save it to out and return a json friendly result '''
+
+    import maya.cmds as cmds
+
+    out = os.path.abspath(out)
+    folder = os.path.dirname(out)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    start = time.perf_counter()
+
+    rig_class = getRigClass(target)
+
+    # rigs that build in __init__ get these before they start
+    rig = rig_class(profileBuild=profile, traceCmds=trace, profile_path=profile_path or folder, fastBuild=fast)
+    if rig.build_time is None:
+        rig.buildAll()
+
+    cmds.file(rename=out)
+    cmds.file(save=True, type=FILE_TYPES.get(os.path.splitext(out)[1].lower(), "mayaAscii"), force=True)
+
+    return {
+        'target': target,
+        'out': out,
+        'seconds': time.perf_counter() - start,
+        'build_seconds': rig.build_time,
+        'profile_files': rig.profile_files,
+    }
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="rigpie.build", description="build a rig template in mayapy")
+    parser.add_argument("target", help="module:Class of the rig template, ex: examples.ue_mann:Ue_mann")
+    parser.add_argument("--out", required=True, help="maya file to save the rig to, .ma or .mb")
+    parser.add_argument("--report", help="json file for the build result, written on failure too")
+    parser.add_argument("--profile-path", help="folder for the build profile, the --out folder by default")
+    parser.add_argument("--no-profile", action="store_true", help="don't profile the build")
+    parser.add_argument("--trace", action="store_true", help="trace every maya.cmds call as well")
+    parser.add_argument("--normal", action="store_true", help="build with undo and evaluation left as they are")
+    options = parser.parse_args(args)
+
+    blockUiModules()
+    started = initializeMaya()
+
+    try:
+        result = buildRig(options.target,
+                          options.out,
+                          profile=not options.no_profile,
+                          trace=options.trace,
+                          fast=not options.normal,
+                          profile_path=options.profile_path)
+        result['status'] = "ok"
+    except Exception as error:
+        traceback.print_exc()
+        result = {'target': options.target, 'out': os.path.abspath(options.out), 'status': "failed", 'error': "{}: {}".format(type(error).__name__, error)}
+
+    print("build.main(): {}".format(json.dumps(result)))
+
+    if options.report:
+        with open(options.report, "w") as handle:
+            json.dump(result, handle, indent=4)
+
+    if started:
+        import maya.standalone
+        maya.standalone.uninitialize()
+
+    return 0 if result['status'] == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,7 @@ import rigpie.pylib.rig as rig_pylib
 import rigpie.pylib.joint as joint_pylib
 import rigpie.pylib.curve as curve_pylib
 import rigpie.pylib.mayatransform as mayatransform_pylib
+import rigpie.pylib.nodenetwork as nodenetwork_pylib
 
 class Limb(Component):
     ''' FK/IK rig setup used for legs and arms '''
@@ -1489,121 +1490,130 @@ class TwoSegmentLimb(Limb):
         cmds.connectAttr(decompose_start+".outputTranslate", distance+".startPoint")
         cmds.connectAttr(decompose_end+".outputTranslate", distance+".endPoint" )
         
-        # Stretch Point Multiplier
-        stretch_point_md_name = MayaName(self.ik.name)
-        stretch_point_md_name.descriptor += "StretchPoint"
-        stretch_point_md_name.category = "MultiplyDivide"
-        stretch_point_md = cmds.createNode("multiplyDivide", n=stretch_point_md_name)
+        # scene edits and queries the network needs happen before it is recorded
+        rest_distance = cmds.getAttr(distance+".distance")
+        
+        mid_fk_offset = self.mid_fk.addTransformOffset()
+        end_fk_offset = self.end_fk.addTransformOffset()
+        
+        mid_length = cmds.getAttr(self.midJoint+".translate"+self.aimAxis)
+        end_length = cmds.getAttr(self.endJoint+".translate"+self.aimAxis)
+        
+        # the utility network is recorded and made in one go, only recorded calls go inside
+        with nodenetwork_pylib.record(component=self.name):
+            # Stretch Point Multiplier
+            stretch_point_md_name = MayaName(self.ik.name)
+            stretch_point_md_name.descriptor += "StretchPoint"
+            stretch_point_md_name.category = "MultiplyDivide"
+            stretch_point_md = nodenetwork_pylib.createNode("multiplyDivide", name=stretch_point_md_name)
 
-        # Divide the distance with its current value
-        # Stretch
-        stretch_ratio_md_name = MayaName(self.ik.name)
-        stretch_ratio_md_name.descriptor += "StretchRatio"
-        stretch_ratio_md_name.category = "MultiplyDivide"
+            # Divide the distance with its current value
+            # Stretch
+            stretch_ratio_md_name = MayaName(self.ik.name)
+            stretch_ratio_md_name.descriptor += "StretchRatio"
+            stretch_ratio_md_name.category = "MultiplyDivide"
 
-        stretch_ratio_md = cmds.createNode("multiplyDivide", n=stretch_ratio_md_name)
-        cmds.setAttr(stretch_ratio_md+".operation", 2)
+            stretch_ratio_md = nodenetwork_pylib.createNode("multiplyDivide", name=stretch_ratio_md_name)
+            nodenetwork_pylib.setAttr(stretch_ratio_md+".operation", 2)
 
-        cmds.connectAttr(stretch_point_md+".outputX", stretch_ratio_md+".input1X")
-        cmds.connectAttr(static_distance+".distance", stretch_ratio_md+".input2X")
+            nodenetwork_pylib.connectAttr(stretch_point_md+".outputX", stretch_ratio_md+".input1X")
+            nodenetwork_pylib.connectAttr(static_distance+".distance", stretch_ratio_md+".input2X")
 
-        # Compress
-        compress_ratio_md_name = MayaName(self.ik.name)
-        compress_ratio_md_name.descriptor += "CompressRatio"
-        compress_ratio_md_name.category = "MultiplyDivide"
+            # Compress
+            compress_ratio_md_name = MayaName(self.ik.name)
+            compress_ratio_md_name.descriptor += "CompressRatio"
+            compress_ratio_md_name.category = "MultiplyDivide"
 
-        compress_ratio_md = cmds.createNode("multiplyDivide", n=compress_ratio_md_name)
-        cmds.setAttr(compress_ratio_md+".operation", 2)
+            compress_ratio_md = nodenetwork_pylib.createNode("multiplyDivide", name=compress_ratio_md_name)
+            nodenetwork_pylib.setAttr(compress_ratio_md+".operation", 2)
 
-        cmds.connectAttr(stretch_point_md+".outputX", compress_ratio_md+".input1X")
-        cmds.connectAttr(distance+".distance", compress_ratio_md+".input2X")
+            nodenetwork_pylib.connectAttr(stretch_point_md+".outputX", compress_ratio_md+".input1X")
+            nodenetwork_pylib.connectAttr(distance+".distance", compress_ratio_md+".input2X")
         
-        # compress condition
-        compress_condition_name = MayaName(self.ik.name)
-        compress_condition_name.descriptor = compress_condition_name.descriptor + "Compress"
-        compress_condition_name.category = "Condition"
-        compress_condition = cmds.createNode("condition", n=compress_condition_name)
-        cmds.setAttr(compress_condition+".operation", 4) # Less than
+            # compress condition
+            compress_condition_name = MayaName(self.ik.name)
+            compress_condition_name.descriptor = compress_condition_name.descriptor + "Compress"
+            compress_condition_name.category = "Condition"
+            compress_condition = nodenetwork_pylib.createNode("condition", name=compress_condition_name)
+            nodenetwork_pylib.setAttr(compress_condition+".operation", 4) # Less than
 
-        cmds.connectAttr(distance+".distance", compress_condition+".firstTerm")
-        cmds.setAttr(compress_condition+".secondTerm", cmds.getAttr(distance+".distance"))
-        cmds.connectAttr(stretch_ratio_md+".outputX", compress_condition+".colorIfFalseR")
-        cmds.connectAttr(compress_ratio_md+".outputX", compress_condition+".colorIfTrueR")
+            nodenetwork_pylib.connectAttr(distance+".distance", compress_condition+".firstTerm")
+            nodenetwork_pylib.setAttr(compress_condition+".secondTerm", rest_distance)
+            nodenetwork_pylib.connectAttr(stretch_ratio_md+".outputX", compress_condition+".colorIfFalseR")
+            nodenetwork_pylib.connectAttr(compress_ratio_md+".outputX", compress_condition+".colorIfTrueR")
         
-        cmds.connectAttr(ikstretch_point_attr, stretch_point_md+".input1X")
-        cmds.connectAttr(distance+".distance", stretch_point_md+".input2X")
+            nodenetwork_pylib.connectAttr(ikstretch_point_attr, stretch_point_md+".input1X")
+            nodenetwork_pylib.connectAttr(distance+".distance", stretch_point_md+".input2X")
         
-        # Switch for turning on and off IKStretch
-        stretchswitch_condition_name = MayaName(self.ik.name)
-        stretchswitch_condition_name.descriptor += "StretchSwitch"
-        stretchswitch_condition_name.category = "Condition"
-        stretchswitch_condition = cmds.createNode("condition", n=stretchswitch_condition_name)
-        cmds.connectAttr(compress_condition+".outColorR",  stretchswitch_condition+".colorIfTrueR")
-        cmds.setAttr(stretchswitch_condition+".secondTerm", 1)
+            # Switch for turning on and off IKStretch
+            stretchswitch_condition_name = MayaName(self.ik.name)
+            stretchswitch_condition_name.descriptor += "StretchSwitch"
+            stretchswitch_condition_name.category = "Condition"
+            stretchswitch_condition = nodenetwork_pylib.createNode("condition", name=stretchswitch_condition_name)
+            nodenetwork_pylib.connectAttr(compress_condition+".outColorR",  stretchswitch_condition+".colorIfTrueR")
+            nodenetwork_pylib.setAttr(stretchswitch_condition+".secondTerm", 1)
 
-        fkswitch_condition_name = MayaName(self.ik.name)
-        fkswitch_condition_name.descriptor += "FkSwitchStretch"
-        fkswitch_condition_name.category = "Condition"
-        fkswitch_condition = cmds.createNode("condition", n=fkswitch_condition_name)
-        cmds.setAttr(fkswitch_condition+".secondTerm", 1)
+            fkswitch_condition_name = MayaName(self.ik.name)
+            fkswitch_condition_name.descriptor += "FkSwitchStretch"
+            fkswitch_condition_name.category = "Condition"
+            fkswitch_condition = nodenetwork_pylib.createNode("condition", name=fkswitch_condition_name)
+            nodenetwork_pylib.setAttr(fkswitch_condition+".secondTerm", 1)
         
-        # Hook up stretch switch
-        cmds.connectAttr( ik_stretch_attr, stretchswitch_condition+".ft")        
+            # Hook up stretch switch
+            nodenetwork_pylib.connectAttr( ik_stretch_attr, stretchswitch_condition+".ft")        
 
-        # Hook up fk/ik switch
-        cmds.connectAttr( self.ik_attr, fkswitch_condition+".ft")
-        cmds.connectAttr( stretchswitch_condition+".outColorR", fkswitch_condition+".colorIfTrueR" )
+            # Hook up fk/ik switch
+            nodenetwork_pylib.connectAttr( self.ik_attr, fkswitch_condition+".ft")
+            nodenetwork_pylib.connectAttr( stretchswitch_condition+".outColorR", fkswitch_condition+".colorIfTrueR" )
         
-        upper_distance_md_name = MayaName(self.ik.name)
-        upper_distance_md_name.descriptor += "UpperDistance"
-        upper_distance_md_name.category = "Multiplydivide"
-        upper_distance_md = cmds.createNode("multiplyDivide", name=upper_distance_md_name)
+            upper_distance_md_name = MayaName(self.ik.name)
+            upper_distance_md_name.descriptor += "UpperDistance"
+            upper_distance_md_name.category = "Multiplydivide"
+            upper_distance_md = nodenetwork_pylib.createNode("multiplyDivide", name=upper_distance_md_name)
         
-        # Add a stretch attr
-        attribute_pylib.add(self.component_options+".midStretch", max=None, min=None, type="float")
+            # Add a stretch attr
+            attribute_pylib.add(self.component_options+".midStretch", max=None, min=None, type="float")
         
-        # Connect attr to fk translation
-        fk_offset = self.mid_fk.addTransformOffset()
-        cmds.connectAttr(self.component_options+".midStretch", "{}.translate{}".format(fk_offset, self.aimAxis))
+            # Connect attr to fk translation
+            nodenetwork_pylib.connectAttr(self.component_options+".midStretch", "{}.translate{}".format(mid_fk_offset, self.aimAxis))
         
-        mid_stretch_pm_name = MayaName(self.midJoint)
-        mid_stretch_pm_name.descriptor += "AttrStretch"
-        mid_stretch_pm_name.category = "Plusminusaverage"
+            mid_stretch_pm_name = MayaName(self.midJoint)
+            mid_stretch_pm_name.descriptor += "AttrStretch"
+            mid_stretch_pm_name.category = "Plusminusaverage"
         
-        mid_stretch_pm = cmds.createNode("plusMinusAverage", name=mid_stretch_pm_name)
+            mid_stretch_pm = nodenetwork_pylib.createNode("plusMinusAverage", name=mid_stretch_pm_name)
         
-        cmds.connectAttr(upper_distance_md+".outputX", mid_stretch_pm+".input1D[0]")
-        cmds.connectAttr(self.component_options+".midStretch", mid_stretch_pm+".input1D[1]")        
+            nodenetwork_pylib.connectAttr(upper_distance_md+".outputX", mid_stretch_pm+".input1D[0]")
+            nodenetwork_pylib.connectAttr(self.component_options+".midStretch", mid_stretch_pm+".input1D[1]")        
         
-        cmds.connectAttr(fkswitch_condition+".outColorR", upper_distance_md+".input1X")
-        cmds.setAttr(upper_distance_md+".input2X", cmds.getAttr(self.midJoint+".translate"+self.aimAxis))
-        cmds.connectAttr(mid_stretch_pm+".output1D", self.midJoint+".translate"+self.aimAxis)
+            nodenetwork_pylib.connectAttr(fkswitch_condition+".outColorR", upper_distance_md+".input1X")
+            nodenetwork_pylib.setAttr(upper_distance_md+".input2X", mid_length)
+            nodenetwork_pylib.connectAttr(mid_stretch_pm+".output1D", self.midJoint+".translate"+self.aimAxis)
 
-        lower_distance_md_name = MayaName(self.ik.name)
-        lower_distance_md_name.descriptor += "LowerDistance"
-        lower_distance_md_name.category = "Multiplydivide"
-        lower_distance_md = cmds.createNode("multiplyDivide", name=lower_distance_md_name)
+            lower_distance_md_name = MayaName(self.ik.name)
+            lower_distance_md_name.descriptor += "LowerDistance"
+            lower_distance_md_name.category = "Multiplydivide"
+            lower_distance_md = nodenetwork_pylib.createNode("multiplyDivide", name=lower_distance_md_name)
 
 
-        # Add a stretch attr
-        attribute_pylib.add(self.component_options+".endStretch", max=None, min=None, type="float")
+            # Add a stretch attr
+            attribute_pylib.add(self.component_options+".endStretch", max=None, min=None, type="float")
         
-        # Connect attr to fk translation
-        fk_offset = self.end_fk.addTransformOffset()
-        cmds.connectAttr(self.component_options+".endStretch", "{}.translate{}".format(fk_offset, self.aimAxis))        
+            # Connect attr to fk translation
+            nodenetwork_pylib.connectAttr(self.component_options+".endStretch", "{}.translate{}".format(end_fk_offset, self.aimAxis))        
         
-        end_stretch_pm_name = MayaName(self.endJoint)
-        end_stretch_pm_name.descriptor += "AttrStretch"
-        end_stretch_pm_name.category = "Plusminusaverage"
+            end_stretch_pm_name = MayaName(self.endJoint)
+            end_stretch_pm_name.descriptor += "AttrStretch"
+            end_stretch_pm_name.category = "Plusminusaverage"
         
-        end_stretch_pm = cmds.createNode("plusMinusAverage", name=end_stretch_pm_name)
+            end_stretch_pm = nodenetwork_pylib.createNode("plusMinusAverage", name=end_stretch_pm_name)
         
-        cmds.connectAttr(lower_distance_md+".outputX", end_stretch_pm+".input1D[0]")
-        cmds.connectAttr(self.component_options+".endStretch", end_stretch_pm+".input1D[1]")
+            nodenetwork_pylib.connectAttr(lower_distance_md+".outputX", end_stretch_pm+".input1D[0]")
+            nodenetwork_pylib.connectAttr(self.component_options+".endStretch", end_stretch_pm+".input1D[1]")
         
-        cmds.connectAttr(fkswitch_condition+".outColorR", lower_distance_md+".input1X")
-        cmds.setAttr(lower_distance_md+".input2X", cmds.getAttr(self.endJoint+".translate"+self.aimAxis))
-        cmds.connectAttr(end_stretch_pm+".output1D", self.endJoint+".translate"+self.aimAxis)
+            nodenetwork_pylib.connectAttr(fkswitch_condition+".outColorR", lower_distance_md+".input1X")
+            nodenetwork_pylib.setAttr(lower_distance_md+".input2X", end_length)
+            nodenetwork_pylib.connectAttr(end_stretch_pm+".output1D", self.endJoint+".translate"+self.aimAxis)
 
         
     def createHingeControl(self):
@@ -250,7 +250,7 @@ class SplineCurve(Component):
                 
                 # Find Distance from head
                 tctrl = rmath_pylib.Vector(cmds.xform(ctrl, q=True, t=True, ws=True))
-                distArray.append((thead - tctrl).length()) 
+                distArray.append(thead.distance(tctrl)) 
                 
                 tail = ctrl
         
@@ -444,7 +444,7 @@ class SplineCurve(Component):
                 elif self.bindType == "hierarchy":
                     
                     ttweak = rmath_pylib.Vector(cmds.xform(jnt, q=True, t=True, ws=True))
-                    dist = (thead - ttweak).length()
+                    dist = thead.distance(ttweak)
                     
                     attribute_pylib.unlockAndShow(tweak.zero, ["t","r"])
                     
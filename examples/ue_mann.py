@@ -10,8 +10,8 @@ source_path = ((str(__file__)).replace(".py", "")).replace("\\", "/")
 class Ue_mann(Biped):
     ''' Unreal Engine mannequin example '''
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         
         self.skeleton_path       = source_path + "/elements/skeleton.mb"
         self.controlshape_path   = source_path + "/elements/control_shapes.mb"
@@ -20,12 +20,7 @@ class Ue_mann(Biped):
 
         self.exportRig = True
         
-        self.setup() 
-        self.registerComponents()
-
-        self.prebuild()
-        self.build()
-        self.postbuild()
+        self.buildAll()
 
 
     def registerComponents(self):
@@ -0,0 +1,202 @@
+''' Build many rig templates at once, each in its own mayapy process.
+
+    A maya session builds one rig at a time on one core, so the farm runs a pool of mayapy
+    processes through rigpie.build and gathers every result, timing and failure into one report.
+
+    From the folder above rigpie:
+        python -m rigpie.farm examples.ue_mann:Ue_mann templates.prop:Prop --out-dir /builds --workers 8
+
+    Each rig gets a folder in --out-dir with the maya file, build log, build result and profile,
+    farm_report.json sits next to them.
+'''
+
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+
+# CONSTANTS
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # folder that -m rigpie.build runs from
+REPORT_NAME = "farm_report.json"
+
+
+def findMayapy(mayapy=None):
+    ''' the mayapy to run, in order: the argument, $MAYA_LOCATION/bin, this interpreter if it is mayapy, the PATH '''
+
+    if mayapy:
+        return mayapy
+
+    maya_location = os.environ.get("MAYA_LOCATION")
+    if maya_location:
+        for name in ("mayapy", "mayapy.exe"):
+            path = os.path.join(maya_location, "bin", name)
+            if os.path.exists(path):
+                return path
+
+    if os.path.basename(sys.executable).lower().startswith("mayapy"):
+        return sys.executable
+
+    path = shutil.which("mayapy")
+    if path:
+        return path
+
+    raise RuntimeError("farm.findMayapy(): no mayapy found, pass one or set MAYA_LOCATION.")
+
+def getTarget(rig):
+    ''' "module:Class" for a rig template class or string '''
+
+    if isinstance(rig, str):
+        return rig
+
+    return "{}:{}".format(rig.__module__, rig.__qualname__)
+
+def getBuildNames(targets):
+    ''' file name for each target, the class name unless two targets share it '''
+
+    class_names = [target.rpartition(":")[2] for target in targets]
+
+    names = []
+    for target, class_name in zip(targets, class_names):
+        if class_names.count(class_name) > 1:
+            names.append(target.replace(".", "_").replace(":", "_"))
+        else:
+            names.append(class_name)
+
+    return names
+
+def runBuild(mayapy, target, out_dir, name, extension=".ma", timeout=None, arguments=()):
+    ''' build one target with rigpie.build in a new mayapy, returns its result with timing and log.
+        The rig, log, result and profile go in their own out_dir/name folder.
+    '''
+
+    build_dir = os.path.join(out_dir, name)
+    if not os.path.isdir(build_dir):
+        os.makedirs(build_dir)
+
+    out = os.path.join(build_dir, name + extension)
+    report = os.path.join(build_dir, "build.json")
+    log = os.path.join(build_dir, "build.log")
+
+    # a stale report would pass for this build's result
+    if os.path.exists(report):
+        os.remove(report)
+
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_PARENT, environment.get('PYTHONPATH')]))
+
+    command = [mayapy, "-m", "rigpie.build", target, "--out", out, "--report", report] + list(arguments)
+
+    start = time.perf_counter()
+
+    with open(log, "w") as handle:
+        try:
+            returncode = subprocess.run(command, stdout=handle, stderr=subprocess.STDOUT, cwd=PACKAGE_PARENT, env=environment, timeout=timeout).returncode
+            error = None
+        except subprocess.TimeoutExpired:
+            returncode = None
+            error = "timed out after {}s".format(timeout)
+
+    result = {'target': target, 'out': out, 'status': "failed"}
+
+    if os.path.exists(report):
+        with open(report, "r") as handle:
+            result.update(json.load(handle))
+
+    if error:
+        result['status'] = "failed"
+        result['error'] = error
+    elif returncode != 0 and 'error' not in result:
+        result['status'] = "failed"
+        result['error'] = "mayapy exited with {}, see the log".format(returncode)
+
+    result['returncode'] = returncode
+    result['process_seconds'] = time.perf_counter() - start
+    result['log'] = log
+
+    return result
+
+def buildRigs(rigs, out_dir, workers=None, mayapy=None, extension=".ma", timeout=None, arguments=()):
+    ''' Build rig template classes or "module:Class" strings in a pool of mayapy processes.
+
+        workers: processes at once, the cpu count when None
+        arguments: extra rigpie.build arguments for every build, ex: ["--trace"]
+
+        returns: the farm report, also written to out_dir
+    '''
+
+    mayapy = findMayapy(mayapy)
+
+    # a rig given twice is built once
+    targets = []
+    for rig in rigs:
+        if getTarget(rig) not in targets:
+            targets.append(getTarget(rig))
+
+    workers = workers or os.cpu_count() or 1
+
+    out_dir = os.path.abspath(out_dir)
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    start = time.perf_counter()
+
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for target, name in zip(targets, getBuildNames(targets)):
+            futures[executor.submit(runBuild, mayapy, target, out_dir, name, extension, timeout, arguments)] = target
+
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+
+            print("farm.buildRigs(): {:<8} {:>8.1f}s {}".format(result['status'], result['process_seconds'], result['target']))
+
+    # keep the order the rigs were given in
+    results.sort(key=lambda result: targets.index(result['target']))
+
+    report = {
+        'mayapy': mayapy,
+        'workers': workers,
+        'seconds': time.perf_counter() - start,
+        'built': sum(result['status'] == "ok" for result in results),
+        'failed': [result['target'] for result in results if result['status'] != "ok"],
+        'builds': results,
+    }
+
+    with open(os.path.join(out_dir, REPORT_NAME), "w") as handle:
+        json.dump(report, handle, indent=4)
+
+    print("farm.buildRigs(): {} of {} built in {:.1f}s with {} workers, report {}".format(report['built'], len(results), report['seconds'], workers, os.path.join(out_dir, REPORT_NAME)))
+
+    return report
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="rigpie.farm", description="build many rig templates in parallel mayapy processes")
+    parser.add_argument("targets", nargs="+", help="module:Class of each rig template")
+    parser.add_argument("--out-dir", required=True, help="folder for the rigs, logs, profiles and the farm report")
+    parser.add_argument("--workers", type=int, help="mayapy processes at once, the cpu count by default")
+    parser.add_argument("--mayapy", help="mayapy to run, found from MAYA_LOCATION or the PATH by default")
+    parser.add_argument("--mb", action="store_true", help="save maya binary files instead of maya ascii")
+    parser.add_argument("--timeout", type=float, help="seconds before a build is stopped and counted as failed")
+    parser.add_argument("--trace", action="store_true", help="trace maya.cmds calls in every build")
+    options = parser.parse_args(args)
+
+    report = buildRigs(options.targets,
+                       options.out_dir,
+                       workers=options.workers,
+                       mayapy=options.mayapy,
+                       extension=".mb" if options.mb else ".ma",
+                       timeout=options.timeout,
+                       arguments=["--trace"] if options.trace else [])
+
+    return 1 if report['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
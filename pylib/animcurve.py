@@ -1,6 +1,9 @@
  
 import maya.cmds as cmds
 import tempfile
+
+from rigpie.pylib.mayaname import MayaName
+
 import rigpie.pylib.mayafile as mayafile_pylib
 import rigpie.pylib.attribute as attribute_pylib
 
@@ -35,18 +38,17 @@ def exportRigAnimCurves():
     ''' dump anim curves to a temp maya scene'''
     
     anim_curves = []
-    controls = cmds.ls("*Ctrl") + cmds.ls("*Options")
+    controls = cmds.ls("*Ctrl", "*Options")
     
-    for ctrl in controls:
-        conns = cmds.listConnections(ctrl, source=True, destination=False)
-        
-        if not conns:
-            continue
-            
-        for conn in conns:
-            if "animCurve" in cmds.objectType(conn):
-                attribute_pylib.breakConnection(conn+".output")
-                anim_curves.append(conn)
+    # keep only real controls and option shapes, then query all their curves at once
+    grouped = MayaName.groupBy(controls, "category")
+    controls = grouped.get("Ctrl", []) + grouped.get("Options", [])
+    
+    conns = cmds.listConnections(controls, source=True, destination=False, type="animCurve") if controls else []
+    
+    for conn in dict.fromkeys(conns or []):
+        attribute_pylib.breakConnection(conn+".output")
+        anim_curves.append(conn)
     
     cmds.select(anim_curves)
     
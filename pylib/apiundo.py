@@ -0,0 +1,90 @@
+''' Undo for OpenMaya edits, loaded as a maya plugin by commit().
+
+    Edits made through MDGModifier, MPlug or MFnSkinCluster aren't on maya's undo queue. After
+    making one, commit(undo, redo) runs the rigpieApiUndo command, which holds the two callables
+    and runs them when the user undoes or redoes it.
+'''
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import os
+
+
+# CONSTANTS
+COMMAND_NAME = "rigpieApiUndo"
+PLUGIN_NAME = os.path.splitext(os.path.basename(__file__))[0]
+PLUGIN_PATH = os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+
+PENDING = [] # (undo, redo) waiting for the command
+
+
+def maya_useNewAPI():
+    pass
+
+
+class ApiUndoCommand(om.MPxCommand):
+    ''' Takes its callables from PENDING, an MArgList can't carry python objects '''
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+
+        self.undo = None
+        self.redo = None
+
+    @staticmethod
+    def creator():
+        return ApiUndoCommand()
+
+    def isUndoable(self):
+        return True
+
+    def doIt(self, args):
+        # maya loads this file under its plugin name, the callables are queued on the package module
+        import rigpie.pylib.apiundo as apiundo_pylib
+
+        if not apiundo_pylib.PENDING:
+            raise RuntimeError("{}: nothing to commit, call apiundo.commit().".format(COMMAND_NAME))
+
+        self.undo, self.redo = apiundo_pylib.PENDING.pop(0)
+
+    def undoIt(self):
+        self.undo()
+
+    def redoIt(self):
+        self.redo()
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(COMMAND_NAME, ApiUndoCommand.creator)
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+def loadPlugin():
+    if not cmds.pluginInfo(PLUGIN_NAME, query=True, loaded=True):
+        cmds.loadPlugin(PLUGIN_PATH, quiet=True)
+
+def commit(undo, redo):
+    ''' Put an api edit that has already been made on the undo queue as one step.
+
+        undo: callable that reverts the edit
+        redo: callable that makes it again
+
+        Does nothing while undo is off, ex: inside fastBuildMode. returns True when the step was added
+    '''
+
+    if not cmds.undoInfo(query=True, state=True):
+        return False
+
+    loadPlugin()
+
+    PENDING.append((undo, redo))
+
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        # a command that failed before doIt leaves its callables behind
+        del PENDING[:]
+
+    return True
@@ -1,75 +1,161 @@
- 
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import collections
+import contextlib
+import functools
+
+from rigpie.pylib.mayaname import MayaName
+
+import rigpie.pylib.nodenetwork as nodenetwork_pylib
+import rigpie.pylib.apiundo as apiundo_pylib
+
+
+# CONSTANTS
+CHANNELS = {
+    't': ("translateX", "translateY", "translateZ"),
+    'r': ("rotateX", "rotateY", "rotateZ"),
+    's': ("scaleX", "scaleY", "scaleZ"),
+}
+
+# plugs behind the getAttrLocks/setAttrLocks list, keyable, lock and channelBox for each in turn
+LOCK_STATE_ATTRS = (("translate", "translateX", "translateY", "translateZ"), ("rotate", "rotateX", "rotateY", "rotateZ"))
+
+# lock, keyable and channelBox of a plug, None in a plan leaves that state alone
+AttrState = collections.namedtuple("AttrState", ("lock", "keyable", "channelBox"))
+
+
+def expandAttrs(attrs):
+    ''' attribute names with t, r and s expanded to their three channels '''
+    
+    expanded = []
+    for attr in attrs:
+        expanded.extend(CHANNELS.get(attr, (attr,)))
+        
+    return expanded
+
+def getPlugs(plugs):
+    ''' MPlugs for "node.attr" strings in one selection list pass, one MPlug for each string in order.
+    
+        A selection list merges plugs it already holds, so repeated strings are only added once. Two
+        names for the same plug, ex: node.tx and node.translateX, still merge and fall back to a
+        selection list per plug.
+    '''
+    
+    plugs = [str(plug) for plug in plugs]
+    unique = list(dict.fromkeys(plugs))
+    
+    selection = om.MSelectionList()
+    for plug in unique:
+        selection.add(plug)
+    
+    if selection.length() == len(unique):
+        found = dict((plug, selection.getPlug(ii)) for ii, plug in enumerate(unique))
+    else:
+        found = {}
+        for plug in unique:
+            single = om.MSelectionList()
+            single.add(plug)
+            found[plug] = single.getPlug(0)
+    
+    return [found[plug] for plug in plugs]
+
+def getPlugStates(plugs):
+    ''' [AttrState] for "node.attr" strings, read in one OpenMaya pass instead of three getAttr queries a plug '''
+    
+    return [AttrState(plug.isLocked, plug.isKeyable, plug.isChannelBox) for plug in getPlugs(plugs)]
+
+def buildLockPlan(nodes, attrs, lock=None, keyable=None, channelBox=None):
+    ''' The state change for attrs on one or many nodes as data, ex:
+    
+        buildLockPlan(["LfArmZero", "RtArmZero"], ["t", "r", "s"], lock=True, keyable=False)
+        
+        returns: [(plug, AttrState)] to hand to applyLockPlan, plans can be added together
+    '''
+    
+    if isinstance(nodes, str):
+        nodes = [nodes]
+        
+    state = AttrState(lock, keyable, channelBox)
+    attrs = expandAttrs(attrs)
+    
+    return [("{}.{}".format(node, attr), state) for node in nodes for attr in attrs]
+
+def setPlugState(plug, state):
+    ''' set an MPlug to an AttrState, keyable first, then channelBox and lock last. returns the number of states changed '''
+    
+    changed = 0
+    
+    if state.keyable is not None and plug.isKeyable != state.keyable:
+        plug.isKeyable = state.keyable
+        changed += 1
+        
+    if state.channelBox is not None and not plug.isKeyable and plug.isChannelBox != state.channelBox:
+        plug.isChannelBox = state.channelBox
+        changed += 1
+        
+    if state.lock is not None and plug.isLocked != state.lock:
+        plug.isLocked = state.lock
+        changed += 1
+        
+    return changed
+
+def setPlugStates(plug_states):
+    for plug, state in plug_states:
+        setPlugState(plug, state)
+
+def applyLockPlan(plan):
+    ''' Set a plan from buildLockPlan in one OpenMaya pass.
+    
+        Only the states that differ from the scene are touched. Keyable is set before channelBox, which
+        only applies to non keyable plugs, and lock goes last. MDGModifier has no lock or keyable
+        operations so the plugs are set directly. While undo is on the states they had are kept and
+        the change goes on the undo queue as one step through apiundo.
+    '''
+    
+    if not plan:
+        return 0
+        
+    plugs = getPlugs([plug for plug, _ in plan])
+    if len(plugs) != len(plan):
+        raise ValueError("attribute.applyLockPlan(): {} plugs for {} plan entries".format(len(plugs), len(plan)))
+    
+    undoable = cmds.undoInfo(query=True, state=True)
+    
+    changed = 0
+    edits = [] # (plug, state before, state after) of the plugs that changed
+    for plug, (_, state) in zip(plugs, plan):
+        before = AttrState(plug.isLocked, plug.isKeyable, plug.isChannelBox) if undoable else None
+        
+        count = setPlugState(plug, state)
+        
+        if count and undoable:
+            edits.append((plug, before, AttrState(plug.isLocked, plug.isKeyable, plug.isChannelBox)))
+            
+        changed += count
+    
+    if edits:
+        apiundo_pylib.commit(undo=functools.partial(setPlugStates, [(plug, before) for plug, before, _ in reversed(edits)]),
+                             redo=functools.partial(setPlugStates, [(plug, after) for plug, _, after in edits]))
+            
+    return changed
 
 # attributes
 def lockAndHide(obj, attrs):
-    for attr in attrs:
-        if (attr == "r"):
-            cmds.setAttr( obj+".rotateX", keyable=False, lock=True )
-            cmds.setAttr( obj+".rotateY", keyable=False, lock=True )
-            cmds.setAttr( obj+".rotateZ", keyable=False, lock=True )
-        elif (attr == "t"):
-            cmds.setAttr( obj+".translateX", keyable=False, lock=True )
-            cmds.setAttr( obj+".translateY", keyable=False, lock=True )
-            cmds.setAttr( obj+".translateZ", keyable=False, lock=True )
-        elif (attr == "s"):
-            cmds.setAttr( obj+".scaleX", keyable=False, lock=True )
-            cmds.setAttr( obj+".scaleY", keyable=False, lock=True )
-            cmds.setAttr( obj+".scaleZ", keyable=False, lock=True )
-        else:
-            cmds.setAttr( obj+"."+attr, keyable=False, lock=True )
+    ''' lock and make attrs non keyable, obj can be a list of nodes '''
+    
+    applyLockPlan(buildLockPlan(obj, attrs, lock=True, keyable=False))
 
 def unlockAndShow(obj, attrs):
-    for attr in attrs:
-        if (attr == "r"):
-            cmds.setAttr( obj+".rotateX", keyable=True, lock=False )
-            cmds.setAttr( obj+".rotateY", keyable=True, lock=False )
-            cmds.setAttr( obj+".rotateZ", keyable=True, lock=False )
-        elif (attr == "t"):
-            cmds.setAttr( obj+".translateX", keyable=True, lock=False )
-            cmds.setAttr( obj+".translateY", keyable=True, lock=False )
-            cmds.setAttr( obj+".translateZ", keyable=True, lock=False )
-        elif (attr == "s"):
-            cmds.setAttr( obj+".scaleX", keyable=True, lock=False )
-            cmds.setAttr( obj+".scaleY", keyable=True, lock=False )
-            cmds.setAttr( obj+".scaleZ", keyable=True, lock=False )
-        else:
-            cmds.setAttr( obj+"."+attr, keyable=True, lock=False )            
+    applyLockPlan(buildLockPlan(obj, attrs, lock=False, keyable=True))
 
 # attributes
 def lock(obj, attrs):
-    for attr in attrs:
-        if (attr=="r"):
-            cmds.setAttr(obj+".rotateX", lock=True )
-            cmds.setAttr(obj+".rotateY", lock=True )
-            cmds.setAttr(obj+".rotateZ", lock=True )
-        elif (attr=="t"):
-            cmds.setAttr(obj+".translateX", lock=True )
-            cmds.setAttr(obj+".translateY", lock=True )
-            cmds.setAttr(obj+".translateZ", lock=True )
-        elif (attr=="s"):
-            cmds.setAttr(obj+".scaleX", lock=True )
-            cmds.setAttr(obj+".scaleY", lock=True )
-            cmds.setAttr(obj+".scaleZ", lock=True )
-        else:
-            cmds.setAttr(obj+"."+attr, lock=True )
+    applyLockPlan(buildLockPlan(obj, attrs, lock=True))
 
 def unlock(obj, attrs):
-    for attr in attrs:
-        if (attr=="r"):
-            cmds.setAttr(obj+".rotateX", lock=False )
-            cmds.setAttr(obj+".rotateY", lock=False )
-            cmds.setAttr(obj+".rotateZ", lock=False )
-        elif (attr=="t"):
-            cmds.setAttr(obj+".translateX", lock=False )
-            cmds.setAttr(obj+".translateY", lock=False )
-            cmds.setAttr(obj+".translateZ", lock=False )
-        elif (attr=="s"):
-            cmds.setAttr(obj+".scaleX", lock=False )
-            cmds.setAttr(obj+".scaleY", lock=False )
-            cmds.setAttr(obj+".scaleZ", lock=False )
-        else:
-            cmds.setAttr(obj+"."+attr, lock=False )
+    applyLockPlan(buildLockPlan(obj, attrs, lock=False))
 
 def connectInverse(source, target):
     ''' muliply source by -1 '''
@@ -87,14 +173,19 @@ def connectInverse(source, target):
     return multiply_divide
     
 def add(attr, type="long", max=1, min=0, value=0, keyable=True, niceName="", node="", lock=False, dv=None, en="" ):
-    ''' node.attr instead of separating node and attr name and it returns that value '''
+    ''' node.attr instead of separating node and attr name and it returns that value.
+    
+        Inside a nodenetwork.record() block the attribute is recorded and made with the rest of the network.
+    '''
+    
+    network = nodenetwork_pylib.ACTIVE_NETWORK
     
     attr = attr.split(".")
     if len(attr) > 1:
         node = attr[0]
         attr = attr[1]
     else:
-        if cmds.objExists(node) != True:
+        if network is None and cmds.objExists(node) != True:
             print ("Error attribute.add(): Invalid 'node' specified.\n")
             return False
         attr = attr[0]
@@ -102,6 +193,9 @@ def add(attr, type="long", max=1, min=0, value=0, keyable=True, niceName="", nod
     if dv == None:
         dv = value
         
+    if network is not None:
+        return addToNetwork(network, node, attr, type=type, max=max, min=min, value=value, keyable=keyable, niceName=niceName, lock=lock, dv=dv, en=en)
+        
     if max == None:
         max = 9223372036854775800.0
     if min == None:
@@ -127,129 +221,96 @@ def add(attr, type="long", max=1, min=0, value=0, keyable=True, niceName="", nod
     cmds.setAttr(new_attr, lock=lock)
     return new_attr
     
+def addToNetwork(network, node, attr, type="long", max=1, min=0, value=0, keyable=True, niceName="", lock=False, dv=0, en=""):
+    ''' add() recorded on a NodeNetwork, the same flags turned into createAttribute arguments '''
+    
+    # message and enum attributes never take the value, enum starts on dv
+    if type == "message":
+        return network.addAttr(node, attr, attributeType="message", lock=lock)
+    
+    if type == "enum":
+        return network.addAttr(node, attr, attributeType="enum", niceName=niceName, keyable=True, enumNames=en, defaultValue=dv, lock=lock)
+    
+    if type == "string":
+        new_attr = network.addAttr(node, attr, attributeType="string", niceName=niceName, lock=lock)
+        
+        # the default value of 0 isn't a string, the attribute is left empty like cmds.setAttr failing did
+        if isinstance(value, str):
+            network.setAttr(new_attr, value)
+            
+        return new_attr
+    
+    new_attr = network.addAttr(node, attr, attributeType=type, niceName=niceName, keyable=keyable, minValue=min, maxValue=max, defaultValue=dv, lock=lock)
+    network.setAttr(new_attr, value)
+    
+    return new_attr
+    
     
 def getAttrLocks(node):
-    ''' Given an object, check to see if the t and r attrs are locked '''
-    locks = []
+    ''' Given an object, store the keyable, lock and channel box state of its translate and rotate attrs.
     
-    # Translate Keyables
-    locks.append( cmds.getAttr(node+".translate", keyable=True) )
-    locks.append( cmds.getAttr(node+".translateX", keyable=True) )
-    locks.append( cmds.getAttr(node+".translateY", keyable=True) )
-    locks.append( cmds.getAttr(node+".translateZ", keyable=True) )
-    
-    # Translate Locks
-    locks.append( cmds.getAttr(node+".translate", lock=True) )
-    locks.append( cmds.getAttr(node+".translateX",lock=True) )
-    locks.append( cmds.getAttr(node+".translateY",lock=True) )
-    locks.append( cmds.getAttr(node+".translateZ",lock=True) )
-    
-    # Translate Channel Box visibility
-    locks.append( cmds.getAttr(node+".translate", channelBox=True) )
-    locks.append( cmds.getAttr(node+".translateX", channelBox=True) )
-    locks.append( cmds.getAttr(node+".translateY", channelBox=True) )
-    locks.append( cmds.getAttr(node+".translateZ", channelBox=True) )
-
-    # Rotation Keyables
-    locks.append( cmds.getAttr(node+".translate", keyable=True) )
-    locks.append( cmds.getAttr(node+".translateX", keyable=True) )
-    locks.append( cmds.getAttr(node+".translateY", keyable=True) )
-    locks.append( cmds.getAttr(node+".translateZ", keyable=True) )
-    
-    # Rotation Locks
-    locks.append( cmds.getAttr(node+".rotate", lock=True) )
-    locks.append( cmds.getAttr(node+".rotateX", lock=True) )
-    locks.append( cmds.getAttr(node+".rotateY", lock=True) )
-    locks.append( cmds.getAttr(node+".rotateZ", lock=True) )
+        returns: 24 bools, for translate then rotate: keyable, lock and channelBox of the compound and its xyz
+    '''
     
-
+    plugs = ["{}.{}".format(node, attr) for group in LOCK_STATE_ATTRS for attr in group]
+    states = getPlugStates(plugs)
     
-    # Rotation Channel Box visibility
-    locks.append( cmds.getAttr(node+".rotate", channelBox=True) )
-    locks.append( cmds.getAttr(node+".rotateX", channelBox=True) )
-    locks.append( cmds.getAttr(node+".rotateY", channelBox=True) )
-    locks.append( cmds.getAttr(node+".rotateZ", channelBox=True) )
+    locks = []
+    for ii in range(0, len(states), 4):
+        group = states[ii:ii+4]
+        locks.extend(state.keyable for state in group)
+        locks.extend(state.lock for state in group)
+        locks.extend(state.channelBox for state in group)
         
     return locks
     
 def setAttrLocks(node, locks):
     ''' Given an object and its lock Array set the attr locks '''
-
-    # Translate Keyables
-    cmds.setAttr( node+".translate",  keyable=locks[0] )
-    cmds.setAttr( node+".translateX", keyable=locks[1] )
-    cmds.setAttr( node+".translateY", keyable=locks[2] )
-    cmds.setAttr( node+".translateZ", keyable=locks[3] )
-    
-    # Translate Locks
-    cmds.setAttr( node+".translate",  lock=locks[4] )
-    cmds.setAttr( node+".translateX", lock=locks[5] )
-    cmds.setAttr( node+".translateY", lock=locks[6] )
-    cmds.setAttr( node+".translateZ", lock=locks[7] )
-    
-    
-    # Translate Channel Box visibility
-    # the if statement is to get rid of the annoying warning that comes up
-    if locks[0] == False: cmds.setAttr(node+".translate",  channelBox=locks[8])
-    if locks[1] == False: cmds.setAttr(node+".translateX", channelBox=locks[9])
-    if locks[2] == False: cmds.setAttr(node+".translateY", channelBox=locks[10])
-    if locks[3] == False: cmds.setAttr(node+".translateZ", channelBox=locks[11])
-
-    # Rotation Keyables
-    cmds.setAttr(node+".rotate",  keyable=locks[12])
-    cmds.setAttr(node+".rotateX", keyable=locks[13])
-    cmds.setAttr(node+".rotateY", keyable=locks[14])
-    cmds.setAttr(node+".rotateZ", keyable=locks[15])
-
-    # Rotation Locks
-    cmds.setAttr(node+".rotate",  lock=locks[16])
-    cmds.setAttr(node+".rotateX", lock=locks[17])
-    cmds.setAttr(node+".rotateY", lock=locks[18])
-    cmds.setAttr(node+".rotateZ", lock=locks[19])
-    
     
-    # Rotation Channel Box visibility
-    if locks[12] == False: cmds.setAttr(node+".rotate",  channelBox=locks[20])
-    if locks[13] == False: cmds.setAttr(node+".rotateX", channelBox=locks[21])
-    if locks[14] == False: cmds.setAttr(node+".rotateY", channelBox=locks[22])
-    if locks[15] == False: cmds.setAttr(node+".rotateZ", channelBox=locks[23])
+    plan = []
+    for ii, group in enumerate(LOCK_STATE_ATTRS):
+        offset = ii * 12
+        for jj, attr in enumerate(group):
+            plan.append(("{}.{}".format(node, attr), AttrState(locks[offset+4+jj], locks[offset+jj], locks[offset+8+jj])))
+            
+    applyLockPlan(plan)
     
     return True
     
-def connectAttr(source_attr, target_attr):
+def lockedPlugs(plug):
+    ''' the plug and any compound parent or children whose lock would block a connection '''
+    
+    plugs = [plug]
+    if plug.isChild:
+        plugs.append(plug.parent())
+    if plug.isCompound:
+        plugs.extend(plug.child(ii) for ii in range(plug.numChildren()))
+        
+    return [related for related in plugs if related.isLocked]
 
-    # if the target attr is locked unlock, connect, relock
-    if cmds.getAttr(target_attr, l=True):
-        node = target_attr.split(".")[0]
-        attr = target_attr.split(".")[1]
-        if attr in ['tx','ty','tz','rx','ry','rz','sx','sy','sz']:
-            lary = getAttrLocks(node)
-            unlockAndShow(node, ["t","r","s"])
-            cmds.connectAttr(source_attr, target_attr)
-            setAttrLocks(node, lary)
-        else:
-            cmds.setAttr(target_attr, l=False)
-            cmds.connectAttr(source_attr, target_attr)
-            cmds.setAttr(target_attr, l=True)
-    else: 
+@contextlib.contextmanager
+def unlocked(attr):
+    ''' unlock attr for the block and lock it again after, along with its locked compound parent or children '''
+    
+    plugs = lockedPlugs(getPlugs([attr])[0])
+    for plug in plugs:
+        plug.isLocked = False
+        
+    try:
+        yield
+    finally:
+        for plug in plugs:
+            plug.isLocked = True
+    
+def connectAttr(source_attr, target_attr):
+    ''' connect even if the target attr is locked, it's unlocked and relocked around the connection '''
+    
+    with unlocked(target_attr):
         cmds.connectAttr(source_attr, target_attr)
     
 def disconnectAttr(source_attr, target_attr):
 
-    # if the target attr is locked unlock, connect, relock
-    if cmds.getAttr(target_attr, l=True):
-        obj = target_attr.split(".")[0]
-        attr = target_attr.split(".")[1]
-        if attr in ['tx','ty','tz','rx','ry','rz','sx','sy','sz']:
-            lary = getAttrLocks(obj)
-            unlockAndShow(obj, ["t","r","s"])
-            cmds.disconnectAttr(source_attr, target_attr)
-            setAttrLocks(obj, lary)
-        else:
-            cmds.setAttr(target_attr, l=False)
-            cmds.disconnectAttr(source_attr, target_attr)
-            cmds.setAttr(target_attr, l=True)
-    else: 
+    with unlocked(target_attr):
         cmds.disconnectAttr(source_attr, target_attr)
 
 def breakConnection(attr):
@@ -0,0 +1,226 @@
+import maya.cmds as cmds
+
+import contextlib
+import functools
+import json
+import sys
+import time
+
+
+# CONSTANTS
+PACKAGE = __name__.split(".")[0] # frames from modules in this package are the ones calls get charged to
+EXTERNAL = "<external>" # caller for calls made from outside the package, the script editor or a user rig
+
+HIDDEN_CODES = set() # code of pass-through wrappers left out of the stacks, see hide()
+
+
+class CmdsTracer(object):
+    ''' Opt-in tracer for maya.cmds.
+
+        Every command on the module is swapped for a wrapper that charges the call to the innermost
+        rigpie function on the python stack, with a count, the time spent in maya and the shape of
+        the arguments, ex: setAttr(str, keyable=bool, lock=bool). The full rigpie stack is kept as
+        well and written in the collapsed format flamegraph.pl and speedscope read.
+
+        All the pylib and components modules share the one maya.cmds module, so wrapping it covers
+        them all. A stub cmds that makes its commands with a module __getattr__ is traced too, which
+        lets the tracer run outside of maya.
+    '''
+
+    def __init__(self, module=None):
+        object.__init__(self)
+
+        self.module = module or cmds
+
+        self.calls = {} # (caller, command): [calls, seconds]
+        self.shapes = {} # (caller, command): {argument shape: calls}
+        self.stacks = {} # "frame;frame;cmds.command": [calls, seconds]
+
+        self.commands = {}
+        self.module_getattr = None
+
+    def start(self):
+        ''' wrap every command on the module '''
+
+        module = self.module
+
+        for command in dir(module):
+            function = getattr(module, command)
+            if command.startswith("_") or not callable(function) or isinstance(function, type):
+                continue
+
+            self.commands[command] = function
+            setattr(module, command, self.traceCalls(command, function))
+
+        # stubs that build commands on demand
+        module_getattr = module.__dict__.get("__getattr__")
+        if module_getattr:
+            self.module_getattr = module_getattr
+            module.__getattr__ = self.traceGetattr(module_getattr)
+
+    def stop(self):
+        ''' put the module back, safe to call more than once '''
+
+        for command, function in self.commands.items():
+            setattr(self.module, command, function)
+
+        self.commands = {}
+
+        if self.module_getattr:
+            self.module.__getattr__ = self.module_getattr
+
+        self.module_getattr = None
+
+    def traceGetattr(self, module_getattr):
+        wrapped = {}
+
+        def getattrWrapper(name):
+            if name not in wrapped:
+                function = module_getattr(name)
+                if name.startswith("_") or not callable(function):
+                    return function
+
+                wrapped[name] = self.traceCalls(name, function)
+
+            return wrapped[name]
+
+        return getattrWrapper
+
+    def traceCalls(self, command, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(command, time.perf_counter() - start, sys._getframe(1), args, kwargs)
+
+        return wrapper
+
+    def record(self, command, seconds, frame, args, kwargs):
+        stack = callerStack(frame)
+        caller = stack[-1] if stack else EXTERNAL
+
+        key = (caller, command)
+        stats = self.calls.get(key)
+        if stats is None:
+            stats = self.calls[key] = [0, 0.0]
+            self.shapes[key] = {}
+
+        stats[0] += 1
+        stats[1] += seconds
+
+        shape = argumentShape(command, args, kwargs)
+        self.shapes[key][shape] = self.shapes[key].get(shape, 0) + 1
+
+        folded = ";".join(stack + ["cmds." + command])
+        stats = self.stacks.get(folded)
+        if stats is None:
+            stats = self.stacks[folded] = [0, 0.0]
+
+        stats[0] += 1
+        stats[1] += seconds
+
+    def report(self):
+        ''' returns [{caller, command, calls, seconds, shapes}] slowest first '''
+
+        rows = []
+        for (caller, command), (calls, seconds) in self.calls.items():
+            shapes = sorted(self.shapes[(caller, command)].items(), key=lambda item: item[1], reverse=True)
+
+            rows.append({
+                'caller': caller,
+                'command': command,
+                'calls': calls,
+                'seconds': seconds,
+                'shapes': dict(shapes),
+            })
+
+        return sorted(rows, key=lambda row: (row['seconds'], row['calls']), reverse=True)
+
+    def printReport(self, top=20):
+        rows = self.report()
+
+        total_calls = sum(row['calls'] for row in rows)
+        total_seconds = sum(row['seconds'] for row in rows)
+        print("cmdstrace.printReport(): {} cmds calls, {:.3f}s in maya".format(total_calls, total_seconds))
+
+        for row in rows[:top]:
+            print("cmdstrace.printReport(): {:>8} {:>9.3f}s  {:<20} {}".format(row['calls'], row['seconds'], row['command'], row['caller']))
+
+    def writeReport(self, path):
+        with open(path, "w") as handle:
+            json.dump(self.report(), handle, indent=4)
+
+        return path
+
+    def writeFolded(self, path, weight="time"):
+        ''' write collapsed stacks, one "frame;frame;cmds.command value" line per stack.
+            weight "time" writes microseconds, "calls" writes call counts.
+        '''
+
+        if weight not in ("time", "calls"):
+            raise ValueError("cmdstrace.writeFolded(): weight must be time or calls, not {}".format(weight))
+
+        with open(path, "w") as handle:
+            for stack, (calls, seconds) in sorted(self.stacks.items()):
+                value = int(round(seconds * 1e6)) if weight == "time" else calls
+                handle.write("{} {}\n".format(stack, value))
+
+        return path
+
+
+def callerStack(frame):
+    ''' rigpie frames from the outermost to the innermost as "module.function" names '''
+
+    stack = []
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+
+        code = frame.f_code
+        if module.startswith(PACKAGE + ".") and module != __name__ and code not in HIDDEN_CODES:
+            stack.append("{}.{}".format(module[len(PACKAGE)+1:], getattr(code, "co_qualname", code.co_name)))
+
+        frame = frame.f_back
+
+    stack.reverse()
+
+    return stack
+
+def hide(function):
+    ''' decorator for wrappers that shouldn't show up as callers, the function they call still does '''
+
+    HIDDEN_CODES.add(function.__code__)
+
+    return function
+
+def argumentShape(command, args, kwargs):
+    ''' ex: setAttr(str, float, keyable=bool), lists and tuples carry their length '''
+
+    arguments = [valueShape(value) for value in args]
+    arguments += ["{}={}".format(key, valueShape(value)) for key, value in sorted(kwargs.items())]
+
+    return "{}({})".format(command, ", ".join(arguments))
+
+def valueShape(value):
+    if isinstance(value, (list, tuple)):
+        return "{}[{}]".format(type(value).__name__, len(value))
+
+    return type(value).__name__
+
+@contextlib.contextmanager
+def trace(module=None):
+    ''' trace the cmds calls made inside the block, ex:
+
+        with cmdstrace_pylib.trace() as tracer:
+            attribute_pylib.lockAndHide(node, ["t", "r", "s"])
+        tracer.printReport()
+    '''
+
+    tracer = CmdsTracer(module)
+    tracer.start()
+
+    try:
+        yield tracer
+    finally:
+        tracer.stop()
@@ -6,6 +6,7 @@ import maya.cmds as cmds
 import rigpie.pylib.attribute as attribute_pylib
 import rigpie.pylib.constraints as constraints_pylib
 import rigpie.pylib.control as control_pylib
+import rigpie.pylib.nodeindex as nodeindex_pylib
 import rigpie.pylib.xform as xform_pylib
 
 class Component(object):
@@ -34,7 +35,7 @@ class Component(object):
         self.component_options = None
         self.controls = []
 
-        self.components_dag = cmds.createNode("transform", name=self.name)
+        self.components_dag = nodeindex_pylib.createNode("transform", component=self.name, name=self.name)
         
         cmds.addAttr(self.components_dag, ln="registeredControls", dt="string")
         self.controls_attr = self.components_dag + ".registeredControls"
@@ -69,6 +70,11 @@ class Component(object):
         
         cmds.setAttr(self.controls_attr, current_controls, type="string")
         self.controls.append(control)
+        
+        nodeindex_pylib.setComponent(control.name, self.name)
+        nodeindex_pylib.setComponent(control.zero, self.name)
+        for transform in control.offset_transforms:
+            nodeindex_pylib.setComponent(transform, self.name)
 
 
     def addComponentOptions(self, ctrl):
@@ -105,17 +111,17 @@ class Component(object):
         dag_group_name = MayaName(self.name)
         dag_group_name.category = "Dag"
         dag_group_name.descriptor = dag_group_name.descriptor+"Controls"
-        self.controls_dag = cmds.createNode("transform", n=str(dag_group_name), parent=self.components_dag)
+        self.controls_dag = nodeindex_pylib.createNode("transform", component=self.name, n=str(dag_group_name), parent=self.components_dag)
 
         dag_group_name = MayaName(self.name)
         dag_group_name.category = "Dag"
         dag_group_name.descriptor = dag_group_name.descriptor+"Rig"
-        self.rig_dag = cmds.createNode("transform", n=str(dag_group_name), parent=self.components_dag)
+        self.rig_dag = nodeindex_pylib.createNode("transform", component=self.name, n=str(dag_group_name), parent=self.components_dag)
         
         dag_group_name = MayaName(self.name)
         dag_group_name.category = "Dag"
         dag_group_name.descriptor = dag_group_name.descriptor+"Worldspace"
-        self.worldspace_dag = cmds.createNode("transform", n=str(dag_group_name), parent=self.components_dag)
+        self.worldspace_dag = nodeindex_pylib.createNode("transform", component=self.name, n=str(dag_group_name), parent=self.components_dag)
         cmds.setAttr(self.worldspace_dag+".inheritsTransform", 0)
         
         # create visibility attrs
@@ -8,6 +8,8 @@ import maya.cmds as cmds
 import rigpie.pylib.controlshape as controlshape_pylib
 import rigpie.pylib.attribute as attribute_pylib
 import rigpie.pylib.xform as xform_pylib
+import rigpie.pylib.nodeindex as nodeindex_pylib
+import rigpie.pylib.nodenetwork as nodenetwork_pylib
 
 class Control(object):
     ''' Control object '''
@@ -51,12 +53,13 @@ class Control(object):
             all_parents = cmds.ls(node, long=True)[0].split('|')[1:-1]
             all_parents.reverse()
             
+            # parse the whole hierarchy at once and walk up to the first zero group
+            categories = MayaName.parseMany(all_parents).category
+            
             for count in range(len(all_parents)):
                 parent = all_parents[count]
                 
-                name = MayaName(parent)
-                
-                if name.category == "Zero":
+                if categories[count] == "Zero":
                     self.zero = parent
                     break
                 else:
@@ -120,11 +123,11 @@ class Control(object):
         rotateOrder = 0
         # Setup rotation order
         if self.rotationOrder == "":
-            if cmds.objExists(self.inputJoint):
+            if nodeindex_pylib.objExists(self.inputJoint):
                 rotateOrder = cmds.getAttr(self.inputJoint+".rotateOrder")
         else:
             rotOrders = ["xyz", "yzx", "zxy", "xzy", "yxz", "zyx"]
-            if cmds.objExists(self.rotationOrder):
+            if nodeindex_pylib.objExists(self.rotationOrder):
                 rotateOrder = cmds.getAttr(self.rotationOrder+".rotateOrder")
             else:
                 rotateOrder = rotOrders.index(self.rotationOrder)
@@ -135,7 +138,7 @@ class Control(object):
         
         cmds.select(cl=True)
         if self.shapeType == None:
-            control = cmds.createNode("transform", n=shape_name)
+            control = nodeindex_pylib.createNode("transform", n=shape_name)
         else:
             control = controlshape_pylib.create(shapeType=self.shapeType, type=self.type, size=self.size, name=shape_name, color=self.color, rot=self.shapeRotation, thickness=self.thickness)
 
@@ -147,32 +150,36 @@ class Control(object):
         transform_name.descriptor += description
 
         
+        # the zero and auto transforms are made and the control parented under them in one commit
+        network = nodenetwork_pylib.NodeNetwork()
+        
         for ii in range(0, self.depth):
             if ii == 0:
                 transform_name.category = "Zero"
-                tail = cmds.createNode("transform", n=str(transform_name))
+                tail = network.createNode("transform", name=str(transform_name))
                 zero = tail
                 head = tail
             elif ii == 1:
                 transform_name.category = "Auto"
-                new_transform = cmds.createNode("transform", n=str(transform_name))
-                cmds.parent(new_transform, tail)
-                self.offset_transforms.append(new_transform)
-                tail = new_transform
+                tail = network.createNode("transform", name=str(transform_name), parent=tail)
+                self.offset_transforms.append(tail)
             else:
                 transform_name.category = "Auto"
                 transform_name.instance = ii
-                new_transform = cmds.createNode("transform", n=str(transform_name))
-                self.offset_transforms.append(new_transform)
-                cmds.parent(new_transform, tail)
-                tail = new_transform
+                tail = network.createNode("transform", name=str(transform_name), parent=tail)
+                self.offset_transforms.append(tail)
                 
-            cmds.parent(control, tail)
+        if self.depth:
+            network.parent(control, tail)
+            names = network.commit()
+            
+            zero = head = names[zero]
+            self.offset_transforms = [names[transform] for transform in self.offset_transforms]
 
         # Matrix can be either a maya node or a list of 16 floats
         if isinstance(self.matrix, Transform):
             cmds.xform(head, m=list(self.matrix), worldSpace=True)
-        elif cmds.objExists(self.matrix):
+        elif nodeindex_pylib.objExists(self.matrix):
             xform_pylib.align(head, self.matrix)
 
         # Set parent
@@ -200,7 +207,7 @@ class Control(object):
         cmds.setAttr(control+".rotateOrder", rotateOrder)
             
         self.zero = zero
-        self.shape = cmds.listRelatives(control, s=1)[0]
+        self.shape = nodeindex_pylib.listShapes(control)[0]
         
         # tag the shape as a control shape for import/export
         tagAsControlShape(self.shape)
@@ -228,7 +235,7 @@ class Control(object):
                 last_transform_name.instance = "1"
             transform_parent = self.offset_transforms[0]
         
-        transform_offset = cmds.createNode("transform", name=last_transform_name, parent=transform_parent)
+        transform_offset = nodeindex_pylib.createNode("transform", name=last_transform_name, parent=transform_parent)
         self.offset_transforms = [transform_offset] + self.offset_transforms
         xform_pylib.align(transform_offset, self.name)
         
@@ -344,12 +351,12 @@ def importShapes(filename, relative=True):
             
         current_control = ss.replace( "nurbs", "" )
         # Delete the old shape
-        if cmds.objExists( current_control ):
-            oldshapes = cmds.listRelatives( current_control, s=True )
+        if nodeindex_pylib.objExists( current_control ):
+            oldshapes = nodeindex_pylib.listShapes( current_control )
             
-            for os in oldshapes:
-                if not (isComponentOptions(os)):
-                    cmds.delete(os)
+            for oldshape in oldshapes:
+                if not (isComponentOptions(oldshape)):
+                    cmds.delete(oldshape)
                 
             spans = cmds.getAttr(ss+".spans")
             degrees = cmds.getAttr(ss+".degree")
@@ -370,7 +377,9 @@ def importShapes(filename, relative=True):
                 for ii, position in enumerate(pa):
                     cmds.xform("{}.cv[{}]".format(nshape, ii), ws=1, t=position)
                     
-            cmds.rename(nshape, nshape.replace( "CtrlnurbsShape", "CtrlShape") )
+            # the imported shape stays, the rest of the import is deleted below
+            nshape = cmds.rename(nshape, nshape.replace( "CtrlnurbsShape", "CtrlShape") )
+            nodeindex_pylib.register(nshape, "nurbsCurve", parent=current_control)
             
     cmds.delete( main )
 
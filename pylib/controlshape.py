@@ -7,6 +7,7 @@ from rigpie.pylib.mayaname import MayaName
 
 import rigpie.pylib.rmath as rmath_pylib
 import rigpie.pylib.xform as xform_pylib
+import rigpie.pylib.nodeindex as nodeindex_pylib
 
 
 # CONSTANTS
@@ -82,10 +83,10 @@ def create(shapeType="cube", type="transform", size=1.0, name="custom", color="y
     
     # create transform
     if type=="joint":
-        newnode = cmds.joint( n=name )
+        newnode = nodeindex_pylib.register(cmds.joint( n=name ), "joint")
         cmds.setAttr(newnode+".drawStyle", 2)
     else:
-        newnode = cmds.createNode("transform", n=name)
+        newnode = nodeindex_pylib.createNode("transform", n=name)
 
     # create shape
     if shapeType == "cube":
@@ -162,6 +163,7 @@ def create(shapeType="cube", type="transform", size=1.0, name="custom", color="y
 
     cmds.rename( tmpshape, shape )        
     cmds.parent( shape, newnode, r=True, s=True )
+    nodeindex_pylib.register(shape, "nurbsCurve", parent=newnode)
         
     # rename and set the color
     cmds.setAttr( shape+".overrideEnabled", 1 )
@@ -6,6 +6,7 @@ from rigpie.pylib.rmath import Vector
 import rigpie.pylib.attribute as attribute_pylib
 import rigpie.pylib.xform as xform_pylib
 import rigpie.pylib.skincluster as skincluster_pylib
+import rigpie.pylib.nodenetwork as nodenetwork_pylib
 
 def getParameterClosestCurve(node, curve):
     ''' Return the curve parameter that is closest in worldspace to the node '''
@@ -182,8 +183,9 @@ def createNodesAlongCurve(curve, orientTarget, count, name="CnCurveJnt", type="j
     # inverse the aim vector since we're making nodes from end to front
     aimVector = [aimVector[0] * -1, aimVector[1] * -1, aimVector[2] * -1]
     
+    max_parameter = cmds.getAttr(curve + ".mmv.max")
+    
     for ii in range(count-1, -1, -1):
-        max_parameter = cmds.getAttr(curve + ".mmv.max")
         pos_val = cmds.pointOnCurve(curve, parameter=(max_parameter/float(count-1) * float(ii))) 
         
         if rail:
@@ -249,61 +251,64 @@ def enableStretchyMotionPath(stretchAttr, curve, motionPaths):
     curve_info = cmds.arclen(curve, constructionHistory=True)
     curve_info = cmds.rename(curve_info, curve_info_name)
     length = cmds.getAttr( curve_info + ".arcLength" )
-    
-    # Length stretch difference
-    curve_difference_name = MayaName(curve)
-    curve_difference_name.category = "Plusminusaverage"
-    curve_difference = cmds.createNode("plusMinusAverage", name=curve_difference_name)
-    cmds.setAttr(curve_difference+".operation", 2)
-    cmds.connectAttr(curve_info+".arcLength", curve_difference+".input1D[0]")
-    cmds.setAttr(curve_difference+".input1D[1]", length)
-    
-    # flip switch value
-    invert_switch_name = MayaName(curve)
-    invert_switch_name.descriptor += "InvertSwitch"
-    invert_switch_name.category = "Plusminusaverage"
-    invert_switch = cmds.createNode("plusMinusAverage", name=invert_switch_name)
-    cmds.setAttr(invert_switch+".operation", 2)
-    cmds.connectAttr(stretchAttr, invert_switch+".input1D[1]")
-    cmds.setAttr(invert_switch+".input1D[0]", 1)
+    u_values = [cmds.getAttr(motionPath+".uValue") for motionPath in motionPaths]
+    
+    # the utility network is recorded and made in one go, queries happen before it
+    with nodenetwork_pylib.record():
+        # Length stretch difference
+        curve_difference_name = MayaName(curve)
+        curve_difference_name.category = "Plusminusaverage"
+        curve_difference = nodenetwork_pylib.createNode("plusMinusAverage", name=curve_difference_name)
+        nodenetwork_pylib.setAttr(curve_difference+".operation", 2)
+        nodenetwork_pylib.connectAttr(curve_info+".arcLength", curve_difference+".input1D[0]")
+        nodenetwork_pylib.setAttr(curve_difference+".input1D[1]", length)
+    
+        # flip switch value
+        invert_switch_name = MayaName(curve)
+        invert_switch_name.descriptor += "InvertSwitch"
+        invert_switch_name.category = "Plusminusaverage"
+        invert_switch = nodenetwork_pylib.createNode("plusMinusAverage", name=invert_switch_name)
+        nodenetwork_pylib.setAttr(invert_switch+".operation", 2)
+        nodenetwork_pylib.connectAttr(stretchAttr, invert_switch+".input1D[1]")
+        nodenetwork_pylib.setAttr(invert_switch+".input1D[0]", 1)
 
-    # stretch switch
-    stretch_switch_name = MayaName(curve)
-    stretch_switch_name.descriptor += "Switch"
-    stretch_switch_name.category = "Multiplydivide"
-    stretch_switch = cmds.createNode("multiplyDivide", name=stretch_switch_name)
+        # stretch switch
+        stretch_switch_name = MayaName(curve)
+        stretch_switch_name.descriptor += "Switch"
+        stretch_switch_name.category = "Multiplydivide"
+        stretch_switch = nodenetwork_pylib.createNode("multiplyDivide", name=stretch_switch_name)
         
-    cmds.connectAttr(curve_difference+".output1D", stretch_switch+".input1X")
-    cmds.connectAttr(invert_switch+".output1D", stretch_switch+".input2X")
-    
-    # add switched difference to original
-    curve_sum_name = MayaName(curve)
-    curve_sum_name.category = "Plusminusaverage"
-    curve_sum = cmds.createNode("plusMinusAverage", name=curve_sum_name)
-    cmds.connectAttr(stretch_switch+".outputX", curve_sum+".input1D[0]")
-    cmds.setAttr(curve_sum+".input1D[1]", length)
+        nodenetwork_pylib.connectAttr(curve_difference+".output1D", stretch_switch+".input1X")
+        nodenetwork_pylib.connectAttr(invert_switch+".output1D", stretch_switch+".input2X")
+    
+        # add switched difference to original
+        curve_sum_name = MayaName(curve)
+        curve_sum_name.category = "Plusminusaverage"
+        curve_sum = nodenetwork_pylib.createNode("plusMinusAverage", name=curve_sum_name)
+        nodenetwork_pylib.connectAttr(stretch_switch+".outputX", curve_sum+".input1D[0]")
+        nodenetwork_pylib.setAttr(curve_sum+".input1D[1]", length)
 
-    # stretch ratio
-    stretch_ratio_name = MayaName(curve)
-    stretch_ratio_name.descriptor += "Ratio"
-    stretch_ratio_name.category = "Multiplydivide"
-    stretch_ratio = cmds.createNode("multiplyDivide", name=stretch_ratio_name)
-    cmds.setAttr(stretch_ratio+".operation", 2)
-    
-    cmds.setAttr(stretch_ratio+".input1X", length)
-    cmds.connectAttr(curve_sum+".output1D", stretch_ratio+".input2X")
-    
-    for motionPath in motionPaths:
-    
-        # multiplier
-        stretch_multiplier_name = MayaName(curve)
-        stretch_multiplier_name.category = "Multiplydivide"
-        stretch_multiplier = cmds.createNode("multiplyDivide", name=stretch_multiplier_name)
+        # stretch ratio
+        stretch_ratio_name = MayaName(curve)
+        stretch_ratio_name.descriptor += "Ratio"
+        stretch_ratio_name.category = "Multiplydivide"
+        stretch_ratio = nodenetwork_pylib.createNode("multiplyDivide", name=stretch_ratio_name)
+        nodenetwork_pylib.setAttr(stretch_ratio+".operation", 2)
+    
+        nodenetwork_pylib.setAttr(stretch_ratio+".input1X", length)
+        nodenetwork_pylib.connectAttr(curve_sum+".output1D", stretch_ratio+".input2X")
+    
+        for motionPath, u_value in zip(motionPaths, u_values):
+    
+            # multiplier
+            stretch_multiplier_name = MayaName(curve)
+            stretch_multiplier_name.category = "Multiplydivide"
+            stretch_multiplier = nodenetwork_pylib.createNode("multiplyDivide", name=stretch_multiplier_name)
         
-        cmds.setAttr(stretch_multiplier+".input1X", cmds.getAttr(motionPath+".uValue"))
-        cmds.connectAttr(stretch_ratio+".outputX", stretch_multiplier+".input2X")
+            nodenetwork_pylib.setAttr(stretch_multiplier+".input1X", u_value)
+            nodenetwork_pylib.connectAttr(stretch_ratio+".outputX", stretch_multiplier+".input2X")
         
-        cmds.connectAttr(stretch_multiplier+".outputX", motionPath+".uValue")
+            nodenetwork_pylib.connectAttr(stretch_multiplier+".outputX", motionPath+".uValue")
     
     return curve_info
 
@@ -467,7 +472,7 @@ def createSplineDriver(name, curve, extrude_curve, joints, skinclusterSmoothIter
     cmds.select(joints)
     skincluster = cmds.skinCluster(driver, joints, toSelectedBones=True, ignoreHierarchy=True)[0]
     
-    skincluster_pylib.smoothFlood(driver, iterations=skinclusterSmoothIterations)
+    skincluster_pylib.smoothWeights(driver, iterations=skinclusterSmoothIterations)
     
     cmds.delete(extrude_curve)
     
@@ -14,4 +14,43 @@ def flattenlist(array):
             flattened_list.append("{}.vtx{}".format(node, ids))
             
     return flattened_list
+
+def getVertexIndices(components):
+    ''' Return the vertex indices from a list of vertex strings, handles both flattened and ranged components. '''
+    indices = []
+    for item in components:
+        if ".vtx[" not in item:
+            continue
+            
+        ids = item.split(".vtx[")[-1].rstrip("]")
+        
+        if ":" in ids:
+            start, end = ids.split(":")
+            indices.extend(range(int(start), int(end)+1))
+        else:
+            indices.append(int(ids))
+            
+    return indices
+
+def vertexRanges(node, indices):
+    ''' Compress vertex indices into as few node.vtx[start:end] strings as possible. '''
+    ranges = []
+    
+    indices = sorted(set(int(ii) for ii in indices))
+    if not indices:
+        return ranges
     
+    start = previous = indices[0]
+    for index in indices[1:] + [None]:
+        if index is not None and index == previous + 1:
+            previous = index
+            continue
+            
+        if start == previous:
+            ranges.append("{}.vtx[{}]".format(node, start))
+        else:
+            ranges.append("{}.vtx[{}:{}]".format(node, start, previous))
+            
+        start = previous = index
+        
+    return ranges
@@ -1,7 +1,25 @@
  
 
+import collections
+import functools
+import re
+import sys
+
+import numpy as np
+
 import maya.cmds as cmds
 
+
+# CONSTANTS
+NAME_FIELDS = ('side', 'descriptor', 'iterator', 'category', 'instance')
+
+# side, descriptor, iterator digits, category from the last capital letter, instance digits
+NAME_PATTERN = re.compile(r"(.[^\d])(.*?)(\d*)([A-Z](?:[^A-Z]*[^A-Z\d])?)()$")
+INSTANCE_NAME_PATTERN = re.compile(r"(.[^\d])(.*?)(\d*)([A-Z][^A-Z]*[^\d])(\d+)$")
+
+ParsedName = collections.namedtuple("ParsedName", NAME_FIELDS)
+
+
 class MayaName(object):
     ''' Class for naming things consistently.
     
@@ -19,75 +37,162 @@ class MayaName(object):
     def __init__(self,*args):
         object.__init__(self)
 
-        self.side = "Cn"
-        self.descriptor = "Default"
-        self.iterator = "" # Optional
-        self.category = "Ctrl"
-        self.instance = ""  # Optional
-
+        if args and isinstance(args[0], str):
+            self.setFields(*MayaName.parse(args[0]))
+            return
+        
         if args:
-            if isinstance(args[0], str):
-                self.setNameFromString(*args)
-            else:
-                self.side = args[0].side
-                self.descriptor = args[0].descriptor
-                self.iterator = args[0].iterator
-                self.category = args[0].category
-                self.instance = args[0].instance
+            self.setFields(args[0].side, args[0].descriptor, args[0].iterator, args[0].category, args[0].instance)
+        else:
+            self.setFields("Cn", "Default", "", "Ctrl", "") # iterator and instance are optional
             
+    def setFields(self, side, descriptor, iterator, category, instance):
+        ''' set all five fields at once, writes straight to the instance dict to skip __setattr__ '''
         
-    def setNameFromString(self, *args):
-        '''Given a string, fill out a name class '''
+        fields = self.__dict__
+        fields['side'] = side
+        fields['descriptor'] = descriptor
+        fields['iterator'] = iterator
+        fields['category'] = category
+        fields['instance'] = instance
+        fields['_string'] = None
         
-        self.side = args[0][0] + args[0][1]
-        string_arg = args[0]
+    def __setattr__(self, attr, value):
+        object.__setattr__(self, attr, value)
         
-        iterator_index = None
-        category_index = None
-        instance_index = None
+        # any field change invalidates the cached string
+        if attr in NAME_FIELDS:
+            object.__setattr__(self, '_string', None)
+            
+    @staticmethod
+    @functools.lru_cache(maxsize=16384)
+    def parse(name):
+        ''' Split a name string into an immutable ParsedName(side, descriptor, iterator, category, instance).
         
-        iterator = False
-        instance = False
+            Results are cached and their strings interned, so the handful of names a build keeps
+            reparsing only go through the regex once.
+        '''
         
-        if string_arg[-1].isdigit():
-            instance = True
-            
-        for ii in range(len(string_arg)-1, -1, -1):
-            if instance and (not string_arg[ii].isdigit() and (not category_index) and (not instance_index)):
-                instance_index = ii
-                continue
-        
-            if (string_arg[ii].isupper()) and (not category_index):
-                category_index = ii
-                continue
-            
-            if not instance:
-                if string_arg[ii].isdigit() and category_index:
-                    iterator = True
-                
-                if not string_arg[ii].isdigit() and category_index:
-                    iterator_index = ii
-                    break
+        match = None
+        if name.isascii():
+            if name[-1:].isdigit():
+                match = INSTANCE_NAME_PATTERN.match(name)
             else:
-                if string_arg[ii].isdigit() and category_index and instance_index:
-                    iterator = True
-            
-                if not string_arg[ii].isdigit() and category_index and instance_index:
-                    iterator_index = ii
-                    break
+                match = NAME_PATTERN.match(name)
         
-        if instance:
-            self.instance = string_arg[instance_index+1:len(string_arg)+1]        
-            self.category = string_arg[category_index:instance_index+1]
+        if match:
+            fields = match.groups()
         else:
-            self.category = string_arg[category_index:len(string_arg)+1]
+            fields = parseNameFromString(name)
+        
+        return ParsedName._make(map(sys.intern, fields))
+        
+    @staticmethod
+    def parseMany(names):
+        ''' Parse a list of names into columns.
+        
+            returns: ParsedName of numpy string arrays, one entry per name, so a whole scene can be
+                     filtered at once, ex: names[parsed.side == "Lf"]
+        '''
+        
+        columns = list(zip(*map(MayaName.parse, names))) or [()] * len(NAME_FIELDS)
+        
+        return ParsedName._make(np.array(column, dtype=str) for column in columns)
+        
+    @staticmethod
+    def groupBy(names, field):
+        ''' {field value: [names]} in the order the names were given, field is one of NAME_FIELDS '''
+        
+        if field not in NAME_FIELDS:
+            raise ValueError("MayaName.groupBy(): field {} is not one of {}".format(field, NAME_FIELDS))
+        
+        index = NAME_FIELDS.index(field)
+        
+        groups = {}
+        for name in names:
+            groups.setdefault(MayaName.parse(name)[index], []).append(name)
             
-        if iterator:
-            self.iterator = string_arg[iterator_index+1:category_index]
-            self.descriptor = string_arg[2:iterator_index+1]
-        else:
-            self.descriptor = string_arg[2:category_index]
+        return groups
+        
+    @staticmethod
+    def select(names, **fields):
+        ''' names whose fields match every keyword, ex: select(cmds.ls("*Ctrl"), side="Lf") '''
+        
+        names = list(names)
+        if not names:
+            return []
+        
+        parsed = MayaName.parseMany(names)
+        
+        mask = np.ones(len(names), dtype=bool)
+        for field, value in fields.items():
+            mask &= getattr(parsed, field) == value
+            
+        return [name for name, keep in zip(names, mask) if keep]
+        
+    def setNameFromString(self, *args):
+        '''Given a string, fill out a name class '''
+        
+        self.setFields(*MayaName.parse(args[0]))
     
     def __str__(self):
-        return "{0}{1}{2}{3}{4}".format(self.side, self.descriptor, self.iterator, self.category, self.instance)
-        
\ No newline at end of file
+        if self._string is None:
+            object.__setattr__(self, '_string', "{0}{1}{2}{3}{4}".format(self.side, self.descriptor, self.iterator, self.category, self.instance))
+            
+        return self._string
+
+
+def parseNameFromString(string_arg):
+    ''' Character scan used for names the MayaName patterns don't cover, returns the five name fields '''
+    
+    side = string_arg[0] + string_arg[1]
+    instance_string = ""
+    iterator_string = ""
+
+    iterator_index = None
+    category_index = None
+    instance_index = None
+
+    iterator = False
+    instance = False
+
+    if string_arg[-1].isdigit():
+        instance = True
+
+    for ii in range(len(string_arg)-1, -1, -1):
+        if instance and (not string_arg[ii].isdigit() and (not category_index) and (not instance_index)):
+            instance_index = ii
+            continue
+
+        if (string_arg[ii].isupper()) and (not category_index):
+            category_index = ii
+            continue
+
+        if not instance:
+            if string_arg[ii].isdigit() and category_index:
+                iterator = True
+
+            if not string_arg[ii].isdigit() and category_index:
+                iterator_index = ii
+                break
+        else:
+            if string_arg[ii].isdigit() and category_index and instance_index:
+                iterator = True
+
+            if not string_arg[ii].isdigit() and category_index and instance_index:
+                iterator_index = ii
+                break
+
+    if instance:
+        instance_string = string_arg[instance_index+1:len(string_arg)+1]        
+        category = string_arg[category_index:instance_index+1]
+    else:
+        category = string_arg[category_index:len(string_arg)+1]
+
+    if iterator:
+        iterator_string = string_arg[iterator_index+1:category_index]
+        descriptor = string_arg[2:iterator_index+1]
+    else:
+        descriptor = string_arg[2:category_index]
+
+    return (side, descriptor, iterator_string, category, instance_string)
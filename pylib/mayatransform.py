@@ -4,6 +4,7 @@ import maya.cmds as cmds
 from rigpie.pylib.rmath import Transform
 
 import rigpie.pylib.xform as xform_pylib
+import rigpie.pylib.nodeindex as nodeindex_pylib
 
 def getTransformLimitLists (node):
     ''' get a list of the value lists and the enabled lists '''
@@ -41,19 +42,19 @@ def createLocator(name="locator1", size=1, parent="", matrix=None):
     ''' Create a maya space locator with certain parameters '''
     
     # locator
-    locator = cmds.spaceLocator(name=name)[0]
+    locator = nodeindex_pylib.register(cmds.spaceLocator(name=name)[0], "transform")
     
     # size
     cmds.setAttr(locator+".localScale", size, size, size, type="float3")
     
     # parent
-    if cmds.objExists(parent):
+    if nodeindex_pylib.objExists(parent):
         cmds.parent(locator, parent)
     
     # align
     if isinstance(matrix, Transform):
         cmds.xform(locator, m=list(matrix), worldSpace=True)
-    elif matrix and cmds.objExists(matrix):
+    elif matrix and nodeindex_pylib.objExists(matrix):
         xform_pylib.align(locator, matrix)
     
     return locator
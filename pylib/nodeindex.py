@@ -0,0 +1,151 @@
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+
+# CONSTANTS
+ACTIVE_INDEX = None # NodeIndex for the build in progress, None outside of a build
+
+
+class NodeIndex(object):
+    ''' Build scoped record of every node the rigpie helpers create.
+
+        Nodes are keyed by name with their type and component, so a lookup for a node the build just
+        made doesn't have to query the scene. Shapes registered with their parent transform are kept
+        per transform as well. Renames and deletes are tracked with maya callbacks while the index is
+        active. Only what was registered is known, a miss still means asking the scene.
+    '''
+
+    def __init__(self):
+        object.__init__(self)
+
+        self.nodes = {} # name: {'type', 'component', 'parent'}
+        self.shapes = {} # transform name: [shape names]
+        self.callbacks = []
+
+    def start(self):
+        ''' listen for renames and deletes '''
+
+        self.callbacks.append(om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved, "dependNode"))
+        self.callbacks.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), self.nameChanged))
+
+    def stop(self):
+        if self.callbacks:
+            om.MMessage.removeCallbacks(self.callbacks)
+
+        self.callbacks = []
+
+    def add(self, node, nodeType, component=None, parent=None):
+        ''' register a node, names with a path aren't unique so they are left to the scene.
+            parent is the transform of a shape.
+        '''
+
+        if not node or "|" in node:
+            return
+
+        self.remove(node)
+
+        self.nodes[node] = {'type': nodeType, 'component': component, 'parent': parent}
+
+        if parent:
+            self.shapes.setdefault(parent, []).append(node)
+
+    def setComponent(self, node, component):
+        if node in self.nodes:
+            self.nodes[node]['component'] = component
+
+    def remove(self, node):
+        record = self.nodes.pop(node, None)
+
+        if record and record['parent'] in self.shapes:
+            self.shapes[record['parent']].remove(node)
+
+    def rename(self, node, newName):
+        record = self.nodes.get(node)
+
+        if record is not None:
+            self.remove(node)
+            self.add(newName, record['type'], record['component'], parent=record['parent'])
+
+        # shapes follow their transform
+        shapes = self.shapes.pop(node, None)
+        if shapes:
+            for shape in shapes:
+                self.nodes[shape]['parent'] = newName
+
+            self.shapes[newName] = shapes
+
+    def exists(self, node):
+        return node in self.nodes
+
+    def nodeType(self, node):
+        record = self.nodes.get(node)
+
+        return record['type'] if record else None
+
+    def listShapes(self, node):
+        ''' registered shapes of a transform, None when none were registered '''
+
+        return list(self.shapes[node]) if self.shapes.get(node) else None
+
+    def nodeRemoved(self, node, *args):
+        self.remove(om.MFnDependencyNode(node).name())
+
+    def nameChanged(self, node, previousName, *args):
+        if previousName in self.nodes or previousName in self.shapes:
+            self.rename(previousName, om.MFnDependencyNode(node).name())
+
+
+def begin():
+    ''' start a fresh index for a build, replacing any index left over from a failed build '''
+
+    global ACTIVE_INDEX
+
+    end()
+
+    ACTIVE_INDEX = NodeIndex()
+    ACTIVE_INDEX.start()
+
+    return ACTIVE_INDEX
+
+def end():
+    ''' stop tracking, lookups go back to querying the scene '''
+
+    global ACTIVE_INDEX
+
+    if ACTIVE_INDEX:
+        ACTIVE_INDEX.stop()
+
+    ACTIVE_INDEX = None
+
+def register(node, nodeType, component=None, parent=None):
+    if ACTIVE_INDEX:
+        ACTIVE_INDEX.add(node, nodeType, component=component, parent=parent)
+
+    return node
+
+def setComponent(node, component):
+    if ACTIVE_INDEX:
+        ACTIVE_INDEX.setComponent(str(node), component)
+
+def createNode(nodeType, component=None, **kwargs):
+    ''' cmds.createNode that registers the new node with the active index '''
+
+    return register(cmds.createNode(nodeType, **kwargs), nodeType, component=component)
+
+def objExists(node):
+    ''' cmds.objExists that answers from the active index when it can '''
+
+    if ACTIVE_INDEX and isinstance(node, str) and ACTIVE_INDEX.exists(node):
+        return True
+
+    return cmds.objExists(node)
+
+def listShapes(node):
+    ''' cmds.listRelatives(node, shapes=True) that answers from the active index when it can, returns a list '''
+
+    if ACTIVE_INDEX and isinstance(node, str):
+        shapes = ACTIVE_INDEX.listShapes(node)
+        if shapes:
+            return shapes
+
+    return cmds.listRelatives(node, shapes=True) or []
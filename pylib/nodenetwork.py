@@ -0,0 +1,386 @@
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import contextlib
+import functools
+
+import rigpie.pylib.apiundo as apiundo_pylib
+import rigpie.pylib.nodeindex as nodeindex_pylib
+
+
+# CONSTANTS
+ACTIVE_NETWORK = None # NodeNetwork being recorded, None when createNode/connectAttr/setAttr go straight to cmds
+
+INTEGER_TYPES = (om.MFnNumericData.kByte, om.MFnNumericData.kChar, om.MFnNumericData.kShort, om.MFnNumericData.kInt, om.MFnNumericData.kInt64)
+
+# cmds.addAttr attributeType names that addAttr can record
+NUMERIC_ATTRIBUTE_TYPES = {
+    'bool': om.MFnNumericData.kBoolean,
+    'byte': om.MFnNumericData.kByte,
+    'short': om.MFnNumericData.kShort,
+    'long': om.MFnNumericData.kInt,
+    'float': om.MFnNumericData.kFloat,
+    'double': om.MFnNumericData.kDouble,
+}
+
+
+class NodeNetwork(object):
+    ''' In memory description of nodes, connections and values, committed in bulk.
+
+        Recording a createNode, parent, addAttr, connectAttr or setAttr only stores it, so the names
+        handed back don't exist in the scene until commit. Inside a record() block, query only nodes
+        that existed before it. Commit creates every node through one MDagModifier and one MDGModifier,
+        then adds the attributes and makes every connection and value through a few more modifiers.
+        While undo is on the whole commit is one undo step, inside fastBuildMode undo is already off
+        and nothing is kept for it.
+
+        A name that is already recorded gets a number added the way maya would, the names given
+        back are the ones the nodes end up with unless the scene already has a node by that name.
+        names maps the returned names to the scene names after commit.
+    '''
+
+    def __init__(self, component=None):
+        object.__init__(self)
+
+        self.component = component
+
+        self.nodes = {} # name: (nodeType, parent)
+        self.parents = [] # (node, parent)
+        self.attributes = [] # (node, longName, createAttribute kwargs)
+        self.connections = [] # (source plug, destination plug, force)
+        self.values = [] # (plug, value)
+        self.locks = [] # plugs locked after the values are set
+
+        self.objects = {} # name: MObject, filled in by commit
+        self.names = {} # recorded name: scene name, filled in by commit
+
+        self.modifiers = [] # every modifier commit ran, in order
+        self.locked_plugs = []
+
+    def createNode(self, nodeType, name=None, parent=None):
+        name = str(name) if name else "{}#{}".format(nodeType, len(self.nodes))
+
+        if name in self.nodes:
+            base = name.rstrip("0123456789")
+            instance = 1
+            while "{}{}".format(base, instance) in self.nodes:
+                instance += 1
+            name = "{}{}".format(base, instance)
+
+        self.nodes[name] = (nodeType, str(parent) if parent else None)
+
+        return name
+
+    def parent(self, node, parent):
+        ''' parent a recorded or existing dag node, keeps its local transform like cmds.parent(relative=True) '''
+
+        self.parents.append((str(node), str(parent)))
+
+    def addAttr(self, node, longName, attributeType="double", lock=False, **kwargs):
+        ''' add a dynamic attribute, kwargs are createAttribute's. returns "node.longName" '''
+
+        if attributeType not in NUMERIC_ATTRIBUTE_TYPES and attributeType not in ("message", "string", "enum"):
+            raise TypeError("NodeNetwork.addAttr(): can't record {} attributes.".format(attributeType))
+
+        kwargs['attributeType'] = attributeType
+        self.attributes.append((str(node), longName, kwargs))
+
+        plug = "{}.{}".format(node, longName)
+        if lock:
+            self.locks.append(plug)
+
+        return plug
+
+    def connectAttr(self, source, destination, force=False):
+        self.connections.append((str(source), str(destination), force))
+
+    def setAttr(self, plug, *values):
+        ''' numbers, bools and strings, several values set the children of a compound like cmds '''
+
+        self.values.append((str(plug), values[0] if len(values) == 1 else values))
+
+    def commit(self):
+        ''' make the recorded network in the scene, returns {recorded name: scene name} '''
+
+        self.createNodes()
+        self.addAttributes()
+        self.applyEdits()
+
+        apiundo_pylib.commit(undo=self.undoIt, redo=self.redoIt)
+
+        for name, (nodeType, parent) in self.nodes.items():
+            nodeindex_pylib.register(self.names[name], nodeType, component=self.component)
+
+        return self.names
+
+    def doIt(self, modifier):
+        modifier.doIt()
+        self.modifiers.append(modifier)
+
+    def undoIt(self):
+        for plug in self.locked_plugs:
+            plug.isLocked = False
+
+        for modifier in reversed(self.modifiers):
+            modifier.undoIt()
+
+    def redoIt(self):
+        for modifier in self.modifiers:
+            modifier.doIt()
+
+        for plug in self.locked_plugs:
+            plug.isLocked = True
+
+    def createNodes(self):
+        dag_modifier = om.MDagModifier()
+        dg_modifier = om.MDGModifier()
+
+        for name, (nodeType, parent) in self.nodes.items():
+            if isDagType(nodeType):
+                if parent in self.objects:
+                    parent_object = self.objects[parent]
+                elif parent:
+                    parent_object = getObject(parent)
+                else:
+                    parent_object = om.MObject.kNullObj
+
+                modifier = dag_modifier
+                self.objects[name] = dag_modifier.createNode(nodeType, parent_object)
+            else:
+                modifier = dg_modifier
+                self.objects[name] = dg_modifier.createNode(nodeType)
+
+            if "#" not in name:
+                modifier.renameNode(self.objects[name], name)
+
+        self.doIt(dag_modifier)
+        self.doIt(dg_modifier)
+
+        # a shape made without a parent comes back as the transform maya made for it, the name belongs to the shape
+        shape_modifier = om.MDGModifier()
+        for name, (nodeType, parent) in self.nodes.items():
+            node = self.objects[name]
+            if node.hasFn(om.MFn.kTransform) and nodeType != "transform" and om.MFnDagNode(node).childCount():
+                shape = om.MFnDagNode(node).child(0)
+                if om.MFnDependencyNode(shape).typeName == nodeType:
+                    self.objects[name] = shape
+                    if "#" not in name:
+                        shape_modifier.renameNode(shape, name)
+
+        self.doIt(shape_modifier)
+
+        if self.parents:
+            parent_modifier = om.MDagModifier()
+            for node, parent in self.parents:
+                parent_modifier.reparentNode(self.getObject(node), self.getObject(parent))
+
+            self.doIt(parent_modifier)
+
+        for name, node in self.objects.items():
+            if node.hasFn(om.MFn.kDagNode):
+                self.names[name] = om.MDagPath.getAPathTo(node).partialPathName()
+            else:
+                self.names[name] = om.MFnDependencyNode(node).name()
+
+    def addAttributes(self):
+        if not self.attributes:
+            return
+
+        modifier = om.MDGModifier()
+
+        for node, longName, kwargs in self.attributes:
+            modifier.addAttribute(self.getObject(node), createAttribute(longName, **kwargs))
+
+        self.doIt(modifier)
+
+    def applyEdits(self):
+        modifier = om.MDGModifier()
+
+        for source, destination, force in self.connections:
+            source_plug = self.getPlug(source)
+            destination_plug = self.getPlug(destination)
+
+            if destination_plug.isDestination:
+                if not force:
+                    raise RuntimeError("NodeNetwork.applyEdits(): {} is already connected, use force=True.".format(destination))
+                modifier.disconnect(destination_plug.source(), destination_plug)
+
+            modifier.connect(source_plug, destination_plug)
+
+        for plug, value in self.values:
+            setPlugValue(modifier, self.getPlug(plug), value)
+
+        self.doIt(modifier)
+
+        # locking isn't a modifier edit, undoIt unlocks these first
+        self.locked_plugs = [self.getPlug(plug) for plug in self.locks]
+        for plug in self.locked_plugs:
+            plug.isLocked = True
+
+    def getObject(self, node):
+        ''' MObject of a recorded or existing node '''
+
+        if node in self.objects:
+            return self.objects[node]
+
+        return getObject(node)
+
+    def getPlug(self, plug):
+        ''' MPlug for a "node.attr" string, recorded nodes are looked up by their scene name '''
+
+        node, _, attr = plug.partition(".")
+
+        return getPlug("{}.{}".format(self.names.get(node, node), attr))
+
+
+@functools.lru_cache(maxsize=None)
+def isDagType(nodeType):
+    return "dagNode" in (cmds.nodeType(nodeType, isTypeName=True, inherited=True) or [])
+
+def getObject(node):
+    selection = om.MSelectionList()
+    selection.add(node)
+
+    return selection.getDependNode(0)
+
+def getPlug(plug):
+    selection = om.MSelectionList()
+    selection.add(plug)
+
+    return selection.getPlug(0)
+
+def createAttribute(longName, attributeType="double", niceName="", keyable=False, minValue=None, maxValue=None, defaultValue=None, enumNames=""):
+    ''' MObject for a new dynamic attribute, attributeType and enumNames like cmds.addAttr '''
+
+    if attributeType == "message":
+        attr_fn = om.MFnMessageAttribute()
+        attribute = attr_fn.create(longName, longName)
+
+    elif attributeType == "string":
+        attr_fn = om.MFnTypedAttribute()
+        attribute = attr_fn.create(longName, longName, om.MFnData.kString)
+
+    elif attributeType == "enum":
+        attr_fn = om.MFnEnumAttribute()
+        attribute = attr_fn.create(longName, longName, int(defaultValue or 0))
+
+        # "a:b:c" or "a=1:b=4"
+        index = 0
+        for field in enumNames.split(":"):
+            if not field:
+                continue
+            name, _, value = field.partition("=")
+            index = int(value) if value else index
+            attr_fn.addField(name, index)
+            index += 1
+
+    else:
+        numeric_type = NUMERIC_ATTRIBUTE_TYPES[attributeType]
+
+        attr_fn = om.MFnNumericAttribute()
+        attribute = attr_fn.create(longName, longName, numeric_type, defaultValue or 0)
+
+        if minValue is not None:
+            attr_fn.setMin(minValue)
+        if maxValue is not None:
+            attr_fn.setMax(maxValue)
+
+    attr_fn.keyable = keyable
+    if niceName:
+        attr_fn.setNiceNameOverride(niceName)
+
+    return attribute
+
+def setPlugValue(modifier, plug, value):
+    ''' queue a cmds.setAttr style value on the modifier, angles and distances are in ui units like cmds '''
+
+    if isinstance(value, (list, tuple)):
+        for ii, child_value in enumerate(value):
+            setPlugValue(modifier, plug.child(ii), child_value)
+        return
+
+    if isinstance(value, str):
+        modifier.newPlugValueString(plug, value)
+        return
+
+    attribute = plug.attribute()
+
+    if attribute.hasFn(om.MFn.kUnitAttribute):
+        unit_type = om.MFnUnitAttribute(attribute).unitType()
+        if unit_type == om.MFnUnitAttribute.kAngle:
+            modifier.newPlugValueMAngle(plug, om.MAngle(value, om.MAngle.uiUnit()))
+        elif unit_type == om.MFnUnitAttribute.kDistance:
+            modifier.newPlugValueMDistance(plug, om.MDistance(value, om.MDistance.uiUnit()))
+        else:
+            modifier.newPlugValueDouble(plug, value)
+
+    elif attribute.hasFn(om.MFn.kEnumAttribute):
+        modifier.newPlugValueInt(plug, int(value))
+
+    elif attribute.hasFn(om.MFn.kNumericAttribute):
+        numeric_type = om.MFnNumericAttribute(attribute).numericType()
+        if numeric_type == om.MFnNumericData.kBoolean:
+            modifier.newPlugValueBool(plug, bool(value))
+        elif numeric_type in INTEGER_TYPES:
+            modifier.newPlugValueInt(plug, int(value))
+        else:
+            modifier.newPlugValueDouble(plug, float(value))
+
+    else:
+        raise TypeError("nodenetwork.setPlugValue(): can't set {} to {!r}".format(plug.name(), value))
+
+@contextlib.contextmanager
+def record(component=None):
+    ''' Record the createNode, connectAttr and setAttr calls made through this module and commit them on exit, ex:
+
+        with nodenetwork_pylib.record(component=self.name):
+            md = nodenetwork_pylib.createNode("multiplyDivide", name=md_name)
+            nodenetwork_pylib.connectAttr(source, md+".input1X")
+
+        Nothing is made if the block raises. A record() inside another joins the outer network.
+    '''
+
+    global ACTIVE_NETWORK
+
+    if ACTIVE_NETWORK is not None:
+        yield ACTIVE_NETWORK
+        return
+
+    network = NodeNetwork(component=component)
+    ACTIVE_NETWORK = network
+
+    try:
+        yield network
+    finally:
+        ACTIVE_NETWORK = None
+
+    network.commit()
+
+def createNode(nodeType, name=None, parent=None, component=None):
+    ''' cmds.createNode that is recorded inside a record() block '''
+
+    if ACTIVE_NETWORK is not None:
+        return ACTIVE_NETWORK.createNode(nodeType, name=name, parent=parent)
+
+    kwargs = {}
+    if name:
+        kwargs['name'] = str(name)
+    if parent:
+        kwargs['parent'] = str(parent)
+
+    return nodeindex_pylib.createNode(nodeType, component=component, **kwargs)
+
+def connectAttr(source, destination, force=False):
+    if ACTIVE_NETWORK is not None:
+        return ACTIVE_NETWORK.connectAttr(source, destination, force=force)
+
+    cmds.connectAttr(source, destination, force=force)
+
+def setAttr(plug, *values):
+    if ACTIVE_NETWORK is not None:
+        return ACTIVE_NETWORK.setAttr(plug, *values)
+
+    if len(values) == 1 and isinstance(values[0], str):
+        cmds.setAttr(plug, values[0], type="string")
+    else:
+        cmds.setAttr(plug, *values)
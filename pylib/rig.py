@@ -1,26 +1,323 @@
  
 
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+import collections
+import contextlib
+import functools
+import json
 import os
 import os.path 
+import tempfile
+import time
 
 from rigpie.pylib.rmath import Transform
 from rigpie.pylib.mayaname import MayaName
 from rigpie.pylib.control import Control
 
 import rigpie.pylib.attribute as attribute_pylib
+import rigpie.pylib.cmdstrace as cmdstrace_pylib
 import rigpie.pylib.control as control_pylib
 import rigpie.pylib.mayafile as mayafile_pylib
 import rigpie.pylib.skincluster as skincluster_pylib
 import rigpie.pylib.xform as xform_pylib
 import rigpie.pylib.joint as joint_pylib
 import rigpie.pylib.constraints as constraints_pylib
+import rigpie.pylib.nodeindex as nodeindex_pylib
+
+
+# CONSTANTS
+BUILD_STAGES = ("setup", "prebuild", "build", "postbuild")
+BUILD_TIMES_NAME = "rigpie_build_times.json" # last fast and normal build time per rig class, kept in the profile_path folder
+
+
+class BuildProfiler(object):
+    ''' Times the build stages and every component prebuild/build/postbuild.
+
+        While running, every maya.cmds command is swapped for a counting wrapper and a node added
+        callback counts node creation. Both are charged to the innermost open component, or to the
+        stage when no component is open. Results are written as a json report and as a Chrome trace,
+        open the trace in chrome://tracing or ui.perfetto.dev.
+    '''
+
+    def __init__(self):
+        object.__init__(self)
+
+        self.events = [] # chrome trace complete events
+        self.frames = [] # names of the open stages, outermost first
+        self.owner = "rig"
+
+        self.stages = collections.OrderedDict() # stage: seconds
+        self.components = collections.OrderedDict() # component: {stage: seconds}
+        self.cmds = collections.defaultdict(collections.Counter) # owner: {command: calls}
+        self.nodes = collections.defaultdict(collections.Counter) # owner: {node type: created}
+        self.totals = {'cmds_calls': 0, 'nodes_created': 0} # running totals, trace events show the inclusive difference
+
+        self.commands = {}
+        self.callbacks = []
+        self.start_time = None
+        self.total = 0.0
+
+    def start(self):
+        ''' wrap maya.cmds and listen for new nodes '''
+
+        self.start_time = time.perf_counter()
+
+        for command in dir(cmds):
+            function = getattr(cmds, command)
+            if command.startswith("_") or not callable(function) or isinstance(function, type):
+                continue
+
+            self.commands[command] = function
+            setattr(cmds, command, self.countCalls(command, function))
+
+        self.callbacks.append(om.MDGMessage.addNodeAddedCallback(self.nodeAdded, "dependNode"))
+
+    def stop(self):
+        ''' put maya.cmds back, safe to call more than once '''
+
+        for command, function in self.commands.items():
+            setattr(cmds, command, function)
+
+        self.commands = {}
+
+        if self.callbacks:
+            om.MMessage.removeCallbacks(self.callbacks)
+
+        self.callbacks = []
+
+        if self.start_time is not None:
+            self.total = time.perf_counter() - self.start_time
+
+    def countCalls(self, command, function):
+        counts = self.cmds
+        totals = self.totals
+
+        @cmdstrace_pylib.hide
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            counts[self.owner][command] += 1
+            totals['cmds_calls'] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def nodeAdded(self, node, *args):
+        self.nodes[self.owner][node.apiTypeStr] += 1
+        self.totals['nodes_created'] += 1
+
+    @contextlib.contextmanager
+    def stage(self, name, component=None):
+        ''' time a block, component names the owner of the cmds calls and nodes inside it '''
+
+        owner = self.owner
+        if component:
+            self.owner = component
+        elif not self.frames:
+            self.owner = "rig." + name
+
+        start = time.perf_counter()
+        totals = dict(self.totals)
+
+        self.frames.append(name)
+
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+
+            self.frames.pop()
+            
+            duration = end - start
+            if component:
+                stage = name.rsplit(".", 1)[-1]
+                timings = self.components.setdefault(component, collections.OrderedDict())
+                timings[stage] = timings.get(stage, 0.0) + duration
+            else:
+                self.stages[name] = self.stages.get(name, 0.0) + duration
+
+            self.events.append({
+                'name': name,
+                'cat': "component" if component else "stage",
+                'ph': "X",
+                'ts': (start - self.start_time) * 1e6,
+                'dur': duration * 1e6,
+                'pid': 1,
+                'tid': 1,
+                'args': {key: value - totals[key] for key, value in self.totals.items()},
+            })
+
+            self.owner = owner
+
+    def report(self):
+        ''' returns the profile as a json friendly dict, components are sorted slowest first '''
+
+        owners = {}
+        for owner in set(self.cmds) | set(self.nodes):
+            if not (self.cmds[owner] or self.nodes[owner]):
+                continue
+
+            owners[owner] = {
+                'cmds_calls': sum(self.cmds[owner].values()),
+                'cmds': dict(self.cmds[owner].most_common()),
+                'nodes_created': sum(self.nodes[owner].values()),
+                'node_types': dict(self.nodes[owner].most_common()),
+            }
+
+        components = sorted(self.components.items(), key=lambda item: sum(item[1].values()), reverse=True)
+
+        return {
+            'total': self.total,
+            'cmds_calls': self.totals['cmds_calls'],
+            'nodes_created': self.totals['nodes_created'],
+            'stages': dict(self.stages),
+            'components': [dict(name=name, total=sum(timings.values()), **timings) for name, timings in components],
+            'owners': owners,
+        }
+
+    def writeReport(self, path):
+        with open(path, "w") as handle:
+            json.dump(self.report(), handle, indent=4)
+
+        return path
+
+    def writeChromeTrace(self, path):
+        with open(path, "w") as handle:
+            json.dump({'traceEvents': sorted(self.events, key=lambda event: event['ts']), 'displayTimeUnit': "ms"}, handle)
+
+        return path
+
+
+def profileStage(method):
+    ''' Time and trace a Rig stage when the rig is profiled.
+
+        Subclass overrides are wrapped as well, the outermost call times the stage and the super()
+        calls inside it pass straight through. setup starts the profiler and cmds tracer, postbuild
+        writes them out, a stage that raises writes what was recorded so far and puts maya.cmds back.
+    '''
+
+    stage = method.__name__
+
+    @cmdstrace_pylib.hide
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if stage in self.running_stages:
+            return method(self, *args, **kwargs)
+
+        if stage == "setup":
+            self.startProfile()
+
+        if self.profiler is None and self.tracer is None:
+            return method(self, *args, **kwargs)
+
+        self.running_stages.append(stage)
+        try:
+            with self.profiler.stage(stage) if self.profiler else contextlib.nullcontext():
+                result = method(self, *args, **kwargs)
+        except Exception:
+            self.finishProfile()
+            raise
+        finally:
+            self.running_stages.pop()
+
+        if stage == "postbuild":
+            self.finishProfile()
+
+        return result
+
+    wrapper.profiled = True
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def fastBuildMode():
+    ''' Build without the undo queue, viewport refresh, evaluation manager or cycle checks.
+
+        Undo is turned off without flushing the queue, refresh is suspended when there is a viewport,
+        the evaluation manager goes to DG mode without idle graph rebuilds and cycle checking is off.
+        Everything is put back the way it was when the block exits, even if it raises.
+    '''
+
+    restore = []
+
+    undo_state = cmds.undoInfo(query=True, state=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    restore.append(lambda: cmds.undoInfo(stateWithoutFlush=undo_state))
+
+    if not cmds.about(batch=True):
+        cmds.refresh(suspend=True)
+        restore.append(lambda: cmds.refresh(suspend=False))
+
+    evaluation_mode = cmds.evaluationManager(query=True, mode=True)[0]
+    cmds.evaluationManager(mode="off")
+    restore.append(lambda: cmds.evaluationManager(mode=evaluation_mode))
 
+    # idleBuild isn't in older mayas
+    try:
+        idle_build = cmds.evaluationManager(query=True, idleBuild=True)
+        cmds.evaluationManager(idleBuild=False)
+        restore.append(lambda: cmds.evaluationManager(idleBuild=idle_build))
+    except (TypeError, RuntimeError):
+        pass
+
+    cycle_check = cmds.cycleCheck(query=True, evaluation=True)
+    cmds.cycleCheck(evaluation=False)
+    restore.append(lambda: cmds.cycleCheck(evaluation=cycle_check))
+
+    try:
+        yield
+    finally:
+        for function in reversed(restore):
+            try:
+                function()
+            except RuntimeError as error:
+                print("rig.fastBuildMode(): could not restore a setting, {}".format(error))
+
+def recordBuildTime(rig_class, mode, seconds, folder=None):
+    ''' store the build time for a rig class and mode in folder/BUILD_TIMES_NAME, the temp dir when folder is empty.
+        returns every stored time for the class.
+
+        Batch builds each get their own folder. The file is replaced in one step, so a build
+        running at the same time never reads half a file.
+    '''
+
+    path = os.path.join(folder or tempfile.gettempdir(), BUILD_TIMES_NAME)
+
+    times = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as handle:
+                times = json.load(handle)
+        except (IOError, ValueError):
+            times = {}
+
+    times.setdefault(rig_class, {})[mode] = seconds
+
+    try:
+        descriptor, temp_path = tempfile.mkstemp(prefix=BUILD_TIMES_NAME, suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, "w") as handle:
+                json.dump(times, handle, indent=4)
+
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    except (IOError, OSError):
+        pass
+
+    return times[rig_class]
 
 
 class Rig(object):
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, profileBuild=False, profile_path="", traceCmds=False, fastBuild=True, **kwargs):
+        ''' profileBuild, profile_path, traceCmds and fastBuild set the build options below before a template
+            that builds in its __init__ starts, templates pass them on with super().__init__(*args, **kwargs)
+        '''
+        
         ## Global variables
         self.rig_dag = "rig"
 
@@ -47,25 +344,156 @@ class Rig(object):
         # create an export rig for the game engine
         self.exportRig = False
         self.loadSkinWeights = True
+        
+        # pool used to read skin weight files, None picks the size from the cpu count.
+        # xml parsing holds the GIL, use processes under mayapy to scale with cores
+        self.skinWeightsWorkers = None
+        self.skinWeightsProcesses = False
+        
+        # keep loaded weights in memory and only re-read files whose digest in the skinweights manifest changed
+        self.skinWeightsCache = True
 
+        # time every stage and component, count cmds calls and created nodes per component.
+        # the report and chrome trace are written to profile_path, the temp dir when empty
+        self.profileBuild = profileBuild
+        self.profile_path = profile_path
+        self.profiler = None
+        
+        # charge every cmds call to the rigpie function that made it, written next to the profile
+        self.traceCmds = traceCmds
+        self.tracer = None
         
+        self.running_stages = []
+        self.profile_files = []
+        
+        # buildAll runs in fastBuildMode unless told otherwise, build_time is set once it finishes
+        self.fastBuild = fastBuild
+        self.build_time = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # stage overrides get profiled from their outermost call
+        for stage in BUILD_STAGES:
+            method = cls.__dict__.get(stage)
+            if method and not getattr(method, "profiled", False):
+                setattr(cls, stage, profileStage(method))
+
+    def profileComponent(self, component, stage):
+        ''' context for a component stage, does nothing when the build isn't profiled '''
+
+        if self.profiler is None:
+            return contextlib.nullcontext()
+
+        return self.profiler.stage("{}.{}".format(component.name, stage), component=component.name)
+
+    def startProfile(self):
+        ''' start the profiler and tracer the rig asks for, the tracer wraps cmds last so it sees the real callers '''
+
+        if self.profileBuild and self.profiler is None:
+            self.profiler = BuildProfiler()
+            self.profiler.start()
+
+        if self.traceCmds and self.tracer is None:
+            self.tracer = cmdstrace_pylib.CmdsTracer()
+            self.tracer.start()
+
+    def finishProfile(self):
+        ''' stop the tracer and profiler, write the json reports, chrome trace and collapsed stacks '''
+
+        folder = self.profile_path or tempfile.gettempdir()
+        name = type(self).__name__
+
+        tracer = self.tracer
+        if tracer is not None:
+            self.tracer = None
+            tracer.stop()
+
+            report = tracer.writeReport(os.path.join(folder, name + "_cmds_trace.json"))
+            folded = tracer.writeFolded(os.path.join(folder, name + "_cmds.folded"))
+
+            tracer.printReport()
+            print("rig.finishProfile(): cmds report {} collapsed stacks {}".format(report, folded))
+
+            self.profile_files += [report, folded]
+
+        profiler = self.profiler
+        if profiler is None:
+            return None
+
+        self.profiler = None
+        profiler.stop()
+
+        report = profiler.writeReport(os.path.join(folder, name + "_build_profile.json"))
+        trace = profiler.writeChromeTrace(os.path.join(folder, name + "_build_trace.json"))
+
+        print("rig.finishProfile(): {:.2f}s, report {} trace {}".format(profiler.total, report, trace))
+
+        self.profile_files += [report, trace]
+
+        return profiler
+
+    def buildAll(self, fast=None):
+        ''' Run setup, registerComponents, prebuild, build and postbuild.
+
+            fast builds inside fastBuildMode, which works in the gui and in mayapy, None uses fastBuild.
+            The time is compared with the last build of the other mode for this rig class to report
+            the time saved.
+        '''
+
+        if fast is None:
+            fast = self.fastBuild
+
+        mode = "fast" if fast else "normal"
+        start = time.perf_counter()
+
+        try:
+            with fastBuildMode() if fast else contextlib.nullcontext():
+                self.setup()
+                self.registerComponents()
+                self.prebuild()
+                self.build()
+                self.postbuild()
+        finally:
+            # a failed build leaves no node index behind
+            nodeindex_pylib.end()
+
+        seconds = time.perf_counter() - start
+        self.build_time = seconds
+        
+        times = recordBuildTime(type(self).__name__, mode, seconds, folder=self.profile_path)
+
+        if fast and "normal" in times:
+            print("rig.buildAll(): {:.2f}s, {:.2f}s saved against the last normal build".format(seconds, times["normal"] - seconds))
+        elif not fast and "fast" in times:
+            print("rig.buildAll(): {:.2f}s, a fast build took {:.2f}s".format(seconds, times["fast"]))
+        else:
+            print("rig.buildAll(): {:.2f}s {} build".format(seconds, mode))
+
+        return seconds
+
+        
+    @profileStage
     def setup(self):
         ''' Setup dag nodes and import in mesh.'''
 
         # New Scene
         cmds.file(new=True, f=True)
+        
+        # record the nodes the build makes so the helpers can look them up without querying the scene
+        nodeindex_pylib.begin()
 
-        rig = cmds.createNode("transform", name=self.rig_dag)
+        rig = nodeindex_pylib.createNode("transform", name=self.rig_dag)
         attribute_pylib.lockAndHide(rig, ["t","r","s","v"])
    
         cmds.addAttr(self.rig_dag, ln="registeredComponents", dt="string")
         self.component_attr = self.rig_dag + ".registeredComponents"
 
         ## List of components
-        self.geo_dag = cmds.createNode("transform", name="geo", parent=self.rig_dag)
-        self.utility_dag = cmds.createNode("transform", name="utility",  parent=self.rig_dag)
-        self.skeleton_dag = cmds.createNode("transform", name="skel",  parent=self.rig_dag)
-        self.worldspace_dag = cmds.createNode("transform", name="worldspace", parent=self.rig_dag)
+        self.geo_dag = nodeindex_pylib.createNode("transform", name="geo", parent=self.rig_dag)
+        self.utility_dag = nodeindex_pylib.createNode("transform", name="utility",  parent=self.rig_dag)
+        self.skeleton_dag = nodeindex_pylib.createNode("transform", name="skel",  parent=self.rig_dag)
+        self.worldspace_dag = nodeindex_pylib.createNode("transform", name="worldspace", parent=self.rig_dag)
         
         cmds.setAttr(self.worldspace_dag+".inheritsTransform", False)
         
@@ -113,6 +541,7 @@ class Rig(object):
         self.importGeo()
 
 
+    @profileStage
     def prebuild(self):
         ''' import skeleton and run prebuild on all components '''
         
@@ -125,11 +554,13 @@ class Rig(object):
         
         # build all components
         for component in self.components:
-            component.prebuild()
+            with self.profileComponent(component, "prebuild"):
+                component.prebuild()
     
     def registerComponents(self):
         return
         
+    @profileStage
     def build (self):
         
         #### World Controls ####
@@ -186,13 +617,16 @@ class Rig(object):
         
         for component in self.components:
             print ("rig.build(): {}".format(component.name))
-            component.build()
+            with self.profileComponent(component, "build"):
+                component.build()
         
+    @profileStage
     def postbuild (self):
         # build all components
         for component in self.components:
             print ("rig.postbuild(): {}".format(component.name))
-            component.postbuild()
+            with self.profileComponent(component, "postbuild"):
+                component.postbuild()
         
         # export rig
         if self.exportRig:
@@ -220,10 +654,7 @@ class Rig(object):
         shape_visibility_connections = {}
 
         # lock rig transforms
-        attribute_pylib.lock(self.geo_dag, ['t', 'r', 's', 'v'])
-        attribute_pylib.lock(self.utility_dag, ['t', 'r', 's', 'v'])
-        attribute_pylib.lock(self.skeleton_dag, ['t', 'r', 's', 'v'])
-        attribute_pylib.lock(self.worldspace_dag, ['t', 'r', 's', 'v'])
+        attribute_pylib.lock([self.geo_dag, self.utility_dag, self.skeleton_dag, self.worldspace_dag], ['t', 'r', 's', 'v'])
         
 
         # create a set for deformer binding
@@ -302,6 +733,9 @@ class Rig(object):
             # Add all the component options now so we dont get viewport focus issues.
             for ctrl in component.controls:
                 component.addComponentOptions(ctrl.name)
+        
+        # the build is done, stop tracking nodes
+        nodeindex_pylib.end()
 
     def registerComponent(self, component):
 
@@ -368,16 +802,37 @@ class Rig(object):
     
         geo = []
         files = os.listdir(self.skinweights_path)
-
-        for file in files:
+        
+        # one weights file per mesh, prefer the binary format when both exist
+        weight_files = {}
+        for file in sorted(files):
             obj = file.split(".")[0]
             type = file.split(".")[-1]
             
-            if type == "xml":
-                print ("rig.importSkinWeights(): Loading {}".format(file))
-                skincluster, node = skincluster_pylib.importWeights(self.skinweights_path+file)
-                if node:
-                    geo.append(node)
+            if type not in skincluster_pylib.WEIGHTS_FILE_TYPES:
+                continue
+                
+            if obj in weight_files:
+                current_type = weight_files[obj].split(".")[-1]
+                if skincluster_pylib.WEIGHTS_FILE_TYPES.index(current_type) < skincluster_pylib.WEIGHTS_FILE_TYPES.index(type):
+                    continue
+            
+            weight_files[obj] = file
+
+        def progress(done, total, file):
+            print ("rig.importSkinWeights(): Loaded {} ({}/{})".format(file, done, total))
+        
+        filepaths = [self.skinweights_path+file for file in weight_files.values()]
+        results = skincluster_pylib.importWeightsFiles(filepaths, 
+                                                        workers=self.skinWeightsWorkers, 
+                                                        processes=self.skinWeightsProcesses, 
+                                                        progress=progress,
+                                                        cache=skincluster_pylib.WEIGHTS_CACHE if self.skinWeightsCache else None
+        )
+        
+        for skincluster, node in results:
+            if node:
+                geo.append(node)
 
         return geo
 
@@ -1,16 +1,32 @@
  
 
-import maya.cmds as cmds
 import math
-import maya.OpenMaya as om
+
+import numpy as np
+
+# only the maya object helpers need maya, the math works in any python
+try:
+    import maya.cmds as cmds
+except ImportError:
+    cmds = None
+
+
+# CONSTANTS
+ROTATE_ORDERS = ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx'] # maya's rotateOrder enum
 
 
 class Vector(object):
     ''' float3 vector.  given a maya object will start with position.'''
     
+    # no per instance __dict__, vectors get made in tight loops
+    __slots__ = ('x', 'y', 'z')
+    
     def __init__(self,*args):
-        object.__init__(self)
-        if args:
+        if len(args) == 3:
+            self.x = float(args[0])
+            self.y = float(args[1])
+            self.z = float(args[2])
+        elif args:
             self.set(*args)
         else:
             self.zero()
@@ -22,45 +38,76 @@ class Vector(object):
         return 3
         
     def __iter__(self):
-        return iter([self.x,self.y,self.z])
+        return iter((self.x,self.y,self.z))
+        
+    def __neg__(self):
+        return Vector(-self.x, -self.y, -self.z)
         
     def __add__(self,vector):
-        newV = Vector()
-        newV.fromList([self.x + vector.x,self.y + vector.y,self.z + vector.z])
-        return newV
+        return Vector(self.x + vector.x, self.y + vector.y, self.z + vector.z)
     
     def __sub__(self,vector):
-        newV = Vector()
-        newV.fromList([self.x - vector.x, self.y - vector.y, self.z - vector.z])
-        return newV
+        return Vector(self.x - vector.x, self.y - vector.y, self.z - vector.z)
         
     def __mul__(self,vector):
-        newV = Vector()
         if isinstance(vector,Vector):
-            newV.fromVector(self.x * vector.x, self.y * vector.y, self.z * vector.z)
+            return Vector(self.x * vector.x, self.y * vector.y, self.z * vector.z)
         elif isinstance(vector,Transform):
-            xform_a_1,xform_a_2,xform_a_3 = self.get()
-            xform_b_11,xform_b_12,xform_b_13,xform_b_14,xform_b_21,xform_b_22,xform_b_23,xform_b_24,xform_b_31,xform_b_32,xform_b_33,xform_b_34,xform_b_41,xform_b_42,xform_b_43,xform_b_44 = vector.get()
-            newV.fromList(
-                [
-                xform_b_11*xform_a_1 + xform_b_21*xform_a_2 + xform_b_31*xform_a_3 + xform_b_41,
-                xform_b_21*xform_a_1 + xform_b_22*xform_a_2 + xform_b_22*xform_a_3 + xform_b_42,
-                xform_b_31*xform_a_2 + xform_b_32*xform_a_2 + xform_b_33*xform_a_3 + xform_b_43
-                ]
-            )
+            newV = self.copy()
+            newV *= vector
+            return newV
+        elif isinstance(vector,TransformArray):
+            return VectorArray([self.get()]) * vector
         else:
-            newV.fromList([self.x*vector,self.y*vector,self.z*vector])
-        return newV
+            return Vector(self.x * vector, self.y * vector, self.z * vector)
         
     def __truediv__(self, vector):
-        newV = Vector()
+        if isinstance(vector,Vector):
+            return Vector(self.x / vector.x, self.y / vector.y, self.z / vector.z)
+        else:
+            return Vector(self.x / vector, self.y / vector, self.z / vector)
+            
+    def __iadd__(self, vector):
+        self.x += vector.x
+        self.y += vector.y
+        self.z += vector.z
+        return self
+        
+    def __isub__(self, vector):
+        self.x -= vector.x
+        self.y -= vector.y
+        self.z -= vector.z
+        return self
         
+    def __imul__(self, vector):
         if isinstance(vector,Vector):
-            newV.fromList([self.x / vector.x, self.y / vector.y, self.z / vector.z])
+            self.x *= vector.x
+            self.y *= vector.y
+            self.z *= vector.z
+        elif isinstance(vector,Transform):
+            # point times matrix, maya row vector convention
+            m00, m01, m02, m03, m10, m11, m12, m13, m20, m21, m22, m23, m30, m31, m32, m33 = vector.get()
+            x, y, z = self.x, self.y, self.z
+            
+            self.x = x*m00 + y*m10 + z*m20 + m30
+            self.y = x*m01 + y*m11 + z*m21 + m31
+            self.z = x*m02 + y*m12 + z*m22 + m32
         else:
-            newV.fromList([self.x / vector, self.y / vector, self.z / vector])
+            self.x *= vector
+            self.y *= vector
+            self.z *= vector
+        return self
         
-        return newV
+    def __itruediv__(self, vector):
+        if isinstance(vector,Vector):
+            self.x /= vector.x
+            self.y /= vector.y
+            self.z /= vector.z
+        else:
+            self.x /= vector
+            self.y /= vector
+            self.z /= vector
+        return self
 
     def __lt__(self,vector):
         return self.sqLength() < vector        
@@ -78,11 +125,17 @@ class Vector(object):
         self.x = float(v[0])
         self.y = float(v[1])
         self.z = float(v[2])
+        
+    def setXYZ(self, x, y, z):
+        ''' set from three numbers without any type checks '''
+        self.x = x
+        self.y = y
+        self.z = z
 
     def zero(self):
-        self.x=0
-        self.y=0
-        self.z=0
+        self.x=0.0
+        self.y=0.0
+        self.z=0.0
     
     def set(self,*args):
         '''
@@ -92,14 +145,16 @@ class Vector(object):
         '''
 
         if len(args) == 1:
-            if isinstance(args[0], list):
+            if isinstance(args[0], (int, float)):
+                self.x = self.y = self.z = float(args[0])
+            elif isinstance(args[0], (list, tuple, np.ndarray)):
                 self.fromList(args[0])
             elif hasattr(args[0], 'x') and hasattr(args[0],'y') and hasattr(args[0],'z'):
                 self.fromVector(args[0])
-            elif cmds.objExists(args[0]):
+            elif isinstance(args[0], Transform):
+                self.fromVector(args[0].getTranslation())
+            elif cmds and cmds.objExists(args[0]):
                 self.fromMayaObj(args[0])
-            elif hasattr(args[0], '_matrix'):
-                self.setFromVector(args[0].getTranslation())
             else:
                 raise RuntimeError("rmath.set(): invalid arguments {}".format(args))
         elif len(args) == 3:
@@ -128,6 +183,13 @@ class Vector(object):
     def sqLength(self):
         return self.dot(self)
         
+    def distance(self, vector):
+        ''' distance to another vector without building the difference '''
+        x = self.x - vector.x
+        y = self.y - vector.y
+        z = self.z - vector.z
+        return math.sqrt(x*x + y*y + z*z)
+        
     def dot(self, vector):
         return self.x * vector.x + self.y * vector.y + self.z * vector.z
         
@@ -144,14 +206,15 @@ class Vector(object):
         
     def reflect(self, plane=None):
         '''default plane: (-1,0,0)'''
-        vector = self.copy()
         if not plane:
             plane = Vector(-1,0,0)
         else:
             plane = Vector(plane)
-        dot = vector.dot(plane)
+        dot = self.dot(plane) * 2
 
-        self.fromVector(vector - plane * 2 * dot)
+        self.x -= plane.x * dot
+        self.y -= plane.y * dot
+        self.z -= plane.z * dot
 
     def getMayaEnumInt(self, include_closest=False):
         ''' Get maya's enumerator index '''
@@ -188,28 +251,28 @@ class Vector(object):
                 return 4
         
 class Transform(object):
-    '''4x4 object transform class'''
+    '''4x4 object transform class, stored as a flat row major list of 16 floats like maya's matrices.
+    
+        One matrix is cheaper in plain python than through numpy's call overhead, use TransformArray
+        for math on many transforms at once.
+    '''
     def __init__(self,*args):
         object.__init__(self)
+        
+        # a 16 float list is the common case, skip the identity and the set() type checks
+        if len(args) == 1 and isinstance(args[0], list) and len(args[0]) == 16:
+            self._matrix = list(map(float, args[0]))
+            return
+        
         self.identity()
         if args:
             self.set(*args)
             
     def __str__(self):
-        return "%s %s %s %s\n%s %s %s %s\n%s %s %s %s\n%s %s %s %s" % (
-            self._matrix[0], self._matrix[1], self._matrix[2], self._matrix[3],
-            self._matrix[4], self._matrix[5], self._matrix[6], self._matrix[7],
-            self._matrix[8], self._matrix[9], self._matrix[10], self._matrix[11],
-            self._matrix[12], self._matrix[13], self._matrix[14], self._matrix[15]
-        )  
+        return "%s %s %s %s\n%s %s %s %s\n%s %s %s %s\n%s %s %s %s" % tuple(self._matrix)
     
     def __iter__(self):
-        return iter([
-            self._matrix[0], self._matrix[1], self._matrix[2], self._matrix[3],
-            self._matrix[4], self._matrix[5], self._matrix[6], self._matrix[7],
-            self._matrix[8], self._matrix[9], self._matrix[10], self._matrix[11],
-            self._matrix[12], self._matrix[13], self._matrix[14], self._matrix[15]
-        ])
+        return iter(self.get())
         
     def __len__(self):
         return 16
@@ -218,72 +281,90 @@ class Transform(object):
         try:
             if len(transform) == 3: #matrix and vector
                 self.translate(transform)
+                return self
             elif len(transform) == 16: #matrix and matrix
-                return Transform(map((lambda x,y: x+y),self.get(),transform.get()))
+                return fromFlatList([aa + float(bb) for aa, bb in zip(self._matrix, transform)])
         except TypeError:
-            return Transform(map((lambda x,y: x+y),self.get(),[float(transform)]*16))
+            transform = float(transform)
+            return fromFlatList([aa + transform for aa in self._matrix])
         
         
     def __sub__(self,transform):
         try:
             if len(transform) == 3: #matrix and vector
-                self.translate(transform * -1)
+                self.translate(Vector(transform) * -1)
+                return self
             elif len(transform) == 16: #matrix and matrix
-                return Transform(map((lambda x,y: x-y),self.get(),transform.get()))
+                return fromFlatList([aa - float(bb) for aa, bb in zip(self._matrix, transform)])
         except TypeError: # matrix and float
-            return Transform(map((lambda x,y: x-y),self.get(),[float(transform)]*16))     
+            transform = float(transform)
+            return fromFlatList([aa - transform for aa in self._matrix])
             
     def __mul__(self,transform):
         if isinstance(transform,Transform):
-            xform_a_11, xform_a_12, xform_a_13, xform_a_14, xform_a_21, xform_a_22, xform_a_23, xform_a_24, xform_a_31, xform_a_32, xform_a_33, xform_a_34, xform_a_41, xform_a_42, xform_a_43, xform_a_44 = self.get()
-            xform_b_11, xform_b_12, xform_b_13, xform_b_14, xform_b_21, xform_b_22, xform_b_23, xform_b_24, xform_b_31, xform_b_32, xform_b_33, xform_b_34, xform_b_41, xform_b_42, xform_b_43, xform_b_44 = transform.get()
+            a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = self._matrix
+            b00, b01, b02, b03, b10, b11, b12, b13, b20, b21, b22, b23, b30, b31, b32, b33 = transform._matrix
             
-            return Transform(
-                xform_a_11*xform_b_11 + xform_a_12*xform_b_21 + xform_a_13*xform_b_31 + xform_a_14*xform_b_41, xform_a_11*xform_b_12 + xform_a_12*xform_b_22 + xform_a_13*xform_b_32 + xform_a_14*xform_b_42, xform_a_11*xform_b_13 + xform_a_12*xform_b_23 + xform_a_13*xform_b_33 + xform_a_14*xform_b_43, xform_a_11*xform_b_14 + xform_a_12*xform_b_24 + xform_a_13*xform_b_34 + xform_a_14*xform_b_44,
-                xform_a_21*xform_b_11 + xform_a_22*xform_b_21 + xform_a_23*xform_b_31 + xform_a_24*xform_b_41, xform_a_21*xform_b_12 + xform_a_22*xform_b_22 + xform_a_23*xform_b_32 + xform_a_24*xform_b_42, xform_a_21*xform_b_13 + xform_a_22*xform_b_23 + xform_a_23*xform_b_33 + xform_a_24*xform_b_43, xform_a_21*xform_b_14 + xform_a_22*xform_b_24 + xform_a_23*xform_b_34 + xform_a_24*xform_b_44,
-                xform_a_31*xform_b_11 + xform_a_32*xform_b_21 + xform_a_33*xform_b_31 + xform_a_34*xform_b_41, xform_a_31*xform_b_12 + xform_a_32*xform_b_22 + xform_a_33*xform_b_32 + xform_a_34*xform_b_42, xform_a_31*xform_b_13 + xform_a_32*xform_b_23 + xform_a_33*xform_b_33 + xform_a_34*xform_b_43, xform_a_31*xform_b_14 + xform_a_32*xform_b_24 + xform_a_33*xform_b_34 + xform_a_34*xform_b_44,
-                xform_a_41*xform_b_11 + xform_a_42*xform_b_21 + xform_a_43*xform_b_31 + xform_a_44*xform_b_41, xform_a_41*xform_b_12 + xform_a_42*xform_b_22 + xform_a_43*xform_b_32 + xform_a_44*xform_b_42, xform_a_41*xform_b_13 + xform_a_42*xform_b_23 + xform_a_43*xform_b_33 + xform_a_44*xform_b_43, xform_a_41*xform_b_14 + xform_a_42*xform_b_24 + xform_a_43*xform_b_34 + xform_a_44*xform_b_44
-            )
+            return fromFlatList([
+                a00*b00 + a01*b10 + a02*b20 + a03*b30, a00*b01 + a01*b11 + a02*b21 + a03*b31, a00*b02 + a01*b12 + a02*b22 + a03*b32, a00*b03 + a01*b13 + a02*b23 + a03*b33,
+                a10*b00 + a11*b10 + a12*b20 + a13*b30, a10*b01 + a11*b11 + a12*b21 + a13*b31, a10*b02 + a11*b12 + a12*b22 + a13*b32, a10*b03 + a11*b13 + a12*b23 + a13*b33,
+                a20*b00 + a21*b10 + a22*b20 + a23*b30, a20*b01 + a21*b11 + a22*b21 + a23*b31, a20*b02 + a21*b12 + a22*b22 + a23*b32, a20*b03 + a21*b13 + a22*b23 + a23*b33,
+                a30*b00 + a31*b10 + a32*b20 + a33*b30, a30*b01 + a31*b11 + a32*b21 + a33*b31, a30*b02 + a31*b12 + a32*b22 + a33*b32, a30*b03 + a31*b13 + a32*b23 + a33*b33
+            ])
+        elif isinstance(transform,TransformArray):
+            return TransformArray(np.matmul(self.getArray(), transform._matrices))
         elif isinstance(transform,Vector):
-            xform_a_11,xform_a_12,xform_a_13,xform_a_14,xform_a_21,xform_a_22,xform_a_23,xform_a_24,xform_a_31,xform_a_32,xform_a_33,xform_a_34,xform_a_41,xform_a_42,xform_a_43,xform_a_44 = self.get()
-            xform_b_1,xform_b_2,xform_b_3 = transform.get()
-            return Transform(
-                xform_a_11 * xform_b_1, xform_a_12 * xform_b_2, xform_a_13 * xform_b_3, xform_a_14,
-                xform_a_21 * xform_b_1, xform_a_22 * xform_b_2, xform_a_23 * xform_b_3, xform_a_24,
-                xform_a_31 * xform_b_1, xform_a_32 * xform_b_2, xform_a_33 * xform_b_3, xform_a_34,
-                xform_a_41, xform_a_42, xform_a_43, xform_a_44
-                )
+            # scale the rotation columns
+            a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = self._matrix
+            x, y, z = transform.x, transform.y, transform.z
+            
+            return fromFlatList([
+                a00*x, a01*y, a02*z, a03,
+                a10*x, a11*y, a12*z, a13,
+                a20*x, a21*y, a22*z, a23,
+                a30, a31, a32, a33
+            ])
         else:
             raise TypeError("rmath.Transform.__mul__(): {} and {} are unsupported.".format(self.__class__.__name__ ,transform.__class__.__name__))
 
     def copy(self):
-        return Transform(self.get())
+        return fromFlatList(self._matrix[:])
         
     def zero(self):
-        self._matrix = [0]*16
+        self._matrix = [0.0]*16
         
     def identity(self):
-        self._matrix = [1,0,0,0,0,1,0,0,0,0,1,0,0,0,0,1]
+        self._matrix = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
         
     def get(self):
         return self._matrix[:]
         
+    def getArray(self):
+        ''' the matrix as a new (4,4) numpy array '''
+        return np.array(self._matrix, dtype=np.float64).reshape(4, 4)
+        
     def set(self,*args):
-        '''given a list, transform or position vector, set the matrix.
+        '''given a list, numpy array, transform or position vector, set the matrix.
         
            else return identity
         '''
     
         if args:
             if len(args) == 1:
-                if cmds.objExists(args[0]):
+                if isinstance(args[0],(list, tuple)):
+                    self.fromList(args[0])
+                elif isinstance(args[0],Transform):
+                    self._matrix = args[0]._matrix[:]
+                elif isinstance(args[0],np.ndarray):
+                    self.fromList(args[0].ravel().tolist())
+                elif isinstance(args[0],Vector):
+                    self.setTranslation(args[0])
+                elif isinstance(args[0],str) and cmds and cmds.objExists(args[0]):
                     self.fromMayaObj(args[0])
                 elif hasattr(args[0], 'x') and hasattr(args[0],'y') and hasattr(args[0],'z'):
                     self.setTranslation(args[0])
-                elif isinstance(args[0],Transform):
-                    self.fromList(args[0].get())
-                elif hasattr(args[0],'__iter__'):
-                    self.fromList(args[0])
+                elif hasattr(args[0],'__iter__') and not isinstance(args[0],str):
+                    self.fromList(list(args[0]))
                 else:
                     raise RuntimeError("rmath.Transform.set(): invalid arguments '{}' ".format(args[0]))
             elif len(args) == 16:
@@ -294,17 +375,16 @@ class Transform(object):
             self.identity()
 
     def fromMayaObj(self,obj):
-        self._matrix = cmds.xform(obj,ws=True,m=True,q=True)
-        return
+        self.fromList(cmds.xform(obj,ws=True,m=True,q=True))
         
     def fromList(self,transform):
         if not len(transform) == 16:
             raise TypeError("matrix must be set from 16 element list")
-        self._matrix = list(transform[:])
+        self._matrix = list(map(float, transform))
         
     def getTranslation(self):
         '''get translation as a Vector'''
-        return Vector(self._matrix[12],self._matrix[13],self._matrix[14])
+        return Vector(self._matrix[12], self._matrix[13], self._matrix[14])
         
     def setTranslation(self,transform):
         '''set translation from antransform object'''
@@ -314,25 +394,24 @@ class Transform(object):
         self._matrix[13] = transform.y
         self._matrix[14] = transform.z
         
-    def getRotation(self):
-        '''list of the euler rotations. '''
-        mMatrix = om.MMatrix() # MMatrix
-        om.MScriptUtil.createMatrixFromList(list(self), mMatrix)
-        mTransformMtx = om.MTransformationMatrix(mMatrix)
-        eulerRot = mTransformMtx.eulerRotation() # MEulerRotation
-
-        # Convert from radians to degrees:
-        angles = [math.degrees(angle) for angle in (eulerRot.x, eulerRot.y, eulerRot.z)]        
-        return angles
+    def getRotation(self, rotateOrder="xyz"):
+        '''list of the euler rotations in degrees, scale and shear are removed first.
+        
+            rotateOrder: rotate order string or maya's rotateOrder enum int
+        '''
+        matrix = self._matrix
+        rows = (matrix[0:3], matrix[4:7], matrix[8:11])
+        
+        return [math.degrees(angle) for angle in singleMatrixToEuler(rows, *rotateOrderAxes(rotateOrder))]
 
     def xAxis(self):
-        return Vector(self._matrix[0],self._matrix[1],self._matrix[2])
+        return Vector(self._matrix[0], self._matrix[1], self._matrix[2])
     
     def yAxis(self):
-        return Vector(self._matrix[4],self._matrix[5],self._matrix[6])
+        return Vector(self._matrix[4], self._matrix[5], self._matrix[6])
 
     def zAxis(self):
-        return Vector(self._matrix[8],self._matrix[9],self._matrix[10])
+        return Vector(self._matrix[8], self._matrix[9], self._matrix[10])
         
     def getScale(self):
         return (self._matrix[0], self._matrix[5], self._matrix[10])
@@ -353,11 +432,11 @@ class Transform(object):
             Default:  yz plane
         '''
         
-        x_axis = self.x_axisxis()
+        x_axis = self.xAxis()
         x_axis.reflect(plane=plane)
-        y_axis = self.y_axisxis()
+        y_axis = self.yAxis()
         y_axis.reflect(plane=plane)
-        z_axis = self.z_axisxis()
+        z_axis = self.zAxis()
         z_axis.reflect(plane=plane)
         translation = self.getTranslation()
         translation.reflect(plane=plane)
@@ -366,71 +445,731 @@ class Transform(object):
         
     def det(self):
         '''return the determinate of the matrix'''
-        xform11,xform12,xform13,xform14,xform21,xform22,xform23,xform24,xform31,xform32,xform33,xform34,xform41,xform42,xform43,xform44 = self.get()
-        return (
-            xform11*xform22*xform33*xform44 + xform11*xform23*xform34*xform42 + xform11*xform24*xform32*xform43 +
-            xform12*xform21*xform34*xform43 + xform12*xform23*xform31*xform44 + xform12*xform24*xform33*xform41 +
-            xform13*xform21*xform32*xform44 + xform13*xform22*xform34*xform41 + xform13*xform24*xform31*xform42 +
-            xform14*xform21*xform33*xform42 + xform14*xform22*xform31*xform43 + xform14*xform23*xform32*xform41 -
-            xform11*xform22*xform34*xform43 - xform11*xform23*xform32*xform44 - xform11*xform24*xform33*xform42 -
-            xform12*xform21*xform33*xform44 - xform12*xform23*xform34*xform41 - xform12*xform24*xform31*xform43 -
-            xform13*xform21*xform34*xform42 - xform13*xform22*xform31*xform44 - xform13*xform24*xform32*xform41 -
-            xform14*xform21*xform32*xform43 - xform14*xform22*xform33*xform41 - xform14*xform23*xform31*xform42
-            )
+        a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = self._matrix
+        
+        # 2x2 minors of the top and bottom row pairs
+        s0 = a00*a11 - a10*a01
+        s1 = a00*a12 - a10*a02
+        s2 = a00*a13 - a10*a03
+        s3 = a01*a12 - a11*a02
+        s4 = a01*a13 - a11*a03
+        s5 = a02*a13 - a12*a03
+        
+        c5 = a22*a33 - a32*a23
+        c4 = a21*a33 - a31*a23
+        c3 = a21*a32 - a31*a22
+        c2 = a20*a33 - a30*a23
+        c1 = a20*a32 - a30*a22
+        c0 = a20*a31 - a30*a21
+        
+        return s0*c5 - s1*c4 + s2*c3 + s3*c2 - s4*c1 + s5*c0
             
     def transpose(self):
-        xform11,xform12,xform13,xform14,xform21,xform22,xform23,xform24,xform31,xform32,xform33,xform34,xform41,xform42,xform43,xform44 = self.get()
-        self.set(
-            xform11,xform21,xform31,xform41,
-            xform12,xform22,xform32,xform42,
-            xform13,xform23,xform33,xform43,
-            xform14,xform24,xform34,xform44
-            )
+        a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = self._matrix
+        
+        self._matrix = [a00, a10, a20, a30, a01, a11, a21, a31, a02, a12, a22, a32, a03, a13, a23, a33]
 
     def invert(self):
         '''invert the current matrix in place.'''
-        inverted = [0]*16
-        xform = self._matrix[:]
-        inverted[0] = xform[5]*xform[10]*xform[15] - xform[5]*xform[11]*xform[14] - xform[9]*xform[6]*xform[15] + \
-                 xform[9]*xform[7]*xform[14] + xform[13]*xform[6]*xform[11] - xform[13]*xform[7]*xform[10]
-        inverted[4] = -xform[4]*xform[10]*xform[15] + xform[4]*xform[11]*xform[14] + xform[8]*xform[6]*xform[15] - \
-                  xform[8]*xform[7]*xform[14] - xform[12]*xform[6]*xform[11] + xform[12]*xform[7]*xform[10]
-        inverted[8] = xform[4]*xform[9]*xform[15] - xform[4]*xform[11]*xform[13] - xform[8]*xform[5]*xform[15] + \
-                 xform[8]*xform[7]*xform[13] + xform[12]*xform[5]*xform[11] - xform[12]*xform[7]*xform[9]
-        inverted[12] = -xform[4]*xform[9]*xform[14] + xform[4]*xform[10]*xform[13] + xform[8]*xform[5]*xform[14] - \
-                   xform[8]*xform[6]*xform[13] - xform[12]*xform[5]*xform[10] + xform[12]*xform[6]*xform[9]
-        inverted[1] = -xform[1]*xform[10]*xform[15] + xform[1]*xform[11]*xform[14] + xform[9]*xform[2]*xform[15] - \
-                  xform[9]*xform[3]*xform[14] - xform[13]*xform[2]*xform[11] + xform[13]*xform[3]*xform[10]
-        inverted[5] = xform[0]*xform[10]*xform[15] - xform[0]*xform[11]*xform[14] - xform[8]*xform[2]*xform[15] + \
-                 xform[8]*xform[3]*xform[14] + xform[12]*xform[2]*xform[11] - xform[12]*xform[3]*xform[10]
-        inverted[9] = -xform[0]*xform[9]*xform[15] + xform[0]*xform[11]*xform[13] + xform[8]*xform[1]*xform[15] - \
-                  xform[8]*xform[3]*xform[13] - xform[12]*xform[1]*xform[11] + xform[12]*xform[3]*xform[9]
-        inverted[13] = xform[0]*xform[9]*xform[14] - xform[0]*xform[10]*xform[13] - xform[8]*xform[1]*xform[14] + \
-                  xform[8]*xform[2]*xform[13] + xform[12]*xform[1]*xform[10] - xform[12]*xform[2]*xform[9]
-        inverted[2] = xform[1]*xform[6]*xform[15] - xform[1]*xform[7]*xform[14] - xform[5]*xform[2]*xform[15] + \
-                 xform[5]*xform[3]*xform[14] + xform[13]*xform[2]*xform[7] - xform[13]*xform[3]*xform[6]
-        inverted[6] = -xform[0]*xform[6]*xform[15] + xform[0]*xform[7]*xform[14] + xform[4]*xform[2]*xform[15] - \
-                  xform[4]*xform[3]*xform[14] - xform[12]*xform[2]*xform[7] + xform[12]*xform[3]*xform[6]
-        inverted[10] = xform[0]*xform[5]*xform[15] - xform[0]*xform[7]*xform[13] - xform[4]*xform[1]*xform[15] + \
-                  xform[4]*xform[3]*xform[13] + xform[12]*xform[1]*xform[7] - xform[12]*xform[3]*xform[5]
-        inverted[14] = -xform[0]*xform[5]*xform[14] + xform[0]*xform[6]*xform[13] + xform[4]*xform[1]*xform[14] - \
-                   xform[4]*xform[2]*xform[13] - xform[12]*xform[1]*xform[6] + xform[12]*xform[2]*xform[5]
-        inverted[3] = -xform[1]*xform[6]*xform[11] + xform[1]*xform[7]*xform[10] + xform[5]*xform[2]*xform[11] - \
-                  xform[5]*xform[3]*xform[10] - xform[9]*xform[2]*xform[7] + xform[9]*xform[3]*xform[6]
-        inverted[7] = xform[0]*xform[6]*xform[11] - xform[0]*xform[7]*xform[10] - xform[4]*xform[2]*xform[11] + \
-                 xform[4]*xform[3]*xform[10] + xform[8]*xform[2]*xform[7] - xform[8]*xform[3]*xform[6]
-        inverted[11] = -xform[0]*xform[5]*xform[11] + xform[0]*xform[7]*xform[9] + xform[4]*xform[1]*xform[11] - \
-                   xform[4]*xform[3]*xform[9] - xform[8]*xform[1]*xform[7] + xform[8]*xform[3]*xform[5]
-        inverted[15] = xform[0]*xform[5]*xform[10] - xform[0]*xform[6]*xform[9] - xform[4]*xform[1]*xform[10] + \
-                  xform[4]*xform[2]*xform[9] + xform[8]*xform[1]*xform[6] - xform[8]*xform[2]*xform[5]
-
-        det = xform[0]*inverted[0] + xform[1]*inverted[4] + xform[2]*inverted[8] + xform[3]*inverted[12];
-        if (det == 0):
+        a00, a01, a02, a03, a10, a11, a12, a13, a20, a21, a22, a23, a30, a31, a32, a33 = self._matrix
+        
+        s0 = a00*a11 - a10*a01
+        s1 = a00*a12 - a10*a02
+        s2 = a00*a13 - a10*a03
+        s3 = a01*a12 - a11*a02
+        s4 = a01*a13 - a11*a03
+        s5 = a02*a13 - a12*a03
+        
+        c5 = a22*a33 - a32*a23
+        c4 = a21*a33 - a31*a23
+        c3 = a21*a32 - a31*a22
+        c2 = a20*a33 - a30*a23
+        c1 = a20*a32 - a30*a22
+        c0 = a20*a31 - a30*a21
+        
+        det = s0*c5 - s1*c4 + s2*c3 + s3*c2 - s4*c1 + s5*c0
+        if det == 0.0:
             raise ZeroDivisionError("rmath.Transform.invert(): matrix cannot be inverted.")
-        det = 1.0 / det
-        self._matrix=[a * det for a in inverted]
+        
+        inv = 1.0 / det
+        
+        self._matrix = [
+            ( a11*c5 - a12*c4 + a13*c3) * inv, (-a01*c5 + a02*c4 - a03*c3) * inv, ( a31*s5 - a32*s4 + a33*s3) * inv, (-a21*s5 + a22*s4 - a23*s3) * inv,
+            (-a10*c5 + a12*c2 - a13*c1) * inv, ( a00*c5 - a02*c2 + a03*c1) * inv, (-a30*s5 + a32*s2 - a33*s1) * inv, ( a20*s5 - a22*s2 + a23*s1) * inv,
+            ( a10*c4 - a11*c2 + a13*c0) * inv, (-a00*c4 + a01*c2 - a03*c0) * inv, ( a30*s4 - a31*s2 + a33*s0) * inv, (-a20*s4 + a21*s2 - a23*s0) * inv,
+            (-a10*c3 + a11*c1 - a12*c0) * inv, ( a00*c3 - a01*c1 + a02*c0) * inv, (-a30*s3 + a31*s1 - a32*s0) * inv, ( a20*s3 - a21*s1 + a22*s0) * inv
+        ]
+
+
+def fromFlatList(matrix):
+    ''' Transform that takes over a flat list of 16 floats without copying or checking it '''
+    
+    transform = Transform.__new__(Transform)
+    transform._matrix = matrix
+    
+    return transform
+
+
+class VectorArray(object):
+    ''' (N,3) block of float3 vectors for batched math on many points at once.
+    
+        Indexing returns a Vector, slicing returns a VectorArray.
+    '''
+    
+    def __init__(self, *args):
+        object.__init__(self)
+        if args:
+            self.set(*args)
+        else:
+            self._vectors = np.zeros((0, 3))
+            
+    def __str__(self):
+        return str(self._vectors)
+        
+    def __len__(self):
+        return len(self._vectors)
+        
+    def __iter__(self):
+        return (Vector(row) for row in self._vectors.tolist())
+        
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Vector(self._vectors[index].tolist())
+        return VectorArray(self._vectors[index])
+        
+    def __setitem__(self, index, vector):
+        self._vectors[index] = getArray(vector)
+    
+    def __add__(self, vector):
+        return VectorArray(self._vectors + getArray(vector))
+    
+    def __sub__(self, vector):
+        return VectorArray(self._vectors - getArray(vector))
+        
+    def __mul__(self, vector):
+        if isinstance(vector, Transform):
+            matrix = vector.getArray()
+            return VectorArray(np.dot(self._vectors, matrix[:3, :3]) + matrix[3, :3])
+        elif isinstance(vector, TransformArray):
+            return vector.transformPoints(self)
+        
+        vector = getArray(vector)
+        if vector.ndim == 1 and len(vector) == len(self) and len(vector) != 3:
+            vector = vector[:, np.newaxis]
+        
+        return VectorArray(self._vectors * vector)
+        
+    def __truediv__(self, vector):
+        vector = getArray(vector)
+        if vector.ndim == 1 and len(vector) == len(self) and len(vector) != 3:
+            vector = vector[:, np.newaxis]
+        
+        return VectorArray(self._vectors / vector)
+        
+    def set(self, vectors):
+        ''' (N,3) array like, list of Vectors or list of maya objects '''
+        
+        if isinstance(vectors, VectorArray):
+            self._vectors = vectors._vectors.copy()
+            return
+        
+        vectors = list(vectors) if not isinstance(vectors, np.ndarray) else vectors
+        
+        if len(vectors) and isinstance(vectors[0], str):
+            self.fromMayaObj(vectors)
+            return
+        
+        self._vectors = np.array([getArray(vector) for vector in vectors] if len(vectors) and isinstance(vectors[0], Vector) else vectors, 
+                                 dtype=np.float64).reshape(-1, 3)
+        
+    def fromMayaObj(self, objs):
+        ''' world space positions of maya nodes '''
+        self._vectors = np.array([cmds.xform(obj, ws=True, q=True, t=True) for obj in objs], dtype=np.float64).reshape(-1, 3)
+        
+    def copy(self):
+        return VectorArray(self._vectors)
+        
+    def get(self):
+        ''' copy of the (N,3) numpy array '''
+        return self._vectors.copy()
+        
+    def toList(self):
+        return self._vectors.tolist()
+        
+    def length(self):
+        return np.sqrt(self.sqLength())
+        
+    def sqLength(self):
+        return np.einsum('ij,ij->i', self._vectors, self._vectors)
+        
+    def normalize(self):
+        self._vectors /= self.length()[:, np.newaxis]
+        
+    def dot(self, vector):
+        return (self._vectors * getArray(vector)).sum(axis=-1)
+        
+    def cross(self, vector):
+        return VectorArray(np.cross(self._vectors, getArray(vector)))
+        
+    def invert(self):
+        self._vectors *= -1
+        
+    def reflect(self, plane=None):
+        '''default plane: (-1,0,0)'''
+        plane = np.array([-1.0, 0.0, 0.0]) if plane is None else getArray(plane)
+        
+        self._vectors -= plane * 2 * self.dot(plane)[:, np.newaxis]
+        
+
+class TransformArray(object):
+    ''' (N,4,4) block of row major matrices for batched math on many transforms at once.
+    
+        Indexing returns a Transform, slicing returns a TransformArray.
+    '''
+    
+    def __init__(self, *args):
+        object.__init__(self)
+        if args:
+            self.set(*args)
+        else:
+            self._matrices = np.zeros((0, 4, 4))
+            
+    def __str__(self):
+        return str(self._matrices)
+        
+    def __len__(self):
+        return len(self._matrices)
+        
+    def __iter__(self):
+        return (Transform(matrix) for matrix in self._matrices)
+        
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Transform(self._matrices[index])
+        return TransformArray(self._matrices[index])
+        
+    def __setitem__(self, index, transform):
+        self._matrices[index] = transform.getArray() if isinstance(transform, Transform) else np.reshape(transform, (4, 4))
+        
+    def __mul__(self, transform):
+        if isinstance(transform, Transform):
+            return TransformArray(np.matmul(self._matrices, transform.getArray()))
+        elif isinstance(transform, TransformArray):
+            return TransformArray(np.matmul(self._matrices, transform._matrices))
+        else:
+            raise TypeError("rmath.TransformArray.__mul__(): {} and {} are unsupported.".format(self.__class__.__name__ ,transform.__class__.__name__))
+        
+    def set(self, transforms):
+        ''' (N,4,4) or (N,16) array like, list of Transforms or list of maya objects '''
+        
+        if isinstance(transforms, TransformArray):
+            self._matrices = transforms._matrices.copy()
+            return
+        
+        transforms = list(transforms) if not isinstance(transforms, np.ndarray) else transforms
+        
+        if len(transforms) and isinstance(transforms[0], str):
+            self.fromMayaObj(transforms)
+            return
+        
+        if len(transforms) and isinstance(transforms[0], Transform):
+            transforms = [transform._matrix for transform in transforms]
+            
+        self._matrices = np.array(transforms, dtype=np.float64).reshape(-1, 4, 4)
+        
+    def fromMayaObj(self, objs):
+        ''' world space matrices of maya nodes '''
+        self._matrices = np.array([cmds.xform(obj, ws=True, m=True, q=True) for obj in objs], dtype=np.float64).reshape(-1, 4, 4)
+        
+    def identity(self, count=None):
+        self._matrices = np.tile(np.identity(4), (len(self) if count is None else count, 1, 1))
+        
+    def copy(self):
+        return TransformArray(self._matrices)
+        
+    def get(self):
+        ''' copy of the (N,4,4) numpy array '''
+        return self._matrices.copy()
+        
+    def toList(self):
+        ''' list of flat 16 float lists, ready for cmds.xform(matrix=) '''
+        return self._matrices.reshape(-1, 16).tolist()
+        
+    def getTranslation(self):
+        return VectorArray(self._matrices[:, 3, :3])
+        
+    def setTranslation(self, vectors):
+        self._matrices[:, 3, :3] = getArray(vectors)
+        
+    def translate(self, vectors):
+        self._matrices[:, 3, :3] += getArray(vectors)
+        
+    def xAxis(self):
+        return VectorArray(self._matrices[:, 0, :3])
+    
+    def yAxis(self):
+        return VectorArray(self._matrices[:, 1, :3])
+
+    def zAxis(self):
+        return VectorArray(self._matrices[:, 2, :3])
+        
+    def getRotation(self, rotateOrder="xyz"):
+        '''(N,3) euler rotations in degrees'''
+        return np.degrees(matrixToEuler(self._matrices, rotateOrder))
+        
+    def transformPoints(self, points):
+        ''' points times each matrix, a single point or one point per matrix '''
+        
+        points = getArray(points).reshape(-1, 3)
+        
+        return VectorArray(np.einsum('ni,nij->nj', np.broadcast_to(points, (len(self), 3)), self._matrices[:, :3, :3]) + self._matrices[:, 3, :3])
+        
+    def det(self):
+        '''determinate of every matrix'''
+        return np.linalg.det(self._matrices)
+        
+    def transpose(self):
+        self._matrices = np.ascontiguousarray(self._matrices.transpose(0, 2, 1))
+        
+    def invert(self):
+        '''invert every matrix in place.'''
+        try:
+            self._matrices = np.linalg.inv(self._matrices)
+        except np.linalg.LinAlgError:
+            raise ZeroDivisionError("rmath.TransformArray.invert(): matrix cannot be inverted.")
+
+        
+class Quaternion(object):
+    ''' x, y, z, w rotation quaternion, holds one (4,) or a batch of (N,4) quaternions.
+    
+        Multiplication follows Transform, q1 * q2 rotates by q1 then q2.
+    '''
+    
+    def __init__(self, *args):
+        object.__init__(self)
+        if args:
+            self.set(*args)
+        else:
+            self.identity()
+            
+    def __str__(self):
+        return str(self._quat)
+        
+    def __len__(self):
+        return len(self._quat) if self._quat.ndim > 1 else 4
+        
+    def __getitem__(self, index):
+        return Quaternion(self._quat[index])
+        
+    def __mul__(self, quaternion):
+        if isinstance(quaternion, Quaternion):
+            return Quaternion(quatMultiply(quaternion._quat, self._quat))
+        else:
+            raise TypeError("rmath.Quaternion.__mul__(): {} and {} are unsupported.".format(self.__class__.__name__ ,quaternion.__class__.__name__))
+    
+    def set(self, *args):
+        ''' x, y, z, w floats, a (4,)/(N,4) array like, a Quaternion, Transform or TransformArray '''
+        
+        if len(args) == 4:
+            self._quat = np.array(args, dtype=np.float64)
+        elif isinstance(args[0], Quaternion):
+            self._quat = args[0]._quat.copy()
+        elif isinstance(args[0], (Transform, TransformArray)):
+            self.fromTransform(args[0])
+        else:
+            self._quat = np.array(args[0], dtype=np.float64)
+        
+        if self._quat.shape[-1] != 4:
+            raise RuntimeError("rmath.Quaternion.set(): invalid arguments '{}' ".format(args))
+        
+    def identity(self):
+        self._quat = np.array([0.0, 0.0, 0.0, 1.0])
+        
+    def copy(self):
+        return Quaternion(self._quat)
+        
+    def get(self):
+        ''' copy of the (4,) or (N,4) numpy array '''
+        return self._quat.copy()
+        
+    def fromTransform(self, transform):
+        ''' rotation of a Transform or TransformArray, scale and shear are removed '''
+        self._quat = matrixToQuat(getArray(transform))
+        
+    def toTransform(self):
+        ''' rotation only Transform, TransformArray for a batch '''
+        
+        matrices = np.zeros(self._quat.shape[:-1] + (4, 4))
+        matrices[..., :3, :3] = quatToMatrix(self._quat)
+        matrices[..., 3, 3] = 1.0
+        
+        if self._quat.ndim > 1:
+            return TransformArray(matrices)
+        return Transform(matrices)
+        
+    def getRotation(self, rotateOrder="xyz"):
+        ''' euler rotations in degrees '''
+        return np.degrees(matrixToEuler(quatToMatrix(self._quat), rotateOrder))
+        
+    def normalize(self):
+        self._quat = self._quat / np.linalg.norm(self._quat, axis=-1)[..., np.newaxis]
+        
+    def conjugate(self):
+        self._quat = self._quat * [-1.0, -1.0, -1.0, 1.0]
+        
+    def invert(self):
+        self.conjugate()
+        self._quat = self._quat / (self._quat ** 2).sum(axis=-1)[..., np.newaxis]
+        
+    def dot(self, quaternion):
+        return (self._quat * getArray(quaternion)).sum(axis=-1)
+        
+    def rotate(self, vectors):
+        ''' rotate a Vector or VectorArray, one vector or one per quaternion '''
+        
+        rotated = np.einsum('...i,...ij->...j', getArray(vectors), quatToMatrix(self._quat))
+        
+        if rotated.ndim > 1:
+            return VectorArray(rotated)
+        return Vector(rotated.tolist())
+        
+    def slerp(self, quaternion, weight):
+        return Quaternion(quatSlerp(self._quat, getArray(quaternion), weight))
+        
+    def nlerp(self, quaternion, weight):
+        return Quaternion(quatNlerp(self._quat, getArray(quaternion), weight))
+        
+
+class DualQuaternion(object):
+    ''' rigid transform as a real rotation quaternion and a dual translation quaternion.
+    
+        Holds one or a batch of transforms like Quaternion, scale is not carried.
+    '''
+    
+    def __init__(self, *args):
+        object.__init__(self)
+        if args:
+            self.set(*args)
+        else:
+            self.identity()
+            
+    def __str__(self):
+        return "{}\n{}".format(self.real, self.dual)
+        
+    def __len__(self):
+        return len(self.real) if self.real.ndim > 1 else 8
+        
+    def __getitem__(self, index):
+        return DualQuaternion(self.real[index], self.dual[index])
+        
+    def __mul__(self, dual_quaternion):
+        if isinstance(dual_quaternion, DualQuaternion):
+            return DualQuaternion(quatMultiply(dual_quaternion.real, self.real),
+                                  quatMultiply(dual_quaternion.real, self.dual) + quatMultiply(dual_quaternion.dual, self.real))
+        else:
+            raise TypeError("rmath.DualQuaternion.__mul__(): {} and {} are unsupported.".format(self.__class__.__name__ ,dual_quaternion.__class__.__name__))
+    
+    def set(self, *args):
+        ''' real and dual arrays, a DualQuaternion, Transform or TransformArray '''
+        
+        if len(args) == 2:
+            self.real = np.array(getArray(args[0]), dtype=np.float64)
+            self.dual = np.array(getArray(args[1]), dtype=np.float64)
+        elif isinstance(args[0], DualQuaternion):
+            self.real = args[0].real.copy()
+            self.dual = args[0].dual.copy()
+        elif isinstance(args[0], (Transform, TransformArray)):
+            self.fromTransform(args[0])
+        else:
+            raise RuntimeError("rmath.DualQuaternion.set(): invalid arguments '{}' ".format(args))
+        
+    def identity(self):
+        self.real = np.array([0.0, 0.0, 0.0, 1.0])
+        self.dual = np.zeros(4)
+        
+    def copy(self):
+        return DualQuaternion(self.real, self.dual)
+        
+    def fromTransform(self, transform):
+        matrices = getArray(transform)
+        
+        self.real = matrixToQuat(matrices)
+        
+        translation = np.zeros(self.real.shape)
+        translation[..., :3] = matrices[..., 3, :3]
+        self.dual = 0.5 * quatMultiply(translation, self.real)
+        
+    def getTranslation(self):
+        translation = 2.0 * quatMultiply(self.dual, self.real * [-1.0, -1.0, -1.0, 1.0])[..., :3]
+        
+        if translation.ndim > 1:
+            return VectorArray(translation)
+        return Vector(translation.tolist())
+        
+    def toTransform(self):
+        ''' Transform, TransformArray for a batch '''
+        
+        transform = Quaternion(self.real).toTransform()
+        transform.setTranslation(self.getTranslation())
+        
+        return transform
+        
+    def normalize(self):
+        length = np.linalg.norm(self.real, axis=-1)[..., np.newaxis]
+        
+        self.real = self.real / length
+        self.dual = self.dual / length
+        
+        # keep the dual part orthogonal to the real part
+        self.dual = self.dual - self.real * (self.real * self.dual).sum(axis=-1)[..., np.newaxis]
+        
+
+def quatMultiply(quat_a, quat_b):
+    ''' hamilton product of (...,4) x, y, z, w arrays, rotates by quat_b then quat_a '''
+    
+    ax, ay, az, aw = np.moveaxis(np.asarray(quat_a, dtype=np.float64), -1, 0)
+    bx, by, bz, bw = np.moveaxis(np.asarray(quat_b, dtype=np.float64), -1, 0)
+    
+    return np.stack((aw*bx + ax*bw + ay*bz - az*by,
+                     aw*by - ax*bz + ay*bw + az*bx,
+                     aw*bz + ax*by - ay*bx + az*bw,
+                     aw*bw - ax*bx - ay*by - az*bz), axis=-1)
+
+def quatToMatrix(quats):
+    ''' (...,3,3) row major rotation matrices from (...,4) quaternions '''
+    
+    quats = np.asarray(quats, dtype=np.float64)
+    xx, yy, zz, ww = np.moveaxis(quats / np.linalg.norm(quats, axis=-1)[..., np.newaxis], -1, 0)
+    
+    return np.stack((np.stack((1 - 2*(yy*yy + zz*zz), 2*(xx*yy + zz*ww), 2*(xx*zz - yy*ww)), axis=-1),
+                     np.stack((2*(xx*yy - zz*ww), 1 - 2*(xx*xx + zz*zz), 2*(yy*zz + xx*ww)), axis=-1),
+                     np.stack((2*(xx*zz + yy*ww), 2*(yy*zz - xx*ww), 1 - 2*(xx*xx + yy*yy)), axis=-1)), axis=-2)
+
+def matrixToQuat(matrices):
+    ''' (...,4) quaternions from (...,3,3) or (...,4,4) row major matrices, scale and shear are removed '''
+    
+    rows = orthonormalize(matrices)
+    
+    r00, r01, r02 = rows[..., 0, 0], rows[..., 0, 1], rows[..., 0, 2]
+    r10, r11, r12 = rows[..., 1, 0], rows[..., 1, 1], rows[..., 1, 2]
+    r20, r21, r22 = rows[..., 2, 0], rows[..., 2, 1], rows[..., 2, 2]
+    
+    # one candidate per component, the one built off the largest component is the stable one
+    candidates = np.stack((np.stack((1 + r00 - r11 - r22, r10 + r01, r20 + r02, r12 - r21), axis=-1),
+                           np.stack((r10 + r01, 1 - r00 + r11 - r22, r21 + r12, r20 - r02), axis=-1),
+                           np.stack((r20 + r02, r21 + r12, 1 - r00 - r11 + r22, r01 - r10), axis=-1),
+                           np.stack((r12 - r21, r20 - r02, r01 - r10, 1 + r00 + r11 + r22), axis=-1)), axis=-2)
+    
+    best = np.argmax(np.diagonal(candidates, axis1=-2, axis2=-1), axis=-1)
+    quats = np.take_along_axis(candidates, best[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    
+    return quats / np.linalg.norm(quats, axis=-1)[..., np.newaxis]
+
+def quatNlerp(quat_a, quat_b, weight):
+    ''' normalized linear blend along the shortest path, weight is a float or one per quaternion '''
+    
+    quat_a = np.asarray(quat_a, dtype=np.float64)
+    quat_b = np.asarray(quat_b, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)[..., np.newaxis]
+    
+    quat_b = np.where((quat_a * quat_b).sum(axis=-1)[..., np.newaxis] < 0, -quat_b, quat_b)
+    blended = quat_a * (1.0 - weight) + quat_b * weight
+    
+    return blended / np.linalg.norm(blended, axis=-1)[..., np.newaxis]
+
+def quatSlerp(quat_a, quat_b, weight):
+    ''' spherical blend along the shortest path, weight is a float or one per quaternion '''
+    
+    quat_a = np.asarray(quat_a, dtype=np.float64)
+    quat_b = np.asarray(quat_b, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)[..., np.newaxis]
+    
+    dot = (quat_a * quat_b).sum(axis=-1)[..., np.newaxis]
+    quat_b = np.where(dot < 0, -quat_b, quat_b)
+    dot = np.minimum(np.abs(dot), 1.0)
+    
+    angle = np.arccos(dot)
+    sin_angle = np.sin(angle)
+    
+    # nearly parallel quaternions fall back to nlerp
+    close = sin_angle < 1e-6
+    safe_sin = np.where(close, 1.0, sin_angle)
+    
+    weight_a = np.where(close, 1.0 - weight, np.sin((1.0 - weight) * angle) / safe_sin)
+    weight_b = np.where(close, weight, np.sin(weight * angle) / safe_sin)
+    
+    blended = quat_a * weight_a + quat_b * weight_b
+    
+    return blended / np.linalg.norm(blended, axis=-1)[..., np.newaxis]
+
+def quatBlend(quats, weights):
+    ''' weighted average of (K,...,4) quaternions with (K,) or (K,...) weights, each aligned to the first's hemisphere '''
+    
+    quats = np.asarray(quats, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights.reshape(weights.shape + (1,) * (quats.ndim - weights.ndim))
+    
+    signs = np.where((quats * quats[0]).sum(axis=-1)[..., np.newaxis] < 0, -1.0, 1.0)
+    blended = (quats * signs * weights).sum(axis=0)
+    
+    return blended / np.linalg.norm(blended, axis=-1)[..., np.newaxis]
+
+def dualQuatBlend(dual_quaternions, weights):
+    ''' dual quaternion linear blend of a list of DualQuaternions, weights are floats or one array per dual quaternion
+    
+        returns: DualQuaternion
+    '''
+    
+    reals = np.array([dq.real for dq in dual_quaternions])
+    duals = np.array([dq.dual for dq in dual_quaternions])
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights.reshape(weights.shape + (1,) * (reals.ndim - weights.ndim))
+    
+    signs = np.where((reals * reals[0]).sum(axis=-1)[..., np.newaxis] < 0, -1.0, 1.0) * weights
+    
+    blended = DualQuaternion((reals * signs).sum(axis=0), (duals * signs).sum(axis=0))
+    blended.normalize()
+    
+    return blended
+
+def orthonormalize(matrices):
+    ''' Rotation part of (...,3,3) or (...,4,4) row major matrices with scale and shear removed.
+    
+        Gram-Schmidt down the rows, x then y then z, which matches maya's scale * shear * rotate order.
+        Negative scale is taken out of all three axes so the result is always a proper rotation.
+    '''
+    
+    rows = np.array(matrices, dtype=np.float64)[..., :3, :3]
+    
+    x_axis = rows[..., 0, :] / np.linalg.norm(rows[..., 0, :], axis=-1)[..., np.newaxis]
+    y_axis = rows[..., 1, :] - (rows[..., 1, :] * x_axis).sum(axis=-1)[..., np.newaxis] * x_axis
+    y_axis /= np.linalg.norm(y_axis, axis=-1)[..., np.newaxis]
+    z_axis = np.cross(x_axis, y_axis)
+    
+    # a mirrored matrix
+    flip = np.where((rows[..., 2, :] * z_axis).sum(axis=-1) < 0, -1.0, 1.0)[..., np.newaxis]
+    
+    return np.stack((x_axis * flip, y_axis * flip, z_axis), axis=-2)
+
+def matrixToEuler(matrices, rotateOrder="xyz"):
+    ''' Euler angles in radians from (...,3,3) or (...,4,4) row major matrices.
+    
+        Works on a single matrix or a whole batch, returns (...,3) x, y, z angles for maya's rotate order.
+    '''
+    
+    first, second, third, parity = rotateOrderAxes(rotateOrder)
+    
+    matrices = np.asarray(matrices, dtype=np.float64)
+    if matrices.ndim == 2:
+        return np.array(singleMatrixToEuler(matrices[:3, :3].tolist(), first, second, third, parity))
+    
+    # maya row vectors apply the first axis first, transposed it is a column vector rotation
+    rotation = np.swapaxes(orthonormalize(matrices), -1, -2)
+    
+    sin_second = -parity * rotation[..., third, first]
+    cos_second = np.sqrt(rotation[..., third, second] ** 2 + rotation[..., third, third] ** 2)
+    
+    gimbal = cos_second < 1e-9
+    
+    angles = np.empty(rotation.shape[:-2] + (3,))
+    angles[..., first] = np.where(gimbal,
+                                  np.arctan2(-parity * rotation[..., second, third], rotation[..., second, second]),
+                                  np.arctan2(parity * rotation[..., third, second], rotation[..., third, third]))
+    angles[..., second] = np.arctan2(sin_second, cos_second)
+    angles[..., third] = np.where(gimbal, 0.0, np.arctan2(parity * rotation[..., second, first], rotation[..., first, first]))
+    
+    return angles
+
+def rotateOrderAxes(rotateOrder):
+    ''' first, second and third axis indices and the sine sign for a rotate order string or enum int '''
+    
+    if not isinstance(rotateOrder, str):
+        rotateOrder = ROTATE_ORDERS[rotateOrder]
+    
+    first, second, third = ["xyz".index(axis) for axis in rotateOrder.lower()]
+    
+    # odd permutations flip the sign of the sine terms
+    parity = 1.0 if rotateOrder.lower() in ROTATE_ORDERS[:3] else -1.0
+    
+    return first, second, third, parity
+
+def singleMatrixToEuler(rows, first, second, third, parity):
+    ''' matrixToEuler for one 3x3 nested list, plain floats are much quicker than numpy at this size '''
+    
+    (x0, x1, x2), (y0, y1, y2), (z0, z1, z2) = rows
+    
+    length = math.sqrt(x0*x0 + x1*x1 + x2*x2)
+    x0, x1, x2 = x0/length, x1/length, x2/length
+    
+    dot = y0*x0 + y1*x1 + y2*x2
+    y0, y1, y2 = y0 - dot*x0, y1 - dot*x1, y2 - dot*x2
+    length = math.sqrt(y0*y0 + y1*y1 + y2*y2)
+    y0, y1, y2 = y0/length, y1/length, y2/length
+    
+    cz0, cz1, cz2 = x1*y2 - x2*y1, x2*y0 - x0*y2, x0*y1 - x1*y0
+    
+    if z0*cz0 + z1*cz1 + z2*cz2 < 0:
+        x0, x1, x2, y0, y1, y2 = -x0, -x1, -x2, -y0, -y1, -y2
+    
+    # transposed into a column vector rotation
+    rotation = ((x0, y0, cz0), (x1, y1, cz1), (x2, y2, cz2))
+    
+    sin_second = -parity * rotation[third][first]
+    cos_second = math.sqrt(rotation[third][second] ** 2 + rotation[third][third] ** 2)
+    
+    angles = [0.0, 0.0, 0.0]
+    angles[second] = math.atan2(sin_second, cos_second)
+    
+    if cos_second < 1e-9:
+        angles[first] = math.atan2(-parity * rotation[second][third], rotation[second][second])
+    else:
+        angles[first] = math.atan2(parity * rotation[third][second], rotation[third][third])
+        angles[third] = math.atan2(parity * rotation[second][first], rotation[first][first])
+    
+    return angles
 
+def eulerToMatrix(angles, rotateOrder="xyz"):
+    ''' (...,3,3) row major rotation matrices from (...,3) x, y, z euler angles in radians '''
+    
+    if not isinstance(rotateOrder, str):
+        rotateOrder = ROTATE_ORDERS[rotateOrder]
+    
+    angles = np.asarray(angles, dtype=np.float64)
+    cos = np.cos(angles)
+    sin = np.sin(angles)
+    
+    axis_matrices = {}
+    for axis, (aa, bb) in zip("xyz", [(1, 2), (2, 0), (0, 1)]):
+        matrix = np.zeros(angles.shape[:-1] + (3, 3))
+        index = "xyz".index(axis)
         
+        matrix[..., index, index] = 1.0
+        matrix[..., aa, aa] = cos[..., index]
+        matrix[..., bb, bb] = cos[..., index]
+        matrix[..., aa, bb] = sin[..., index]
+        matrix[..., bb, aa] = -sin[..., index]
+        axis_matrices[axis] = matrix
+    
+    order = rotateOrder.lower()
+    
+    return np.matmul(np.matmul(axis_matrices[order[0]], axis_matrices[order[1]]), axis_matrices[order[2]])
+
+def getArray(value):
+    ''' numpy array from a Vector, VectorArray, Transform, number or array like '''
+    
+    if isinstance(value, Vector):
+        return np.array(value.get())
+    if isinstance(value, VectorArray):
+        return value._vectors
+    if isinstance(value, Transform):
+        return value.getArray()
+    if isinstance(value, TransformArray):
+        return value._matrices
+    if isinstance(value, Quaternion):
+        return value._quat
+    
+    return np.asarray(value, dtype=np.float64)
+
 def getVectorFromAxis(axis):
     ''' return a 3 integer list from a axis string '''
     
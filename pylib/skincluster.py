@@ -1,141 +1,341 @@
 
+import hashlib
 import json
 import os
+import sys
+import zipfile
+import concurrent.futures
 import functools
 
+import numpy as np
+
+# scipy isn't shipped with mayapy, the sparse math and closest point lookups fall back to numpy without it
+try:
+    import scipy.sparse as scipy_sparse
+except ImportError:
+    scipy_sparse = None
+
+try:
+    import scipy.spatial as scipy_spatial
+except ImportError:
+    scipy_spatial = None
+
 import maya.cmds as cmds
 import maya.mel as mel
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
 import xml.etree.ElementTree
 
 import rigpie.pylib.joint as joint_pylib
+import rigpie.pylib.mayalist as mayalist_pylib
+import rigpie.pylib.skinweights as skinweights_pylib
+import rigpie.pylib.apiundo as apiundo_pylib
+
 
-def skinAs(source, target, removeUnused=False):
-    ''' Copy one objects skinweights and influences to another object without a skincluster.'''
+# CONSTANTS
+WEIGHTS_ATTRIBUTES = ['envelope', 'skinningMethod', 'normalizeWeights', 'deformUserNormals', 'useComponents']
+WEIGHTS_FILE_TYPES = ['npz', 'xml']
+WEIGHTS_MANIFEST = "skinweights_manifest.json"
+WEIGHTS_BLOCK_SIZE = 10000
+
+def skinAs(source, target, removeUnused=False, neighbors=3):
+    ''' Copy one objects skinweights and influences to another object without a skincluster.
+    
+        target: a mesh or a list of meshes, the source lookup is only built once for all of them
+        removeUnused: only bind the influences that end up with weight on the target
+        neighbors: closest source verts blended by inverse distance for each target vertex
+    '''
     
     source_skincluster = findRelatedSkinCluster(source)
-    influences = cmds.skinCluster(source_skincluster, inf=True, q=True)
+    source_weights, influences = getWeights(source_skincluster)
+    
+    source_mesh = cmds.skinCluster(source_skincluster, query=True, geometry=True)[0]
+    locator = ClosestPointLocator(getVertexPositions(source_mesh))
+    
+    targets = target if isinstance(target, list) else [target]
+    
+    target_skinclusters = []
+    for tt in targets:
+        target_weights = transferWeights(locator, source_weights, getVertexPositions(tt), neighbors=neighbors)
+        
+        columns = list(range(len(influences)))
+        if removeUnused:
+            columns = list(np.flatnonzero(target_weights.any(axis=0)))
+        
+        bind_influences = [influences[column] for column in columns]
+        
+        cmds.select(bind_influences)
+        target_skincluster = cmds.skinCluster(tt, bind_influences, bindMethod=0, toSelectedBones=True)[0]
+        
+        setWeights(target_skincluster, target_weights[:, columns], bind_influences, normalize=True)
+        
+        target_skinclusters.append(target_skincluster)
+
+    if isinstance(target, list):
+        return target_skinclusters
+
+    return target_skinclusters[0]
+
+def getVertexPositions(mesh):
+    ''' world space vertex positions of a mesh as a (verts, 3) array '''
     
-    cmds.select(influences)
-    target_skincluster = cmds.skinCluster(target, influences, bindMethod=0, toSelectedBones=True)[0]
+    selection = om.MSelectionList()
+    selection.add(mesh)
     
-    cmds.copySkinWeights( ss=source_skincluster, ds=target_skincluster, surfaceAssociation="closestPoint", influenceAssociation=["label","closestJoint"], noMirror=True, normalize=True)
+    points = om.MFnMesh(selection.getDagPath(0)).getPoints(om.MSpace.kWorld)
+    
+    return np.array([(point.x, point.y, point.z) for point in points], dtype=np.float64)
+
 
-    if removeUnused:
-        removeUnusedInfluences(target_skincluster)
+class ClosestPointLocator(object):
+    ''' Nearest vertex lookups over a point cloud.
+    
+        Uses a scipy cKDTree when scipy is installed, otherwise a numpy uniform grid that only
+        compares each point against the 27 cells around it.
+    '''
+    
+    # average source points per grid cell for the numpy fallback
+    POINTS_PER_CELL = 4
+    
+    # query points handled at once by the numpy fallback, keeps the candidate tables small
+    CHUNK_SIZE = 4096
+    
+    # most (point, source point) distances the brute force pass holds at once, about 32MB of float64
+    BRUTE_FORCE_BLOCK = 4194304
+    
+    def __init__(self, positions):
+        object.__init__(self)
+        
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.tree = None
+        
+        if scipy_spatial is not None:
+            self.tree = scipy_spatial.cKDTree(self.positions)
+            return
+        
+        # bucket the points into a grid, sorted by cell id so a cell is one contiguous slice
+        self.minimum = self.positions.min(axis=0)
+        extent = np.maximum(self.positions.max(axis=0) - self.minimum, 1e-9)
+        
+        cell_count = max(len(self.positions) / float(self.POINTS_PER_CELL), 1.0)
+        self.cell_size = max((np.prod(extent) / cell_count) ** (1.0/3.0), extent.max() / 1024.0)
+        self.grid_shape = (np.floor(extent / self.cell_size).astype(np.int64) + 1)
+        
+        cell_ids = self.cellIds(self.cellCoords(self.positions))
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.sorted_cell_ids = cell_ids[self.order]
+        
+    def cellCoords(self, points):
+        return np.floor((points - self.minimum) / self.cell_size).astype(np.int64)
+        
+    def cellIds(self, coords):
+        return coords[:, 0] + self.grid_shape[0] * (coords[:, 1] + self.grid_shape[1] * coords[:, 2])
+            
+    def query(self, points, neighbors=1):
+        ''' returns (distances, indices) both shaped (points, neighbors), closest first '''
+        
+        points = np.asarray(points, dtype=np.float64)
+        neighbors = min(neighbors, len(self.positions))
+        
+        if self.tree is not None:
+            distances, indices = self.tree.query(points, k=neighbors)
+            return distances.reshape(len(points), neighbors), indices.reshape(len(points), neighbors)
+        
+        distances = np.empty((len(points), neighbors))
+        indices = np.empty((len(points), neighbors), dtype=np.int64)
+        
+        for start in range(0, len(points), self.CHUNK_SIZE):
+            chunk = points[start:start+self.CHUNK_SIZE]
+            distances[start:start+len(chunk)], indices[start:start+len(chunk)] = self.queryGrid(chunk, neighbors)
+            
+        return distances, indices
+        
+    def queryGrid(self, points, neighbors):
+        ''' grid search for one chunk, falls back to brute force for points the 27 cells can't answer '''
+        
+        point_count = len(points)
+        coords = self.cellCoords(points)
+        
+        # slice of sorted points for every one of the 27 surrounding cells
+        offsets = np.array([(x, y, z) for z in (-1, 0, 1) for y in (-1, 0, 1) for x in (-1, 0, 1)])
+        neighbor_coords = coords[:, np.newaxis, :] + offsets[np.newaxis, :, :]
+        
+        inside = np.all((neighbor_coords >= 0) & (neighbor_coords < self.grid_shape), axis=2)
+        cell_ids = self.cellIds(neighbor_coords.reshape(-1, 3)).reshape(point_count, 27)
+        
+        starts = np.searchsorted(self.sorted_cell_ids, cell_ids, side="left")
+        ends = np.searchsorted(self.sorted_cell_ids, cell_ids, side="right")
+        counts = np.where(inside, ends - starts, 0).ravel()
+        
+        # flatten every (point, candidate) pair
+        owners = np.repeat(np.repeat(np.arange(point_count), 27), counts)
+        positions = np.repeat(starts.ravel() - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+        candidates = self.order[positions]
+        
+        squared = ((self.positions[candidates] - points[owners]) ** 2).sum(axis=1)
+        
+        # sort pairs by point then distance and keep the first few of every point
+        pair_order = np.lexsort((squared, owners))
+        owners = owners[pair_order]
+        candidates = candidates[pair_order]
+        squared = squared[pair_order]
+        
+        candidate_counts = np.bincount(owners, minlength=point_count)
+        first = np.concatenate(([0], np.cumsum(candidate_counts)[:-1]))
+        
+        distances = np.full((point_count, neighbors), np.inf)
+        indices = np.zeros((point_count, neighbors), dtype=np.int64)
+        
+        for nn in range(neighbors):
+            has_candidate = candidate_counts > nn
+            distances[has_candidate, nn] = np.sqrt(squared[first[has_candidate] + nn])
+            indices[has_candidate, nn] = candidates[first[has_candidate] + nn]
+        
+        # anything outside the 27 cells is at least a cell away, closer answers are exact
+        unresolved = np.flatnonzero(distances[:, -1] > self.cell_size)
+        if unresolved.size:
+            distances[unresolved], indices[unresolved] = self.queryBruteForce(points[unresolved], neighbors)
+            
+        return distances, indices
+        
+    def queryBruteForce(self, points, neighbors):
+        ''' exact search for the points the grid couldn't answer.
+        
+            Walks the source points in blocks and keeps a running closest few per point, so memory
+            stays at BRUTE_FORCE_BLOCK distances however big the source is.
+        '''
+        
+        point_count = len(points)
+        
+        # distances from |p|^2 + |s|^2 - 2p.s, relative to the grid corner to keep the precision
+        points = points - self.minimum
+        point_squared = (points ** 2).sum(axis=1)[:, np.newaxis]
+        
+        best_squared = np.full((point_count, neighbors), np.inf)
+        best_indices = np.zeros((point_count, neighbors), dtype=np.int64)
+        
+        block_size = max(self.BRUTE_FORCE_BLOCK // max(point_count, 1), neighbors)
+        
+        for start in range(0, len(self.positions), block_size):
+            source = self.positions[start:start+block_size] - self.minimum
+            
+            squared = point_squared + (source ** 2).sum(axis=1)[np.newaxis, :] - 2.0 * points.dot(source.T)
+            np.maximum(squared, 0.0, out=squared)
+            
+            candidates_squared = np.concatenate((best_squared, squared), axis=1)
+            candidates = np.concatenate((best_indices, np.broadcast_to(np.arange(start, start+len(source)), squared.shape)), axis=1)
+            
+            closest = np.argpartition(candidates_squared, neighbors-1, axis=1)[:, :neighbors]
+            best_squared = np.take_along_axis(candidates_squared, closest, axis=1)
+            best_indices = np.take_along_axis(candidates, closest, axis=1)
+        
+        order = np.argsort(best_squared, axis=1)
+        
+        return np.sqrt(np.take_along_axis(best_squared, order, axis=1)), np.take_along_axis(best_indices, order, axis=1)
 
-    return target_skincluster
+def transferWeights(locator, source_weights, target_positions, neighbors=3):
+    ''' Interpolate source weights onto every target position in one batched query.
+    
+        locator: ClosestPointLocator built over the source vertex positions
+        returns: normalized (target verts, influences) weights
+    '''
+    
+    distances, indices = locator.query(target_positions, neighbors=neighbors)
+    
+    # inverse distance blend, a target sitting on a source vertex takes its weights exactly
+    inverse = 1.0 / np.maximum(distances, 1e-12) ** 2
+    exact = distances[:, 0] <= 1e-9
+    inverse[exact] = 0.0
+    inverse[exact, 0] = 1.0
+    
+    blend = inverse / inverse.sum(axis=1, keepdims=True)
+    
+    source_weights = np.asarray(source_weights, dtype=np.float64)
+    target_weights = np.einsum('pn,pni->pi', blend, source_weights[indices])
+    
+    return skinweights_pylib.normalizeWeights(target_weights)
 
 def selectVertsGreaterThanThreshold(mesh_objects, threshold=4):
     ''' select all the verts who have influences count higher than threshold '''
     
+    res = []
     for mesh in mesh_objects:
-        skincluster = findRelatedSkinCluster(mesh_objects)
+        skincluster = findRelatedSkinCluster(mesh)
         if not skincluster:
             cmds.warning( "skincluster.selectVertsGreaterThanThreshold(): no valid skincluster found on {}".format(mesh))
             continue
         
-        for mesh in cmds.skinCluster(skincluster, q=True, geometry=True):
-            vertices = cmds.polyListComponentConversion(mesh, toVertex=True)
-            vertices = cmds.filterExpand(vertices, selectionMask=31)  # polygon vertex
-
-            res = []
-            for vert in vertices:
-                joints = cmds.skinPercent(skincluster, vert, query=True, ignoreBelow=0.000001, transform=None)
-
-                if len(joints) > threshold:
-                    res.append(vert)
+        weight_matrix = WeightMatrix(skincluster, ignoreBelow=0.000001)
+        
+        res += mayalist_pylib.vertexRanges(mesh, weight_matrix.vertsAboveInfluenceCount(threshold))
 
     cmds.select(res)
     
 
 def copyAvgWeights(normalize=True):
     ''' Copy the average skincluster weights from the selected points. '''
-    selection = cmds.ls(selection=True, flatten=True)
+    selection = cmds.ls(selection=True)
     mesh = cmds.ls(selection=True, objectsOnly=True)
     
     try:
         skincluster = findRelatedSkinCluster (mesh[0])
     except IndexError:
         print ("skincluster.copyAvgWeights(): Please select a mesh vert.")
+        return
     
-    master_dict = {}
-    averaged_weights = {}
-    count = 0
+    vertex_indices = mayalist_pylib.getVertexIndices(selection)
+    if not vertex_indices:
+        print ("skincluster.copyAvgWeights(): No verts selected")
+        return
+    
+    weights, influences = getWeights(skincluster, vertexIndices=vertex_indices)
+    
+    # rows come back in selection order, weights under the skinPercent ignoreBelow tolerance count as zero
+    weight_matrix = WeightMatrix(weights=weights, influences=influences, ignoreBelow=0.00001)
+    averages = weight_matrix.average(range(len(weight_matrix)))
+    
+    #round off weight values
+    averages = np.round(averages, 4)
     
-    for sel in selection:
-        try:
-            transforms = cmds.skinPercent( skincluster, sel, ignoreBelow=0.00001, query=True, t=None )
-        except RuntimeError:
-            print ("skincluster.copyAvgWeights(): No verts selected")
-        values = cmds.skinPercent( skincluster, sel, ignoreBelow=0.00001, query=True, value=True )
-        
-        weight_dict = {}
-        if transforms:
-            for index in range(len(transforms)):
-                weight_dict[transforms[index]] = values[index]
-            master_dict[count] = weight_dict
-        else:
-            print ("skincluster.copyAvgWeights(): No joints influencing selected points")
-        count += 1
-
-    weight_keys = []
-    for ii in range(len(master_dict)):
-        for k in master_dict[ii].keys():
-            if k not in weight_keys:
-                weight_keys.append(k)
-
-    count = 0
-    for key in weight_keys:
-        weight_sum = 0
-        count_sum = 0
-        for ii in range(len(master_dict)):
-            count_sum += 1
-            if key in master_dict[ii].keys():
-                weight_sum += master_dict[ii][k]
-        count += 1
-
-        #round off weight values
-        average_value = weight_sum/count_sum
-        averaged_weights[key] = round(average_value, 4)
-
     if normalize:
-        keys = list(averaged_weights.keys())
-        
-        values = []
-        for key in keys:
-            values.append(averaged_weights[key])
-        if values:
-            sum = functools.reduce(lambda x,y:x+y, values)
-            values = [ x/(sum*1.0)*normalize for x in values]
-            
-            for ii in range(len(values)):
-                key = keys[ii]
-                val = values[ii]
-                averaged_weights[key] = val
-        else:
+        total = averages.sum()
+        if not total:
+            print ("skincluster.copyAvgWeights(): No joints influencing selected points")
             return
             
+        averages = averages / total * normalize
+            
+    averaged_weights = {}
+    for influence, value in zip(influences, averages):
+        if value:
+            averaged_weights[influence] = float(value)
+            
     return averaged_weights
 
 def pasteAvgWeights(avgWts):
     '''Apply the copyAvgWeights dictionary to the selected points'''
     
-    selection = cmds.ls(selection=True, flatten=True)
+    selection = cmds.ls(selection=True)
     mesh = cmds.ls(selection=True, objectsOnly=True)
     
     try:
         skincluster = findRelatedSkinCluster (mesh[0])
     except IndexError:
         print ("skincluster.pasteAvgWeights(): No points selected")
-        
-    cmd = "skinPercent"
-    for k in avgWts.keys():
-        cmd += " -tv %s %s" % (k ,avgWts[k])
-    cmd += " " + skincluster
-    for v in selection:
-        cmd += " " + v
-        
-    mel.eval(cmd)
+        return
+    
+    vertex_indices = mayalist_pylib.getVertexIndices(selection)
+    if not vertex_indices:
+        print ("skincluster.pasteAvgWeights(): No points selected")
+        return
+    
+    influences = list(avgWts.keys())
+    
+    # every selected vertex gets the same row, written in one undoable call
+    row = np.array([avgWts[influence] for influence in influences], dtype=np.float64)
+    weights = np.broadcast_to(row, (len(vertex_indices), len(influences)))
+    
+    setWeights(skincluster, weights, influences, normalize=True, vertexIndices=vertex_indices, undoable=True)
 
 def findRelatedSkinCluster(node):
     import maya.mel as mel
@@ -150,47 +350,461 @@ def findRelatedSkinCluster(node):
 
     
 
-def exportWeights(node, filepath):
+def getSkinClusterFn(skincluster, vertexIndices=None):
+    ''' Return the MFnSkinCluster, the geometry dag path and a vertex component for a skincluster
+    
+        vertexIndices: limit the component to these verts, None for every vertex
+    '''
+    
+    selection = om.MSelectionList()
+    selection.add(skincluster)
+    
+    skincluster_fn = oma.MFnSkinCluster(selection.getDependNode(0))
+    dag_path = skincluster_fn.getPathAtIndex(0)
+    
+    component_fn = om.MFnSingleIndexedComponent()
+    components = component_fn.create(om.MFn.kMeshVertComponent)
+    
+    if vertexIndices is None:
+        component_fn.setCompleteData(om.MFnMesh(dag_path).numVertices)
+    else:
+        component_fn.addElements([int(index) for index in vertexIndices])
+    
+    return skincluster_fn, dag_path, components
+
+def getInfluenceNames(skincluster_fn):
+    ''' influence names in the same order as the weight array columns.
+    
+        Node names without a dag path, the way deformerWeights writes the influences, so they
+        match the weights files whether or not the joint names are unique.
+    '''
+    
+    return [om.MFnDependencyNode(path.node()).name() for path in skincluster_fn.influenceObjects()]
+
+def getWeights(skincluster, vertexIndices=None):
+    ''' Return the skincluster weights as a (verts, influences) numpy array and the influence names
+    
+        vertexIndices: only read these verts, rows come back in the same order
+    '''
+    
+    skincluster_fn, dag_path, components = getSkinClusterFn(skincluster, vertexIndices=vertexIndices)
+    
+    weights, influence_count = skincluster_fn.getWeights(dag_path, components)
+    weights = np.array(weights, dtype=np.float64).reshape(-1, influence_count)
+    
+    return weights, getInfluenceNames(skincluster_fn)
+
+def setWeights(skincluster, weights, influences, normalize=True, vertexIndices=None, undoable=False):
+    ''' Set every vertex weight on the skincluster in one MFnSkinCluster.setWeights call.
+    
+        skincluster: skincluster name
+        weights: (verts, influences) array, columns ordered by influences
+        influences: influence names, all of them need to be bound to the skincluster
+        normalize: normalize the array before it is uploaded, maya doesn't do a second pass
+        vertexIndices: only write these verts, one weights row each
+        undoable: keep the replaced weights and put the write on the undo queue while undo is on,
+                  otherwise it is a plain api edit that can't be undone
+    '''
+    
+    skincluster_fn, dag_path, components = getSkinClusterFn(skincluster, vertexIndices=vertexIndices)
+    
+    influence_indices, weight_array = skinweights_pylib.buildWeightArray(weights, influences, getInfluenceNames(skincluster_fn), normalize=normalize)
+    
+    influence_indices = om.MIntArray(influence_indices)
+    weight_array = om.MDoubleArray(weight_array.tolist())
+    
+    if undoable and cmds.undoInfo(query=True, state=True):
+        old_weights = skincluster_fn.setWeights(dag_path, components, influence_indices, weight_array, normalize=False, returnOldWeights=True)
+        
+        apiundo_pylib.commit(undo=functools.partial(skincluster_fn.setWeights, dag_path, components, influence_indices, old_weights, normalize=False),
+                             redo=functools.partial(skincluster_fn.setWeights, dag_path, components, influence_indices, weight_array, normalize=False))
+    else:
+        skincluster_fn.setWeights(dag_path, components, influence_indices, weight_array, normalize=False)
+    
+    return True
+
+
+class WeightMatrix(object):
+    ''' The whole skincluster weight table pulled once into a csr (verts, influences) matrix.
+    
+        Every query is a vectorized numpy op over the matrix instead of a skinPercent call per vertex.
+        
+        WeightMatrix(skincluster)
+        WeightMatrix(weights=array, influences=names) for weights that are already in memory
+    '''
+    
+    def __init__(self, skincluster=None, weights=None, influences=None, ignoreBelow=0.000001):
+        object.__init__(self)
+        
+        self.skincluster = skincluster
+        
+        if skincluster is not None:
+            weights, influences = getWeights(skincluster)
+        
+        weights = np.asarray(weights, dtype=np.float64)
+        
+        self.influences = list(influences)
+        self.vertex_count = weights.shape[0]
+        self.data, self.indices, self.indptr = skinweights_pylib.denseToCsr(weights, ignoreBelow=ignoreBelow)
+        
+    def __len__(self):
+        return self.vertex_count
+        
+    def toDense(self):
+        return skinweights_pylib.csrToDense(self.data, self.indices, self.indptr, len(self.influences))
+        
+    def rows(self):
+        ''' vertex index of every stored weight '''
+        return np.repeat(np.arange(self.vertex_count), np.diff(self.indptr))
+        
+    def influenceCounts(self):
+        ''' number of influences weighting each vertex '''
+        return np.diff(self.indptr)
+        
+    def maxInfluences(self):
+        ''' the highest number of influences on a single vertex '''
+        counts = self.influenceCounts()
+        return int(counts.max()) if counts.size else 0
+        
+    def vertsAboveInfluenceCount(self, threshold):
+        ''' indices of the verts with more than threshold influences '''
+        return np.flatnonzero(self.influenceCounts() > threshold)
+        
+    def influenceTotals(self):
+        ''' summed weight of every influence over the whole mesh '''
+        return np.bincount(self.indices, weights=self.data, minlength=len(self.influences))
+        
+    def unusedInfluences(self):
+        ''' influences without any weight '''
+        totals = self.influenceTotals()
+        return [influence for influence, total in zip(self.influences, totals) if total == 0.0]
+        
+    def average(self, vertex_indices):
+        ''' mean weight of every influence over the given verts '''
+        
+        vertex_indices = np.asarray(vertex_indices, dtype=np.int64)
+        if not vertex_indices.size:
+            return np.zeros(len(self.influences))
+        
+        # gather the csr slices of every requested row
+        starts = self.indptr[vertex_indices]
+        counts = self.indptr[vertex_indices+1] - starts
+        positions = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+        
+        totals = np.bincount(self.indices[positions], weights=self.data[positions], minlength=len(self.influences))
+        
+        return totals / float(vertex_indices.size)
+        
+
+def writeWeightsNpz(filepath, weights, influences, shape="", deformer="", attributes=None, sparse=None):
+    ''' Save a weight matrix as an uncompressed npz so it can be memory mapped on load.
+    
+        weights: (verts, influences) array
+        sparse: store as a csr matrix, None picks whichever is smaller on disk
+    '''
+    
+    attributes = attributes or {}
+    
+    weights = np.asarray(weights, dtype=np.float32)
+    vertex_count, influence_count = weights.shape
+    
+    if sparse is None:
+        # csr costs a value and a column index per nonzero, plus the row pointers
+        sparse = (np.count_nonzero(weights) * 2 + vertex_count + 1) < weights.size
+    
+    data = { 'influences': np.array(influences, dtype=np.str_),
+             'vertex_count': np.int64(vertex_count),
+             'shape': np.str_(shape),
+             'deformer': np.str_(deformer),
+             'attribute_names': np.array(list(attributes.keys()), dtype=np.str_),
+             'attribute_values': np.array(list(attributes.values()), dtype=np.float64)
+    }
+    
+    if sparse:
+        data['format'] = np.str_("csr")
+        data['data'], data['indices'], data['indptr'] = skinweights_pylib.denseToCsr(weights)
+    else:
+        data['format'] = np.str_("dense")
+        data['weights'] = weights
+    
+    np.savez(filepath, **data)
+    
+    return filepath
+
+def memmapNpzMember(filepath, member):
+    ''' Memory map an array stored uncompressed inside an npz file, np.load ignores mmap_mode for npz '''
+    
+    with zipfile.ZipFile(filepath) as archive:
+        info = archive.getinfo(member + ".npy")
+        
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(filepath, "rb") as stream:
+        # skip the zip local file header to get to the npy header
+        stream.seek(info.header_offset)
+        local_header = stream.read(30)
+        name_length = int.from_bytes(local_header[26:28], "little")
+        extra_length = int.from_bytes(local_header[28:30], "little")
+        stream.seek(info.header_offset + 30 + name_length + extra_length)
+        
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+        offset = stream.tell()
+    
+    if dtype.hasobject:
+        return None
+        
+    return np.memmap(filepath, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran_order else "C")
+
+def readWeightsNpz(filepath, mmap=False):
+    ''' Load a writeWeightsNpz file.
+    
+        mmap: map the weight arrays from disk instead of reading them into memory
+        
+        returns: {'format', 'influences', 'vertex_count', 'shape', 'deformer', 'attributes'} plus
+                 'data', 'indices', 'indptr' csr arrays for a "csr" file or a dense (verts, influences)
+                 float32 'weights' array for a "dense" file, csr is never expanded here
+    '''
+    
+    with np.load(filepath, allow_pickle=False) as npz:
+        influences = [str(influence) for influence in npz['influences']]
+        vertex_count = int(npz['vertex_count'])
+        weights_format = str(npz['format'])
+        
+        data = { 'format': weights_format,
+                 'influences': influences,
+                 'vertex_count': vertex_count,
+                 'shape': str(npz['shape']),
+                 'deformer': str(npz['deformer']),
+                 'attributes': dict(zip([str(name) for name in npz['attribute_names']], npz['attribute_values'].tolist()))
+        }
+        
+        members = ['data', 'indices', 'indptr'] if weights_format == "csr" else ['weights']
+        
+        for member in members:
+            array = memmapNpzMember(filepath, member) if mmap else None
+            data[member] = array if array is not None else npz[member]
+    
+    return data
+
+def exportWeights(node, filepath, fileType="xml"):
+    ''' Export the skincluster weights on node to filepath/<node>_skinweights.<fileType>
+    
+        fileType: ["xml", "npz"]
+    '''
 
     sc = findRelatedSkinCluster(node)
     
     if not sc:
         cmds.warning('exportWeights(): ' + node + ' is not connected to a skinCluster!')
+        return False
+    
+    if fileType not in WEIGHTS_FILE_TYPES:
+        cmds.error("exportWeights(): file type {} not supported.".format(fileType))
             
-    filename = node + "_skinweights.xml"
+    filename = "{}_skinweights.{}".format(node, fileType)
     
-    attributes = ['envelope', 'skinningMethod', 'normalizeWeights', 'deformUserNormals', 'useComponents']
-    cmds.deformerWeights(filename, path=filepath, export=1, attribute=attributes, deformer=sc)
+    if fileType == "npz":
+        weights, influences = getWeights(sc)
+        attributes = dict([(attr, cmds.getAttr(sc+"."+attr)) for attr in WEIGHTS_ATTRIBUTES])
+        shape = cmds.skinCluster(sc, query=True, geometry=True)[0]
+        
+        writeWeightsNpz(os.path.join(filepath, filename), weights, influences, shape=shape, deformer=sc, attributes=attributes)
+        
+        return True
+    
+    cmds.deformerWeights(filename, path=filepath, export=1, attribute=WEIGHTS_ATTRIBUTES, deformer=sc)
 
     return True
     
 
-def importWeights(filepath, autoJoint=True):
-    ''' xml, using Deformer weights for speed '''
+def readWeightsInfo(filepath, readPoints=False):
+    ''' Stream a deformerWeights xml file and return its header information.
+    
+        Only the element headers are kept, every <point> is cleared as soon as it is parsed
+        so memory stays flat no matter how many verts are in the file.
+        
+        readPoints: also collect each weights block as (vertex indices, values) arrays in 'points'
+        
+        returns: {
+            'deformer': skincluster name,
+            'attributes': {attribute name: value string},
+            'shapes': [{'name', 'size', 'max'}],
+            'influences': [influence names in file order],
+            'weights': [{'source', 'shape', 'layer', 'size', 'max'}],
+            'points': [(indices, values)] only with readPoints
+        }
+    '''
+    
+    info = {'deformer': None, 'attributes': {}, 'shapes': [], 'influences': [], 'weights': []}
+    
+    if readPoints:
+        info['points'] = []
+        
+    in_weights = False
+    point_indices = []
+    point_values = []
+    
+    context = xml.etree.ElementTree.iterparse(filepath, events=("start", "end"))
+    event, root = next(context)
+    
+    for event, element in context:
+        # children are complete on "end", only the headers are needed
+        if event == "start":
+            if element.tag == "weights":
+                in_weights = True
+            continue
+            
+        tag = element.tag
+        
+        if tag == "point":
+            if readPoints and in_weights:
+                point_indices.append(element.get('index'))
+                point_values.append(element.get('value'))
+            
+            element.clear()
+            continue
+            
+        if tag == "weights":
+            in_weights = False
+            
+            if readPoints:
+                info['points'].append((np.array(point_indices, dtype=np.int64), np.array(point_values, dtype=np.float64)))
+                point_indices = []
+                point_values = []
+            
+            source = element.get('source')
+            
+            info['influences'].append(source)
+            info['weights'].append({ 'source': source,
+                                     'shape': element.get('shape'),
+                                     'layer': int(element.get('layer', 0)),
+                                     'size': int(element.get('size', 0)),
+                                     'max': int(element.get('max', 0))
+            })
+            
+            if info['deformer'] is None:
+                info['deformer'] = element.get('deformer')
+                
+        elif tag == "shape":
+            info['shapes'].append({ 'name': element.get('name'),
+                                    'size': int(element.get('size', 0)),
+                                    'max': int(element.get('max', 0))
+            })
+            
+        elif tag == "attribute":
+            info['attributes'][element.get('name')] = element.get('value')
+            continue
+            
+        elif tag == "deformer":
+            info['deformer'] = element.get('name')
+        
+        else:
+            continue
+        
+        # drop the finished block from the root so nothing accumulates
+        root.clear()
+
+    return info
+
+def readWeightsXml(filepath):
+    ''' Load a deformerWeights xml file into the same layout as readWeightsNpz.
+    
+        returns: {'format', 'weights', 'influences', 'vertex_count', 'shape', 'deformer', 'attributes'}
+        format is always "dense", weights is a (verts, influences) float64 array
+    '''
+    
+    info = readWeightsInfo(filepath, readPoints=True)
+    
+    vertex_count = info['shapes'][0]['size'] if info['shapes'] else 0
+    for indices, values in info['points']:
+        if indices.size:
+            vertex_count = max(vertex_count, int(indices.max()) + 1)
+    
+    weights = np.zeros((vertex_count, len(info['influences'])), dtype=np.float64)
+    for column, (indices, values) in enumerate(info['points']):
+        weights[indices, column] = values
+    
+    attributes = {}
+    for attr, value in info['attributes'].items():
+        try:
+            attributes[attr] = float(value)
+        except (TypeError, ValueError):
+            pass
+    
+    return { 'format': "dense",
+             'weights': weights,
+             'influences': info['influences'],
+             'vertex_count': vertex_count,
+             'shape': info['shapes'][0]['name'] if info['shapes'] else "",
+             'deformer': info['deformer'],
+             'attributes': attributes
+    }
+
+def loadWeights(filepath, normalize=True):
+    ''' Read a xml or npz weights file into memory ready for applyWeights.
+    
+        Doesn't touch the scene, so it is safe to run on a thread or process pool.
+        
+        returns: readWeightsNpz/readWeightsXml data plus 'node', 'filename' and 'normalized'
+    '''
     
     filename = os.path.basename(filepath)
-    path = filepath.replace(filename, "")
-    node = filename.split("_skinweights.xml")[0]
+    
+    if filename.split(".")[-1] == "npz":
+        weights_data = readWeightsNpz(filepath, mmap=True)
+    else:
+        weights_data = readWeightsXml(filepath)
+    
+    # copy off the memory map so the arrays can be normalized and sent across processes, csr stays csr
+    if weights_data['format'] == "csr":
+        weights_data['data'] = np.array(weights_data['data'], dtype=np.float64)
+        weights_data['indices'] = np.array(weights_data['indices'])
+        weights_data['indptr'] = np.array(weights_data['indptr'])
+        
+        if normalize:
+            skinweights_pylib.normalizeCsr(weights_data['data'], weights_data['indptr'])
+    else:
+        weights_data['weights'] = np.array(weights_data['weights'], dtype=np.float64)
+        
+        if normalize:
+            skinweights_pylib.normalizeWeights(weights_data['weights'])
+    
+    weights_data['node'] = filename.split("_skinweights.")[0]
+    weights_data['filename'] = filename
+    weights_data['normalized'] = normalize
+    
+    return weights_data
+
+def applyWeights(weights_data, autoJoint=True):
+    ''' Bind the mesh from a loadWeights result and set its weights, this is the only part that edits the scene '''
+    
+    node = weights_data['node']
+    filename = weights_data['filename']
     skincluster = node+"_skincluster"
     
     if not cmds.objExists(node):
         cmds.warning("importWeights(): {} does not exist.".format(node))
         return False, False
         
-    root = xml.etree.ElementTree.parse(filepath).getroot()
+    influences = weights_data['influences']
+    
+    vertex_count = cmds.polyEvaluate(node, vertex=True)
+    if vertex_count != weights_data['vertex_count']:
+        cmds.warning("importWeights(): {} has {} verts, {} has {}.".format(node, vertex_count, filename, weights_data['vertex_count']))
+        return False, False
 
     joints = []
-    for atype in root.findall('weights'):
-        jnt = atype.get('source')
-        shape = atype.get('shape')
-        verts = atype.get('max')
-        clusterName = atype.get('deformer')
-
+    for jnt in influences:
         if not cmds.objExists(jnt):
             if autoJoint:
                 cmds.createNode("joint", name=jnt)
             else:
-                cmds.error("importWeights(): {} does not exists in scene.  Turn on autoJoint?")
+                cmds.error("importWeights(): {} does not exists in scene.  Turn on autoJoint?".format(jnt))
         
         joints.append(jnt)
 
@@ -199,15 +813,322 @@ def importWeights(filepath, autoJoint=True):
     cmds.select(joints)
 
     skincluster = cmds.skinCluster(node, joints, name=skincluster, tsb=1, mi=8, sm=0)[0]
-    mel.eval('deformerWeights -import -deformer \"{0}\" -path \"{1}\" \"{2}\";'.format(skincluster, path, filename))
+    
+    # skinningMethod, normalizeWeights and the rest of WEIGHTS_ATTRIBUTES the way deformerWeights -import restored them
+    for attr, value in weights_data['attributes'].items():
+        plug = skincluster+"."+attr
+        
+        if cmds.getAttr(plug, lock=True) or cmds.connectionInfo(plug, isDestination=True):
+            continue
+        
+        # enum and bool values are read back as floats
+        if float(value).is_integer():
+            value = int(value)
+        
+        cmds.setAttr(plug, value)
+    
+    normalize = not weights_data['normalized']
+    
+    if weights_data['format'] == "csr":
+        # expand a block of verts at a time so the whole dense matrix is never in memory
+        for start in range(0, vertex_count, WEIGHTS_BLOCK_SIZE):
+            stop = min(start + WEIGHTS_BLOCK_SIZE, vertex_count)
+            weights = skinweights_pylib.csrToDense(weights_data['data'], weights_data['indices'], weights_data['indptr'], len(influences), start=start, stop=stop)
+            
+            setWeights(skincluster, weights, influences, normalize=normalize, vertexIndices=range(start, stop))
+    else:
+        setWeights(skincluster, weights_data['weights'], influences, normalize=normalize)
 
-    cmds.skinPercent(skincluster, node, normalize=True)
     cmds.select(cl=1)
     
     skincluster = cmds.rename(skincluster, node+"_skincluster")    
 
     return skincluster, node
 
+def importWeights(filepath, autoJoint=True):
+    ''' xml or npz picked by file extension, weights are normalized in memory and set in one bulk call '''
+    
+    return applyWeights(loadWeights(filepath), autoJoint=autoJoint)
+
+def hashFile(filepath, chunkSize=1048576):
+    ''' sha1 hex digest of a files contents '''
+    
+    digest = hashlib.sha1()
+    
+    with open(filepath, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunkSize), b""):
+            digest.update(chunk)
+            
+    return digest.hexdigest()
+
+def readWeightsManifest(path):
+    ''' returns the {filename: entry} manifest in a skinweights directory, empty when there isn't one '''
+    
+    manifest_path = os.path.join(path, WEIGHTS_MANIFEST)
+    
+    if not os.path.exists(manifest_path):
+        return {}
+    
+    try:
+        with open(manifest_path, "r") as handle:
+            return json.load(handle).get('files', {})
+            
+    except (ValueError, OSError):
+        print("skincluster.readWeightsManifest(): {} is unreadable, rebuilding it.".format(manifest_path))
+        return {}
+
+def writeWeightsManifest(path, entries):
+    manifest_path = os.path.join(path, WEIGHTS_MANIFEST)
+    
+    with open(manifest_path, "w") as handle:
+        json.dump({'version': 1, 'files': entries}, handle, indent=4, sort_keys=True)
+
+def readWeightsHeader(filepath):
+    ''' returns the influences and vertex count of a weights file.
+    
+        npz only reads those two members. deformerWeights xml keeps an influence header on every
+        weights block, so the file is streamed through readWeightsInfo without keeping the points.
+    '''
+    
+    if filepath.split(".")[-1] == "npz":
+        with np.load(filepath, allow_pickle=False) as npz:
+            return [str(influence) for influence in npz['influences']], int(npz['vertex_count'])
+    
+    info = readWeightsInfo(filepath)
+    
+    return info['influences'], int(info['shapes'][0]['size']) if info['shapes'] else 0
+
+def setManifestInfo(entry, weights_data):
+    ''' fill a manifest entry from a loadWeights result, returns True when it changed '''
+    
+    influences = list(weights_data['influences'])
+    vertex_count = int(weights_data['vertex_count'])
+    
+    if entry.get('influences') == influences and entry.get('vertex_count') == vertex_count:
+        return False
+    
+    entry['influences'] = influences
+    entry['vertex_count'] = vertex_count
+    
+    return True
+
+def updateWeightsManifest(path, filenames=None, readInfo=True):
+    ''' Bring the manifest in a skinweights directory up to date and return it.
+    
+        Each entry stores the file digest, node, influences and vertex count. Files whose size and
+        modified time match their entry aren't hashed again. A file that can't be read is reported
+        and left out of the returned entries.
+        
+        filenames: weights files to check, defaults to every weights file in path
+        readInfo: read the influences and vertex count of changed files with readWeightsHeader. Without it
+                  they are None until the caller fills them in with setManifestInfo after loading the
+                  file, the way importWeightsFiles does, so no file is read twice
+        
+        returns: {filename: {'digest', 'node', 'influences', 'vertex_count', 'size', 'mtime'}}
+    '''
+    
+    if filenames is None:
+        filenames = [ff for ff in sorted(os.listdir(path)) if ff.split(".")[-1] in WEIGHTS_FILE_TYPES]
+    
+    entries = readWeightsManifest(path)
+    changed = False
+    
+    for filename in filenames:
+        filepath = os.path.join(path, filename)
+        
+        try:
+            stat = os.stat(filepath)
+            
+            entry = entries.get(filename)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime and (entry.get('influences') is not None or not readInfo):
+                continue
+            
+            digest = hashFile(filepath)
+            
+            # touched but identical, only the stat info is stale
+            if entry and entry['digest'] == digest and (entry.get('influences') is not None or not readInfo):
+                entry['size'] = stat.st_size
+                entry['mtime'] = stat.st_mtime
+                changed = True
+                continue
+            
+            influences, vertex_count = readWeightsHeader(filepath) if readInfo else (None, None)
+            
+        except Exception as error:
+            print ("skincluster.updateWeightsManifest(): {} failed to read, {}".format(filepath, error))
+            
+            changed = entries.pop(filename, None) is not None or changed
+            continue
+        
+        entries[filename] = {'digest': digest,
+                             'node': filename.split("_skinweights.")[0],
+                             'influences': influences,
+                             'vertex_count': vertex_count,
+                             'size': stat.st_size,
+                             'mtime': stat.st_mtime}
+        changed = True
+    
+    # drop entries for deleted files
+    for filename in [ff for ff in entries if not os.path.exists(os.path.join(path, ff))]:
+        del entries[filename]
+        changed = True
+    
+    if changed:
+        try:
+            writeWeightsManifest(path, entries)
+        except OSError:
+            print("skincluster.updateWeightsManifest(): could not write the manifest in {}.".format(path))
+    
+    return entries
+
+
+class WeightsCache(object):
+    ''' loadWeights results kept in memory between rebuilds, keyed by file path and content digest.
+    
+        A rebuild in the same session only reads the weights files whose digest changed.
+    '''
+    
+    def __init__(self):
+        object.__init__(self)
+        
+        self.entries = {} # filepath: (digest, weights_data)
+        
+    def get(self, filepath, digest):
+        entry = self.entries.get(os.path.abspath(filepath))
+        
+        if entry and entry[0] == digest:
+            return entry[1]
+        
+        return None
+        
+    def store(self, filepath, digest, weights_data):
+        self.entries[os.path.abspath(filepath)] = (digest, weights_data)
+        
+    def clear(self):
+        self.entries = {}
+
+# session wide cache used by Rig.importSkinWeights
+WEIGHTS_CACHE = WeightsCache()
+
+
+def importWeightsFiles(filepaths, workers=None, processes=False, autoJoint=True, progress=None, cache=None):
+    ''' Import many weights files, reading them on a pool while the scene edits stay on the calling thread.
+    
+        Files are applied in sorted filepath order whatever order they finish loading in, each one as soon
+        as the files before it are done. A file that fails to load or apply is reported and skipped.
+    
+        workers: pool size, None lets concurrent.futures pick from the cpu count
+        processes: use a process pool, needs a standalone interpreter (mayapy) so the gui falls back to threads
+        progress: called as progress(done, total, filename) as each file finishes loading
+        cache: WeightsCache, files whose manifest digest is already cached aren't read again
+        
+        returns: [(skincluster, node)] in sorted filepath order, failed files left out
+    '''
+    
+    filepaths = sorted(set(filepaths))
+    total = len(filepaths)
+    
+    loaded = {} # filepath: weights data waiting to be applied, None when it failed to load
+    done = [0]
+    
+    def fileLoaded(filepath, weights_data):
+        loaded[filepath] = weights_data
+        done[0] += 1
+        
+        if progress:
+            progress(done[0], total, os.path.basename(filepath))
+    
+    digests = {}
+    manifests = {} # directory: manifest entries, filled in from the loaded files
+    manifest_changed = False
+    if cache is not None:
+        directories = {}
+        for filepath in filepaths:
+            directories.setdefault(os.path.dirname(filepath), []).append(filepath)
+            
+        for directory, directory_filepaths in directories.items():
+            # the influences and vertex count come from loading the file below, not a second read
+            manifest = manifests[directory] = updateWeightsManifest(directory or ".", [os.path.basename(ff) for ff in directory_filepaths], readInfo=False)
+            
+            for filepath in directory_filepaths:
+                entry = manifest.get(os.path.basename(filepath))
+                
+                # unreadable, updateWeightsManifest has reported it
+                if entry is None:
+                    fileLoaded(filepath, None)
+                    continue
+                
+                digests[filepath] = entry['digest']
+        
+        # unchanged files are applied straight from memory
+        for filepath in filepaths:
+            if filepath in loaded:
+                continue
+            
+            weights_data = cache.get(filepath, digests[filepath])
+            
+            if weights_data is not None:
+                manifest_changed = setManifestInfo(manifests[os.path.dirname(filepath)][os.path.basename(filepath)], weights_data) or manifest_changed
+                fileLoaded(filepath, weights_data)
+    
+    results = []
+    applied = [0] # files applied so far, in filepaths order
+    
+    def applyLoaded():
+        while applied[0] < total and filepaths[applied[0]] in loaded:
+            filepath = filepaths[applied[0]]
+            weights_data = loaded.pop(filepath)
+            applied[0] += 1
+            
+            if weights_data is None:
+                continue
+            
+            try:
+                results.append(applyWeights(weights_data, autoJoint=autoJoint))
+            except Exception as error:
+                print ("skincluster.importWeightsFiles(): {} failed to apply, {}".format(filepath, error))
+    
+    applyLoaded()
+    
+    to_load = [filepath for filepath in filepaths[applied[0]:] if filepath not in loaded]
+    
+    if to_load:
+        # a process pool would relaunch the maya gui executable
+        if processes and os.path.splitext(os.path.basename(sys.executable))[0].lower() == "maya":
+            processes = False
+        
+        executor_class = concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+        
+        with executor_class(max_workers=workers) as executor:
+            futures = dict([(executor.submit(loadWeights, filepath), filepath) for filepath in to_load])
+            
+            for future in concurrent.futures.as_completed(futures):
+                filepath = futures[future]
+                
+                try:
+                    weights_data = future.result()
+                except Exception as error:
+                    print ("skincluster.importWeightsFiles(): {} failed to load, {}".format(filepath, error))
+                    weights_data = None
+                
+                if cache is not None and weights_data is not None:
+                    cache.store(filepath, digests[filepath], weights_data)
+                    
+                    manifest_changed = setManifestInfo(manifests[os.path.dirname(filepath)][os.path.basename(filepath)], weights_data) or manifest_changed
+                
+                fileLoaded(filepath, weights_data)
+                applyLoaded()
+    
+    if manifest_changed:
+        for directory, manifest in manifests.items():
+            try:
+                writeWeightsManifest(directory or ".", manifest)
+            except OSError:
+                print("skincluster.importWeightsFiles(): could not write the manifest in {}.".format(directory or "."))
+            
+    return results
+
+
 def removeUnusedInfluences(skincluster, target_influences=[]):
     ''' Faster version of removeUnusedInfluences '''
 
@@ -227,10 +1148,124 @@ def removeUnusedInfluences(skincluster, target_influences=[]):
     cmds.skinCluster(skincluster, e=True, removeInfluence=unused)
 
 
+def plugIndex(plug):
+    ''' "skinCluster1.matrix[12]" -> 12 '''
+    
+    return int(plug[plug.rindex("[")+1:plug.rindex("]")])
+
+def connectionPairs(plugs, source=True, destination=True):
+    ''' one listConnections query for many plugs, returns a list of (plug, connected plug) '''
+    
+    connections = cmds.listConnections(plugs, connections=True, plugs=True, source=source, destination=destination) or []
+    
+    return list(zip(connections[0::2], connections[1::2]))
+
+def buildExportJointPlan(skinclusters, force=None, debug=False):
+    ''' Build the rewiring that swaps skinclusters between rig and export joints, without touching the scene.
+    
+        skinclusters: list of skinclusters
+        force: possible options [None, "rig", "export"]
+        
+        returns: list of (source plug, destination plug, existing source plug or None)
+    '''
+    
+    if force not in [None, "rig", "export"]:
+        cmds.error("skincluster.buildExportJointPlan(): force type {} not supported.".format(force))
+    
+    plan = []
+    
+    for skincluster in skinclusters:
+        
+        # every influence and its matrix index in one query
+        matrix_connections = connectionPairs("{}.matrix".format(skincluster), destination=False)
+        
+        if not matrix_connections:
+            continue
+        
+        influences = {plugIndex(plug): source.split(".")[0] for plug, source in matrix_connections}
+        
+        if force:
+            to_export = force == "export"
+        else:
+            to_export = not joint_pylib.isExportJoint(influences[min(influences)])
+        
+        if debug:
+            print("skincluster.buildExportJointPlan(): toggling {}, to_export: {} ".format(skincluster, to_export))
+        
+        # what is currently wired into the colour and lock plugs
+        existing = dict(connectionPairs(["{}.influenceColor".format(skincluster), "{}.lockWeights".format(skincluster)], destination=False))
+        existing.update(dict(matrix_connections))
+        
+        # bind pose connections of the current influences
+        bind_poses = connectionPairs(["{}.bindPose".format(influence) for influence in influences.values()], source=False)
+        
+        for index, influence in sorted(influences.items()):
+            
+            if to_export:
+                new_influence = joint_pylib.getExportFromRigJointName(influence)
+            else:
+                new_influence = joint_pylib.getRigFromExportJointName(influence)
+            
+            wiring = [("{}.worldMatrix[0]".format(new_influence), "{}.matrix[{}]".format(skincluster, index)),
+                      ("{}.objectColorRGB".format(new_influence), "{}.influenceColor[{}]".format(skincluster, index)),
+                      ("{}.lockInfluenceWeights".format(new_influence), "{}.lockWeights[{}]".format(skincluster, index))]
+            
+            for plug, pose_plug in bind_poses:
+                if plug.split(".")[0] == influence:
+                    wiring.append(("{}.bindPose".format(new_influence), pose_plug))
+                    existing[pose_plug] = plug
+            
+            for source, destination in wiring:
+                plan.append((source, destination, existing.get(destination)))
+    
+    return plan
+
+def applyConnectionPlan(plan):
+    ''' Apply a list of (source plug, destination plug, existing source plug or None) with a single MDGModifier.
+        While undo is on the modifier goes on the undo queue through apiundo, so the swap undoes in one step.
+    '''
+    
+    # skinned joints are missing this until the skin tools first touch them
+    for source, destination, existing_source in plan:
+        node, attribute = source.split(".", 1)
+        
+        if attribute == "lockInfluenceWeights" and not cmds.objExists(source):
+            cmds.addAttr(node, longName="lockInfluenceWeights", shortName="liw", at="bool", defaultValue=False)
+    
+    selection = om.MSelectionList()
+    plugs = {}
+    
+    for plug in set(plug for connection in plan for plug in connection if plug):
+        selection.add(plug)
+        plugs[plug] = selection.length() - 1
+    
+    modifier = om.MDGModifier()
+    
+    # skinclusters sharing a bind pose plan the same pose connection
+    connected = set()
+    
+    for source, destination, existing_source in plan:
+        if existing_source == source or destination in connected:
+            continue
+        
+        connected.add(destination)
+        
+        if existing_source:
+            modifier.disconnect(selection.getPlug(plugs[existing_source]), selection.getPlug(plugs[destination]))
+        
+        modifier.connect(selection.getPlug(plugs[source]), selection.getPlug(plugs[destination]))
+    
+    modifier.doIt()
+    
+    # one undo step for the whole swap, a no-op while undo is off
+    apiundo_pylib.commit(undo=modifier.undoIt, redo=modifier.doIt)
+    
+    return modifier
+
 def toggleExportJoints(node, ignoreMissingSkinclusters=False, force=None, debug=False):
     ''' Given a skincluster, swap to the export joint, or back to a rig joint depending what is currently on the skin
         
-        node: maya node with skincluster, can also be a skincluster
+        node: maya node with skincluster, can also be a skincluster. A list swaps them all with one DG modifier.
         ignoreMissingSkinclusters: If a skincluster isnt found just return False and don't fail
         force: possible options [None, "rig", "export"]
             - None: Swap to other type
@@ -238,134 +1273,153 @@ def toggleExportJoints(node, ignoreMissingSkinclusters=False, force=None, debug=
             - "export": Swap to export joints
     '''
     
-    if cmds.objectType(node) == "skinCluster":
-        skincluster = node
-    else:
-        skincluster = findRelatedSkinCluster(node)
+    nodes = node if isinstance(node, (list, tuple)) else [node]
     
-    if not skincluster:
-        cmds.warning('skincluster.toggleExportJoints(): {} is not connected to a skinCluster!'.format(node))
+    skinclusters = []
+    for nn in nodes:
+        if cmds.objectType(nn) == "skinCluster":
+            skincluster = nn
+        else:
+            skincluster = findRelatedSkinCluster(nn)
         
-        if ignoreMissingSkinclusters:
-            return False
-    
-    influences = cmds.skinCluster(skincluster, influence=True, query=True)
-    influence = influences[0]
+        if not skincluster:
+            cmds.warning('skincluster.toggleExportJoints(): {} is not connected to a skinCluster!'.format(nn))
+            
+            if ignoreMissingSkinclusters:
+                return False
+            
+            continue
+        
+        skinclusters.append(skincluster)
     
-    to_export = True
-    if force:
-        if force == "rig":
-            to_export = False
-        elif force == "export":
-            to_export = True
-        else:
-            cmds.error("skincluster.toggleExportJoints(): force type {} not supported.".format(force))
-    else:
-        if joint_pylib.isExportJoint(influence):
-            to_export = False
-        else:
-            to_export = True
+    plan = buildExportJointPlan(skinclusters, force=force, debug=debug)
     
     if debug:
-        print("skincluster.toggleExportJoints(): toggling {}, to_export: {} ".format(node, to_export))
-
-
-    # rig joint
-    influences = cmds.listConnections("{}.matrix".format(skincluster), source=True)
+        print("skincluster.toggleExportJoints(): {} connections across {} skinclusters".format(len(plan), len(skinclusters)))
     
-    for influence in influences:
-        new_influence = joint_pylib.getRigFromExportJointName(influence)
-        if to_export:
-            new_influence = joint_pylib.getExportFromRigJointName(influence)
-        
-        all_connections = cmds.listConnections(influence + ".worldMatrix[0]", plugs=True, destination=True)
-        
-        ii = 0
-        connection = None
-        for ii, conn in enumerate(all_connections):
-            current_skincluster, plug = conn.split(".")
-            
-            if current_skincluster == skincluster:
-                connection = conn
-        
-        find_index_start = connection.index("[")
-        find_index_end = connection.index("]")
-
-        plug_index = ""
-        for ii in range(find_index_start+1, find_index_end):
-            plug_index += str(connection[ii])
-        
-        changeInfluence(skincluster, influence, new_influence, plug_index)
+    applyConnectionPlan(plan)
         
     return True
 
 
-def changeInfluence(skincluster, influence, new_influence, influence_index):
-    ''' function to be used by toggleExportJoints() for multithreading '''
-
-    cmds.connectAttr("{}.worldMatrix[0]".format(new_influence),
-                     "{}.matrix[{}]".format(skincluster, influence_index), force=True
-    )
+def buildVertexAdjacency(polygon_counts, polygon_vertices, vertex_count):
+    ''' Build a symmetric csr vertex adjacency from MFnMesh.getVertices() style polygon data
     
-    cmds.connectAttr("{}.objectColorRGB".format(new_influence), 
-                     "{}.influenceColor[{}]".format(skincluster, influence_index), force=True
-    )
-
-    # lock influences
-    lockInfluenceWeights_plug = "{}.lockInfluenceWeights".format(new_influence)
-    if not cmds.objExists(lockInfluenceWeights_plug):
-        cmds.addAttr(new_influence, longName="lockInfluenceWeights", shortName="liw", at="bool", defaultValue=False)
-
-    cmds.connectAttr(lockInfluenceWeights_plug, "{}.lockWeights[{}]".format(skincluster, influence_index), force=True)
-
-    # bind pose
-    bind_pose_plug = cmds.listConnections(influence+".bindPose", plugs=True, destination=True)
-    if bind_pose_plug:
-        cmds.connectAttr("{}.bindPose".format(new_influence), bind_pose_plug[0], force=True)
-
+        returns: indptr, indices. The neighbors of vertex ii are indices[indptr[ii]:indptr[ii+1]]
+    '''
+    
+    polygon_counts = np.asarray(polygon_counts, dtype=np.int64)
+    polygon_vertices = np.asarray(polygon_vertices, dtype=np.int64)
+    
+    # every face vertex connects to the next one around its polygon
+    starts = np.cumsum(polygon_counts) - polygon_counts
+    next_positions = np.arange(polygon_vertices.size) + 1
+    next_positions[starts + polygon_counts - 1] = starts
+    
+    edge_start = np.concatenate((polygon_vertices, polygon_vertices[next_positions]))
+    edge_end = np.concatenate((polygon_vertices[next_positions], polygon_vertices))
+    
+    keys = np.unique(edge_start * vertex_count + edge_end)
+    rows = keys // vertex_count
+    
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=vertex_count)))).astype(np.int64)
+    indices = keys % vertex_count
+    
+    return indptr, indices
 
-def smoothFlood(geometry, iterations=1):
+def getVertexAdjacency(mesh):
+    ''' csr vertex adjacency of a maya mesh from a single MFnMesh.getVertices() call '''
     
-    if not iterations: 
-        return
+    selection = om.MSelectionList()
+    selection.add(mesh)
     
-    current_tool = cmds.currentCtx()
+    mesh_fn = om.MFnMesh(selection.getDagPath(0))
+    polygon_counts, polygon_vertices = mesh_fn.getVertices()
     
-    cmds.select(geometry)
+    return buildVertexAdjacency(list(polygon_counts), list(polygon_vertices), mesh_fn.numVertices)
+
+def smoothWeightsArray(weights, indptr, indices, iterations=1, strength=0.5, lockedColumns=[]):
+    ''' Laplacian smooth a (verts, influences) array over a csr vertex adjacency.
     
-    # get the skincluster
-    skincluster = findRelatedSkinCluster(geometry)
+        Each iteration moves every vertex toward the mean of its neighbors by strength, for all
+        influences at once. Locked columns keep their values and the rest are renormalized
+        to fill whatever weight the locked columns leave.
+    '''
+    
+    weights = np.array(weights, dtype=np.float64)
     
-    # Get skincluster influence list
-    influence_list = cmds.skinCluster(skincluster,q=True,inf=True)
+    # smoothing can't move weight into an influence that has none anywhere
+    unlocked = weights.any(axis=0)
+    unlocked[list(lockedColumns)] = False
     
-    # unlock influence
-    for influence in influence_list: 
-        cmds.setAttr(influence + '.lockInfluenceWeights',0)
+    if not iterations or not unlocked.any():
+        return weights
     
-    skin_paint_tool = 'artAttrSkinContext'
-    if not cmds.artAttrSkinPaintCtx(skin_paint_tool, exists=True):
-        cmds.artAttrSkinPaintCtx(skin_paint_tool, i1='paintSkinWeights.xpm', whichTool='skinWeights')
+    degrees = np.diff(indptr)
+    connected = degrees > 0
+    starts = indptr[:-1][connected]
     
-    cmds.setToolTo(skin_paint_tool)
+    locked_totals = weights.sum(axis=1) - weights[:, unlocked].sum(axis=1)
+    targets = np.clip(1.0 - locked_totals, 0.0, None)
     
-    cmds.artAttrSkinPaintCtx(skin_paint_tool, edit=True, selectedattroper='smooth')
+    smoothed = weights[:, unlocked]
+    neighbor_means = np.zeros_like(smoothed)
+    
+    averaging_matrix = None
+    if scipy_sparse is not None:
+        inverse_degrees = np.divide(1.0, degrees, out=np.zeros(degrees.shape), where=connected)
+        averaging_matrix = scipy_sparse.csr_matrix((np.repeat(inverse_degrees, degrees), indices, indptr), shape=(len(degrees), len(degrees)))
     
-    # smooth
     for ii in range(iterations):
-        print("skincluster.smoothFlood(): Smoothing {} at {}".format(skincluster, + str(ii+1)))
-        
-        for influence in influence_list:
-            # Lock current influence weights
-            cmds.setAttr(influence + '.lockInfluenceWeights',1)
+        if averaging_matrix is not None:
+            neighbor_means = averaging_matrix.dot(smoothed)
+        else:
+            neighbor_means[connected] = np.add.reduceat(smoothed[indices], starts, axis=0) / degrees[connected, np.newaxis]
             
-            # Smooth Flood
-            mel.eval('artSkinSelectInfluence artAttrSkinPaintCtx "{}"'.format(influence))
+        smoothed[connected] += strength * (neighbor_means[connected] - smoothed[connected])
+    
+    # renormalize the unlocked influences into the space the locked ones leave
+    totals = smoothed.sum(axis=1)
+    scale = np.divide(targets, totals, out=np.zeros_like(totals), where=totals > 0.0)
+    smoothed *= scale[:, np.newaxis]
+    
+    weights[:, unlocked] = smoothed
+    
+    return weights
 
-            cmds.artAttrSkinPaintCtx(skin_paint_tool, edit=True, clear=True)
-            
-            # Unlock current influence weights
-            cmds.setAttr(influence+'.lockInfluenceWeights',0)
+def smoothWeights(geometry, iterations=1, strength=0.5):
+    ''' Smooth all of the skin weights on geometry without the paint tool, runs in mayapy batch.
+    
+        Influences with lockInfluenceWeights on are left untouched. The write is undoable while undo is on.
+    '''
+    
+    if not iterations: 
+        return False
+        
+    skincluster = findRelatedSkinCluster(geometry)
+    if not skincluster:
+        cmds.warning('skincluster.smoothWeights(): {} is not connected to a skinCluster!'.format(geometry))
+        return False
+    
+    weights, influences = getWeights(skincluster)
+    
+    locked_columns = []
+    for ii, influence in enumerate(influences):
+        if cmds.objExists(influence+".lockInfluenceWeights") and cmds.getAttr(influence+".lockInfluenceWeights"):
+            locked_columns.append(ii)
+    
+    mesh = cmds.skinCluster(skincluster, query=True, geometry=True)[0]
+    indptr, indices = getVertexAdjacency(mesh)
+    
+    weights = smoothWeightsArray(weights, indptr, indices, iterations=iterations, strength=strength, lockedColumns=locked_columns)
+    
+    setWeights(skincluster, weights, influences, normalize=False, undoable=True)
+    
+    return True
+
+def smoothFlood(geometry, iterations=1):
+    ''' Kept for older scripts, smooths with smoothWeights instead of flooding the paint tool per influence.
+        Undoes in one step like the paint tool flood did.
+    '''
     
-    # reset tool
-    cmds.setToolTo(current_tool)
\ No newline at end of file
+    return smoothWeights(geometry, iterations=iterations)
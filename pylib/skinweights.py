@@ -0,0 +1,83 @@
+import numpy as np
+
+
+# Skin weight array layout shared by skincluster.py, kept free of maya so it runs anywhere numpy does.
+
+def normalizeWeights(weights):
+    ''' Normalize every row of a (verts, influences) array in place, unweighted verts are left at zero '''
+
+    totals = weights.sum(axis=1, keepdims=True)
+    np.divide(weights, totals, out=weights, where=totals > 0.0)
+
+    return weights
+
+def normalizeCsr(data, indptr):
+    ''' Normalize every row of csr data in place, unweighted verts are left at zero '''
+
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    totals = np.bincount(rows, weights=data, minlength=len(indptr) - 1)[rows]
+    np.divide(data, totals, out=data, where=totals > 0.0)
+
+    return data
+
+def buildWeightArray(weights, influences, bound_influences, normalize=True):
+    ''' Lay out weights for a bulk MFnSkinCluster.setWeights call.
+
+        Columns are reordered to match every bound influence, bound influences missing from
+        influences get zero weight so nothing from the bind is left behind.
+
+        weights: (verts, influences) array, columns ordered by influences
+        bound_influences: influence names in skincluster order, see skincluster.getInfluenceNames
+
+        returns: influence indices and a contiguous float64 weight array, one row of
+                 len(bound_influences) values per vertex
+    '''
+
+    weights = np.asarray(weights)
+    if weights.ndim == 1:
+        weights = weights[np.newaxis, :]
+
+    missing = [influence for influence in influences if influence not in bound_influences]
+    if missing:
+        raise RuntimeError("skinweights.buildWeightArray(): {} not bound to the skincluster.".format(missing))
+
+    columns = [bound_influences.index(influence) for influence in influences]
+
+    weight_array = np.zeros((weights.shape[0], len(bound_influences)), dtype=np.float64)
+    weight_array[:, columns] = weights
+
+    if normalize:
+        normalizeWeights(weight_array)
+
+    return list(range(len(bound_influences))), weight_array.ravel()
+
+def denseToCsr(weights, ignoreBelow=0.0):
+    ''' Compress a (verts, influences) array into csr data, column indices and row pointers '''
+
+    rows, columns = np.nonzero(np.abs(weights) > ignoreBelow)
+
+    data = weights[rows, columns]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=weights.shape[0])))).astype(np.int64)
+
+    return data, columns.astype(np.int32), indptr
+
+def csrToDense(data, indices, indptr, influence_count, dtype=np.float64, start=0, stop=None):
+    ''' Expand csr data back into a (verts, influences) array
+
+        start, stop: only expand this range of rows
+    '''
+
+    if stop is None:
+        stop = len(indptr) - 1
+
+    data = data[indptr[start]:indptr[stop]]
+    indices = indices[indptr[start]:indptr[stop]]
+    indptr = indptr[start:stop+1]
+
+    vertex_count = stop - start
+
+    weights = np.zeros((vertex_count, influence_count), dtype=dtype)
+    rows = np.repeat(np.arange(vertex_count), np.diff(indptr))
+    weights[rows, indices] = data
+
+    return weights
@@ -7,8 +7,10 @@ ROTATION_ORDER_LIST = ["xyz","yzx","zxy","xzy","yxz","zyx"]
 def alignPosition(node, target, ignoreChildren=False, freezeTransform=False):
     ''' Align two objects positions in world space '''
     source_pos = {}
-    children = cmds.listRelatives(node, children=True, type="transform")
-    if ignoreChildren and children:
+    
+    # the children are only needed when they are put back
+    children = cmds.listRelatives(node, children=True, type="transform") if ignoreChildren else None
+    if children:
         for child in children:
             source_pos[child] = cmds.xform(child, translation=True, worldSpace=True, query=True)
     
@@ -36,9 +38,9 @@ def alignRotation(node, target, ignoreChildren=False, freezeTransform=False):
     ''' Align two object's rotation in world space '''
     
     source_rots = {}
-    children = cmds.listRelatives(node, children=True, type="transform", fullPath=True)
+    children = cmds.listRelatives(node, children=True, type="transform", fullPath=True) if ignoreChildren else None
     
-    if ignoreChildren and children:
+    if children:
         for child in children:
             source_rots[child] = [cmds.xform(child, rotation=True, worldSpace=True, query=True), ROTATION_ORDER_LIST[cmds.getAttr(child+".rotateOrder")]]
     
@@ -70,8 +72,8 @@ def align( node, target, r=True, p=True, ignoreChildren=False, freezeTransform=F
     if (r and p):
         source_mats = {}
         
-        children = cmds.listRelatives(node, children=True, type="transform", fullPath=True)
-        if ignoreChildren and children:
+        children = cmds.listRelatives(node, children=True, type="transform", fullPath=True) if ignoreChildren else None
+        if children:
             for child in children:
                 source_mats[child] = cmds.xform(child, matrix=True, worldSpace=True, query=True)
         
@@ -760,9 +760,11 @@ class Biped(Rig):
     def characterizeHIK(self, characterizeExportJoints=True):
         ''' tag controls and joints for maya hik for motion capture '''
         
+        # build the controls once for the zero and bind pose passes
+        controls = [Control(control) for control in MayaName.select(cmds.ls('*Ctrl'), category="Ctrl")]
+        
         # Zero out rig
-        for control in cmds.ls('*Ctrl'):
-            c = Control(control)
+        for c in controls:
             c.goToZeroPose()
         
         # Set legs to FK
@@ -775,7 +777,6 @@ class Biped(Rig):
         cmds.setAttr('RtAnkleIkCtrl.ik', True)
 
         # Back to bind pose
-        for control in cmds.ls('*Ctrl'):
-            c = Control(control)
+        for c in controls:
             c.goToBindPose()    
 
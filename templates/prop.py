@@ -9,8 +9,8 @@ import rigpie.pylib.attribute as attribute_pylib
 class Prop(Rig):
     ''' Prop template '''
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         
         self.rootJoint = "CnRootJnt"
         
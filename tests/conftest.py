@@ -0,0 +1,59 @@
+''' Lets the tests import rigpie modules outside of maya.
+
+    When maya can't be imported, empty maya modules are put in sys.modules. Any name looked up on
+    them is a stand in class, so module level code like class X(om.MPxCommand) still imports.
+    Tests monkeypatch the functions and classes they actually call.
+'''
+
+import sys
+import types
+
+
+# CONSTANTS
+MAYA_MODULES = ("maya", "maya.cmds", "maya.mel", "maya.api", "maya.api.OpenMaya", "maya.api.OpenMayaAnim")
+
+
+class StubType(type):
+    ''' class whose missing attributes are more stand in classes, ex: om.MFn.kMeshVertComponent '''
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        stub = StubType(name, (object,), {})
+        setattr(cls, name, stub)
+
+        return stub
+
+
+class StubModule(types.ModuleType):
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        stub = StubType(name, (object,), {})
+        setattr(self, name, stub)
+
+        return stub
+
+
+def stubMaya():
+    ''' put stand in maya modules in sys.modules, returns False when the real maya is there '''
+
+    try:
+        import maya.cmds
+        return False
+    except ImportError:
+        pass
+
+    for name in MAYA_MODULES:
+        sys.modules[name] = StubModule(name)
+
+    for name in MAYA_MODULES[1:]:
+        parent, _, child = name.rpartition(".")
+        setattr(sys.modules[parent], child, sys.modules[name])
+
+    return True
+
+stubMaya()
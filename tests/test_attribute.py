@@ -0,0 +1,107 @@
+import pytest
+
+import rigpie.pylib.attribute as attribute_pylib
+
+
+class FakePlug(object):
+
+    def __init__(self, name, lock=False, keyable=True, channelBox=False):
+        object.__init__(self)
+
+        self.name = name
+        self.isLocked = lock
+        self.isKeyable = keyable
+        self.isChannelBox = channelBox
+
+    def state(self):
+        return attribute_pylib.AttrState(self.isLocked, self.isKeyable, self.isChannelBox)
+
+
+@pytest.fixture
+def plugs(monkeypatch):
+    ''' {"node.attr": FakePlug} every getPlugs lookup resolves to, merged like a selection list '''
+
+    scene = {}
+
+    class FakeSelectionList(object):
+
+        def __init__(self):
+            object.__init__(self)
+
+            self.items = []
+
+        def add(self, name):
+            if name not in self.items:
+                self.items.append(name)
+            return self
+
+        def length(self):
+            return len(self.items)
+
+        def getPlug(self, index):
+            return scene.setdefault(self.items[index], FakePlug(self.items[index]))
+
+    monkeypatch.setattr(attribute_pylib.om, "MSelectionList", FakeSelectionList, raising=False)
+
+    return scene
+
+
+def test_get_plugs_keeps_repeated_names(plugs):
+    found = attribute_pylib.getPlugs(["a.tx", "a.ty", "a.tx"])
+
+    assert [plug.name for plug in found] == ["a.tx", "a.ty", "a.tx"]
+
+def test_lock_plan_without_undo_commits_nothing(plugs, monkeypatch):
+    steps = []
+    monkeypatch.setattr(attribute_pylib.cmds, "undoInfo", lambda **kwargs: False, raising=False)
+    monkeypatch.setattr(attribute_pylib.apiundo_pylib, "commit", lambda undo, redo: steps.append((undo, redo)))
+
+    assert attribute_pylib.applyLockPlan(attribute_pylib.buildLockPlan("a", ["t"], lock=True, keyable=False)) == 6
+    assert steps == []
+
+def test_lock_plan_undoes_and_redoes(plugs, monkeypatch):
+    steps = []
+    monkeypatch.setattr(attribute_pylib.cmds, "undoInfo", lambda **kwargs: True, raising=False)
+    monkeypatch.setattr(attribute_pylib.apiundo_pylib, "commit", lambda undo, redo: steps.append((undo, redo)))
+
+    plugs["a.rx"] = FakePlug("a.rx", lock=True, keyable=False, channelBox=True)
+
+    plan = attribute_pylib.buildLockPlan("a", ["tx", "rx"], lock=False, keyable=True)
+    assert attribute_pylib.applyLockPlan(plan) == 2
+
+    assert len(steps) == 1
+    assert plugs["a.rx"].state() == (False, True, True)
+
+    undo, redo = steps[0]
+    undo()
+    assert plugs["a.rx"].state() == (True, False, True)
+    assert plugs["a.tx"].state() == (False, True, False)
+
+    redo()
+    assert plugs["a.rx"].state() == (False, True, True)
+
+class FakeNetwork(object):
+    ''' records the addAttr and setAttr calls a NodeNetwork would commit '''
+
+    def __init__(self):
+        object.__init__(self)
+
+        self.calls = []
+
+    def addAttr(self, node, attr, **kwargs):
+        self.calls.append(("addAttr", attr, kwargs["attributeType"]))
+        return "{}.{}".format(node, attr)
+
+    def setAttr(self, plug, value):
+        self.calls.append(("setAttr", plug, value))
+
+def test_add_to_network_only_sets_values_that_fit():
+    network = FakeNetwork()
+
+    attribute_pylib.addToNetwork(network, "a", "link", type="message")
+    attribute_pylib.addToNetwork(network, "a", "mode", type="enum", en="fk:ik", dv=1)
+    attribute_pylib.addToNetwork(network, "a", "empty", type="string")
+    attribute_pylib.addToNetwork(network, "a", "label", type="string", value="arm")
+    attribute_pylib.addToNetwork(network, "a", "blend", type="float", value=0.5)
+
+    assert [call for call in network.calls if call[0] == "setAttr"] == [("setAttr", "a.label", "arm"), ("setAttr", "a.blend", 0.5)]
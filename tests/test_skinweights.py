@@ -0,0 +1,379 @@
+import os
+
+import numpy as np
+import pytest
+
+import rigpie.pylib.skinweights as skinweights_pylib
+import rigpie.pylib.skincluster as skincluster_pylib
+
+
+class FakeDagPath(object):
+
+    def __init__(self, name):
+        object.__init__(self)
+
+        self.name = name
+
+    def node(self):
+        return self.name
+
+
+class FakeDependencyNode(object):
+
+    def __init__(self, node):
+        object.__init__(self)
+
+        self.node = node
+
+    def name(self):
+        return self.node
+
+
+class FakeComponent(object):
+    ''' MFnSingleIndexedComponent, the vertex rows a getWeights/setWeights call covers '''
+
+    def __init__(self):
+        object.__init__(self)
+
+        self.elements = []
+
+    def create(self, componentType):
+        return self
+
+    def setCompleteData(self, count):
+        self.elements = list(range(count))
+
+    def addElements(self, elements):
+        self.elements.extend(elements)
+
+
+class FakeSelectionList(object):
+
+    def __init__(self):
+        object.__init__(self)
+
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+        return self
+
+    def length(self):
+        return len(self.items)
+
+    def getDependNode(self, index):
+        return self.items[index]
+
+    def getPlug(self, index):
+        return self.items[index]
+
+
+class FakeMesh(object):
+
+    def __init__(self, vertex_count):
+        object.__init__(self)
+
+        self.numVertices = vertex_count
+
+
+class FakeSkinCluster(object):
+    ''' MFnSkinCluster over an in memory (verts, influences) table, setWeights takes one row of
+        len(influence_indices) values per vertex in influence_indices order like the real one.
+    '''
+
+    def __init__(self, influences, vertex_count):
+        object.__init__(self)
+
+        self.influences = list(influences)
+        self.vertex_count = vertex_count
+        self.weights = np.zeros((vertex_count, len(self.influences)), dtype=np.float64)
+
+        self.calls = [] # (influence indices, flat weights) of every setWeights call
+
+    def getPathAtIndex(self, index):
+        return FakeDagPath("mesh")
+
+    def influenceObjects(self):
+        return [FakeDagPath(influence) for influence in self.influences]
+
+    def getWeights(self, dag_path, components):
+        return self.weights[components.elements].ravel().tolist(), len(self.influences)
+
+    def setWeights(self, dag_path, components, influence_indices, weights, normalize=True, returnOldWeights=False):
+        cells = np.ix_(components.elements, list(influence_indices))
+        old_weights = self.weights[cells].ravel().tolist()
+
+        self.calls.append((list(influence_indices), list(weights)))
+        self.weights[cells] = np.reshape(list(weights), (len(components.elements), len(influence_indices)))
+
+        return old_weights if returnOldWeights else None
+
+    def weightsByName(self):
+        return dict((influence, self.weights[:, column].tolist()) for column, influence in enumerate(self.influences))
+
+
+@pytest.fixture
+def skin(monkeypatch):
+    ''' returns a function that makes the FakeSkinCluster every skincluster name resolves to '''
+
+    def makeSkinCluster(influences, vertex_count, undo=False):
+        fake = FakeSkinCluster(influences, vertex_count)
+
+        om = skincluster_pylib.om
+        monkeypatch.setattr(om, "MSelectionList", FakeSelectionList, raising=False)
+        monkeypatch.setattr(om, "MFnSingleIndexedComponent", FakeComponent, raising=False)
+        monkeypatch.setattr(om, "MFnMesh", lambda dag_path: FakeMesh(vertex_count), raising=False)
+        monkeypatch.setattr(om, "MFnDependencyNode", FakeDependencyNode, raising=False)
+        monkeypatch.setattr(om, "MIntArray", list, raising=False)
+        monkeypatch.setattr(om, "MDoubleArray", list, raising=False)
+        monkeypatch.setattr(skincluster_pylib.oma, "MFnSkinCluster", lambda node: fake, raising=False)
+        monkeypatch.setattr(skincluster_pylib.cmds, "undoInfo", lambda **kwargs: undo, raising=False)
+
+        return fake
+
+    return makeSkinCluster
+
+
+def test_weight_array_layout_is_vertex_major_and_normalized():
+    influence_indices, weight_array = skinweights_pylib.buildWeightArray([[1.0, 3.0], [2.0, 2.0], [0.0, 0.0]], ["a", "b"], ["a", "b"])
+
+    assert influence_indices == [0, 1]
+    assert weight_array.dtype == np.float64
+    assert weight_array.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(weight_array, [0.25, 0.75, 0.5, 0.5, 0.0, 0.0])
+
+def test_weight_array_follows_bound_influence_order():
+    # file order differs from the bind order and one bound influence isn't in the file
+    influence_indices, weight_array = skinweights_pylib.buildWeightArray([[0.2, 0.8]], ["knee", "hip"], ["hip", "foot", "knee"])
+
+    assert influence_indices == [0, 1, 2]
+    np.testing.assert_allclose(weight_array, [0.8, 0.0, 0.2])
+
+def test_weight_array_unbound_influence_raises():
+    try:
+        skinweights_pylib.buildWeightArray([[1.0]], ["elbow"], ["hip"])
+    except RuntimeError:
+        return
+
+    raise AssertionError("an unbound influence should raise")
+
+def test_set_weights_reaches_the_right_influences(skin):
+    fake = skin(["hip", "knee", "foot"], 2)
+
+    skincluster_pylib.setWeights("skinCluster1", [[1.0, 1.0], [0.0, 2.0]], ["foot", "hip"])
+
+    assert len(fake.calls) == 1
+    assert fake.calls[0][0] == [0, 1, 2]
+    np.testing.assert_allclose(fake.calls[0][1], [0.5, 0.0, 0.5, 1.0, 0.0, 0.0])
+    assert fake.weightsByName() == {'hip': [0.5, 1.0], 'knee': [0.0, 0.0], 'foot': [0.5, 0.0]}
+
+def test_set_weights_on_some_verts(skin):
+    fake = skin(["hip", "knee"], 4)
+
+    skincluster_pylib.setWeights("skinCluster1", [[0.0, 3.0], [1.0, 1.0]], ["hip", "knee"], vertexIndices=[3, 1])
+
+    np.testing.assert_allclose(fake.weights, [[0.0, 0.0], [0.5, 0.5], [0.0, 0.0], [0.0, 1.0]])
+
+def test_get_weights_reads_back_what_was_set(skin):
+    skin(["hip", "knee", "foot"], 3)
+
+    skincluster_pylib.setWeights("skinCluster1", [[1.0, 0.0], [0.25, 0.75], [0.0, 1.0]], ["knee", "foot"])
+
+    weights, influences = skincluster_pylib.getWeights("skinCluster1")
+
+    assert influences == ["hip", "knee", "foot"]
+    np.testing.assert_allclose(weights, [[0.0, 1.0, 0.0], [0.0, 0.25, 0.75], [0.0, 0.0, 1.0]])
+
+    weights, influences = skincluster_pylib.getWeights("skinCluster1", vertexIndices=[2, 0])
+
+    np.testing.assert_allclose(weights, [[0.0, 0.0, 1.0], [0.0, 1.0, 0.0]])
+
+def test_undoable_set_weights_commits_the_old_weights(skin, monkeypatch):
+    fake = skin(["hip", "knee"], 2, undo=True)
+    fake.weights[:] = [[1.0, 0.0], [0.0, 1.0]]
+
+    steps = []
+    monkeypatch.setattr(skincluster_pylib.apiundo_pylib, "commit", lambda undo, redo: steps.append((undo, redo)) or True)
+
+    skincluster_pylib.setWeights("skinCluster1", [[0.5, 0.5], [0.5, 0.5]], ["hip", "knee"], undoable=True)
+
+    assert len(steps) == 1
+    np.testing.assert_allclose(fake.weights, [[0.5, 0.5], [0.5, 0.5]])
+
+    undo, redo = steps[0]
+    undo()
+    np.testing.assert_allclose(fake.weights, [[1.0, 0.0], [0.0, 1.0]])
+
+    redo()
+    np.testing.assert_allclose(fake.weights, [[0.5, 0.5], [0.5, 0.5]])
+
+def test_csr_round_trip():
+    weights = np.array([[0.0, 1.0, 0.0], [0.25, 0.0, 0.75], [0.0, 0.0, 0.0]])
+
+    data, indices, indptr = skinweights_pylib.denseToCsr(weights)
+
+    assert indptr.tolist() == [0, 1, 3, 3]
+    np.testing.assert_array_equal(skinweights_pylib.csrToDense(data, indices, indptr, 3), weights)
+
+def test_normalize_csr_leaves_unweighted_rows():
+    data, indices, indptr = skinweights_pylib.denseToCsr(np.array([[2.0, 2.0], [0.0, 0.0], [0.0, 0.5]]))
+
+    skinweights_pylib.normalizeCsr(data, indptr)
+
+    np.testing.assert_allclose(skinweights_pylib.csrToDense(data, indices, indptr, 2), [[0.5, 0.5], [0.0, 0.0], [0.0, 1.0]])
+
+def test_csr_file_is_applied_a_block_at_a_time(skin, tmp_path, monkeypatch):
+    fake = skin(["hip", "knee"], 3)
+
+    filepath = str(tmp_path / "body_skinweights.npz")
+    skincluster_pylib.writeWeightsNpz(filepath, [[2.0, 0.0], [0.0, 1.0], [1.0, 1.0]], ["hip", "knee"], sparse=True)
+
+    weights_data = skincluster_pylib.loadWeights(filepath)
+
+    # only the nonzero weights are loaded
+    assert weights_data['format'] == "csr"
+    assert "weights" not in weights_data
+    assert len(weights_data['data']) == 4
+
+    cmds = skincluster_pylib.cmds
+    monkeypatch.setattr(cmds, "objExists", lambda node: True, raising=False)
+    monkeypatch.setattr(cmds, "polyEvaluate", lambda node, vertex=True: 3, raising=False)
+    monkeypatch.setattr(cmds, "select", lambda *args, **kwargs: None, raising=False)
+    monkeypatch.setattr(cmds, "skinCluster", lambda *args, **kwargs: [kwargs['name']], raising=False)
+    monkeypatch.setattr(cmds, "rename", lambda node, name: name, raising=False)
+
+    blocks = []
+    set_weights = skincluster_pylib.setWeights
+
+    def setWeights(skincluster, weights, influences, normalize=True, vertexIndices=None, undoable=False):
+        blocks.append(list(vertexIndices))
+        return set_weights(skincluster, weights, influences, normalize=normalize, vertexIndices=vertexIndices)
+
+    monkeypatch.setattr(skincluster_pylib, "setWeights", setWeights)
+    monkeypatch.setattr(skincluster_pylib, "WEIGHTS_BLOCK_SIZE", 2)
+
+    skincluster_pylib.applyWeights(weights_data)
+
+    assert blocks == [[0, 1], [2]]
+    assert fake.weightsByName() == {'hip': [1.0, 0.0, 0.5], 'knee': [0.0, 1.0, 0.5]}
+
+def test_copy_avg_weights_averages_the_selected_verts(skin, monkeypatch):
+    fake = skin(["hip", "knee", "ankle"], 3)
+    skincluster_pylib.setWeights("skin", [[1.0, 0.0, 0.0], [0.5, 0.5, 0.0], [0.0, 0.999995, 0.000005]], ["hip", "knee", "ankle"], normalize=False)
+
+    monkeypatch.setattr(skincluster_pylib.cmds, "ls", lambda selection=True, objectsOnly=False: ["body"], raising=False)
+    monkeypatch.setattr(skincluster_pylib, "findRelatedSkinCluster", lambda node: "skin")
+    monkeypatch.setattr(skincluster_pylib.mayalist_pylib, "getVertexIndices", lambda selection: [2, 0])
+
+    assert skincluster_pylib.copyAvgWeights() == {'hip': 0.5, 'knee': 0.5}
+
+def test_apply_weights_restores_the_skincluster_attributes(skin, monkeypatch):
+    fake = skin(["hip", "knee"], 2)
+
+    cmds = skincluster_pylib.cmds
+    set_attrs = {}
+
+    monkeypatch.setattr(cmds, "objExists", lambda node: True, raising=False)
+    monkeypatch.setattr(cmds, "polyEvaluate", lambda node, vertex=True: 2, raising=False)
+    monkeypatch.setattr(cmds, "select", lambda *args, **kwargs: None, raising=False)
+    monkeypatch.setattr(cmds, "skinCluster", lambda *args, **kwargs: [kwargs['name']], raising=False)
+    monkeypatch.setattr(cmds, "rename", lambda node, name: name, raising=False)
+    monkeypatch.setattr(cmds, "getAttr", lambda plug, lock=False: plug.endswith(".envelope"), raising=False)
+    monkeypatch.setattr(cmds, "connectionInfo", lambda plug, isDestination=False: plug.endswith(".useComponents"), raising=False)
+    monkeypatch.setattr(cmds, "setAttr", lambda plug, value: set_attrs.__setitem__(plug, value), raising=False)
+
+    weights_data = {
+        'node': "body",
+        'filename': "body_skinweights.npz",
+        'influences': ["knee", "hip"],
+        'vertex_count': 2,
+        'format': "dense",
+        'weights': np.array([[1.0, 0.0], [0.5, 0.5]]),
+        'normalized': True,
+        'attributes': {'envelope': 0.5, 'skinningMethod': 1.0, 'normalizeWeights': 2.0, 'useComponents': 1.0},
+    }
+
+    assert skincluster_pylib.applyWeights(weights_data) == ("body_skincluster", "body")
+
+    # the locked envelope and the connected useComponents are left alone
+    assert set_attrs == {'body_skincluster.skinningMethod': 1, 'body_skincluster.normalizeWeights': 2}
+    assert isinstance(set_attrs['body_skincluster.skinningMethod'], int)
+
+    assert fake.weightsByName() == {'hip': [0.0, 0.5], 'knee': [1.0, 0.5]}
+
+def test_import_weights_files_reads_each_file_once_and_skips_bad_ones(tmp_path, monkeypatch):
+    for node in ("arm", "leg"):
+        skincluster_pylib.writeWeightsNpz(str(tmp_path / (node + "_skinweights.npz")), [[1.0, 0.0], [0.5, 0.5]], ["hip", "knee"])
+
+    (tmp_path / "body_skinweights.npz").write_bytes(b"not a zip file")
+
+    loads = []
+    load_weights = skincluster_pylib.loadWeights
+
+    def loadWeights(filepath, normalize=True):
+        loads.append(os.path.basename(filepath))
+        return load_weights(filepath, normalize=normalize)
+
+    monkeypatch.setattr(skincluster_pylib, "loadWeights", loadWeights)
+    monkeypatch.setattr(skincluster_pylib, "readWeightsHeader", None)
+    monkeypatch.setattr(skincluster_pylib, "applyWeights", lambda weights_data, autoJoint=True: (weights_data['node'] + "_skincluster", weights_data['node']))
+
+    filepaths = [str(tmp_path / filename) for filename in ("leg_skinweights.npz", "body_skinweights.npz", "arm_skinweights.npz")]
+    cache = skincluster_pylib.WeightsCache()
+
+    results = skincluster_pylib.importWeightsFiles(filepaths, workers=2, cache=cache)
+
+    assert results == [("arm_skincluster", "arm"), ("leg_skincluster", "leg")]
+    assert sorted(loads) == ["arm_skinweights.npz", "body_skinweights.npz", "leg_skinweights.npz"]
+
+    manifest = skincluster_pylib.readWeightsManifest(str(tmp_path))
+    assert manifest["arm_skinweights.npz"]['influences'] == ["hip", "knee"]
+    assert manifest["arm_skinweights.npz"]['vertex_count'] == 2
+
+    # a rebuild only reads the file that still isn't cached
+    del loads[:]
+    skincluster_pylib.importWeightsFiles(filepaths, workers=2, cache=cache)
+
+    assert loads == ["body_skinweights.npz"]
+
+def test_connection_plan_is_one_undo_step(monkeypatch):
+    edits = []
+
+    class FakeModifier(object):
+
+        def __init__(self):
+            object.__init__(self)
+
+            self.connections = []
+
+        def disconnect(self, source, destination):
+            self.connections.append(("disconnect", source, destination))
+
+        def connect(self, source, destination):
+            self.connections.append(("connect", source, destination))
+
+        def doIt(self):
+            edits.append("doIt")
+
+        def undoIt(self):
+            edits.append("undoIt")
+
+    steps = []
+    monkeypatch.setattr(skincluster_pylib.om, "MSelectionList", FakeSelectionList, raising=False)
+    monkeypatch.setattr(skincluster_pylib.om, "MDGModifier", FakeModifier, raising=False)
+    monkeypatch.setattr(skincluster_pylib.apiundo_pylib, "commit", lambda undo, redo: steps.append((undo, redo)))
+
+    plan = [("hipExport.worldMatrix[0]", "skin.matrix[0]", "hip.worldMatrix[0]"),
+            ("hipExport.bindPose", "bindPose1.members[0]", "hip.bindPose")]
+
+    modifier = skincluster_pylib.applyConnectionPlan(plan)
+
+    assert [edit[0] for edit in modifier.connections] == ["disconnect", "connect", "disconnect", "connect"]
+    assert edits == ["doIt"]
+    assert len(steps) == 1
+
+    undo, redo = steps[0]
+    undo()
+    redo()
+
+    assert edits == ["doIt", "undoIt", "doIt"]